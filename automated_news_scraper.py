@@ -1,86 +1,146 @@
-import datetime
+from __future__ import annotations
 
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
+import argparse
+import asyncio
+import functools
+from typing import TYPE_CHECKING
 
+from jp_news_scraper_pipeline.async_pipeline import run_async_pipeline
 from jp_news_scraper_pipeline.configure_logging import configure_logging
-from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_pos, translate_pos
-from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import filter_out_non_jp_characters, \
-    romanize_morpheme, add_timestamp_to_df, filter_out_pos
-from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import extract_text_from_url_list
-from jp_news_scraper_pipeline.jp_news_scraper.utils import check_if_all_list_len_is_equal, get_tokenizer, \
-    get_tokenizer_mode
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import archive_texts
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import romanize_series, add_timestamp_to_df, \
+    create_pos_columns
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache, DEFAULT_CACHE_DIR
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import extract_texts_from_pages
+from jp_news_scraper_pipeline.jp_news_scraper.parallel_tokenizer import tokenize_texts
+from jp_news_scraper_pipeline.jp_news_scraper.parquet_dataset import write_to_morpheme_dataset, DEFAULT_DATASET_DIR
+from jp_news_scraper_pipeline.metrics import metrics
 from jp_news_scraper_pipeline.pipeline import get_cleaned_url_list
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = configure_logging(logger_name='automated_news_scraper')
 
+# Number of URLs that flow through the daily scraper together.
+# Each batch adds a file to the day's partition of the Parquet dataset,
+# so the batches are larger than those of the streaming pipeline.
+DEFAULT_DAILY_BATCH_SIZE = 64
+
 
-def extract_kanji_from_dict(dictionary: dict) -> pd.DataFrame:
+def extract_kanji_from_dict(
+        dictionary: dict,
+        max_workers: int | None = None,
+        filter_tokens: bool = False) -> pd.DataFrame:
     """
-    Extract kanji from the text list.
+    Extract kanji and their Part of Speech from the text list.
     :param dictionary: Dictionary where key is HREF and value is its text content.
-    :return: DataFrame with HREF as Source and extracted kanji as Kanji columns.
+    :param max_workers: Maximum number of worker processes used for tokenization.
+                        Default is None, which uses the number of CPUs.
+    :param filter_tokens: Whether to drop kanji with an excluded Part of Speech or non-Japanese characters.
+                        Default is False.
+    :return: DataFrame with HREF as Source, extracted kanji as Kanji,
+            and its Part of Speech as PartOfSpeech and PartOfSpeechEnglish categorical columns.
     """
     logger.info('Extract kanji from text list.')
-    kanji_data = []
-    tokenizer_obj = get_tokenizer()
-    mode = get_tokenizer_mode()
+    hrefs = []
+    texts = []
     for href, text_list in dictionary.items():
         for text in text_list:
-            kanji_list = [m.dictionary_form() for m in tokenizer_obj.tokenize(text, mode)]
-            if kanji_list:
-                kanji_data.extend([(href, kanji) for kanji in kanji_list])
+            hrefs.append(href)
+            texts.append(text)
+
+    kanji_data = []
+    pos_codes = []
+    for href, records in zip(hrefs, tokenize_texts(texts, max_workers, filter_tokens)):
+        for morpheme, pos_code in records:
+            kanji_data.append((href, morpheme))
+            pos_codes.append(pos_code)
 
     if not kanji_data:
         logger.warning('No kanji found.')
 
+    import pandas as pd
+
     logger.info("Create DataFrame from the kanji data")
     df = pd.DataFrame(kanji_data, columns=['Source', 'Kanji'])
+    df['PartOfSpeech'], df['PartOfSpeechEnglish'] = create_pos_columns(pos_codes)
     return df
 
 
-def start_daily_news_scraper():
-    logger.info("Automated Scraper started")
-
-    base_url = 'https://www3.nhk.or.jp'
-    initial_url = base_url + '/news/'
-
-    cleaned_url_list: list[str] = get_cleaned_url_list(initial_url)
-
-    joined_text_list = extract_text_from_url_list(cleaned_url_list)
+def process_batch_for_dataset(
+        url_batch: list[str],
+        pages: list[str | None],
+        archive_dir: str | None = None) -> pd.DataFrame:
+    """
+    Parse, archive, tokenize, filter and romanize a batch of fetched pages.
+    :param url_batch: HREFs of the batch.
+    :param pages: HTML page of each HREF, in the same order.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :return: DataFrame with Source, Kanji, Romanji, PartOfSpeech, PartOfSpeechEnglish and TimeStamp columns.
+    """
+    source_and_text_dict = extract_texts_from_pages(url_batch, pages)
     logger.info("Text extracted from hrefs")
+    if archive_dir is not None:
+        archive_texts(source_and_text_dict, archive_dir)
 
-    source_and_text_dict = dict(zip(cleaned_url_list, joined_text_list))
-
-    df_with_href_and_kanji = extract_kanji_from_dict(source_and_text_dict)
-    kanji_list = df_with_href_and_kanji['Kanji'].tolist()
-    pos_list = extract_pos(kanji_list)
-    pos_translated_list = translate_pos(pos_list)
-
-    is_all_list_len_equal: bool = check_if_all_list_len_is_equal(kanji_list, pos_list, pos_translated_list)
-
-    if not is_all_list_len_equal:
-        raise ValueError("The length of kanji_list, pos_list, and pos_translated_list are not equal.")
+    # The batch is tokenized in the calling thread, as the pipeline already overlaps it with the fetches.
+    df_with_href_and_kanji = extract_kanji_from_dict(source_and_text_dict, max_workers=1, filter_tokens=True)
 
     logger.info('Romanizing Kanji...')
-    df_with_href_and_kanji['Romanji'] = df_with_href_and_kanji['Kanji'].apply(romanize_morpheme)
-    logger.info('Add PartOfSpeech Column')
-    df_with_href_and_kanji['PartOfSpeech'] = pos_list
-    logger.info('Add PartOfSpeechEnglish Column')
-    df_with_href_and_kanji['PartOfSpeechEnglish'] = pos_translated_list
+    df_with_href_and_kanji.insert(2, 'Romanji', romanize_series(df_with_href_and_kanji['Kanji']))
     add_timestamp_to_df(df_with_href_and_kanji)
+    return df_with_href_and_kanji
+
 
-    filtered_df = filter_out_pos(df_with_href_and_kanji)
-    filtered_df = filter_out_non_jp_characters(filtered_df)
+def start_daily_news_scraper(
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = None,
+        dataset_dir: str = DEFAULT_DATASET_DIR,
+        batch_size: int = DEFAULT_DAILY_BATCH_SIZE) -> int:
+    """
+    Scrape the news currently listed on NHK News into the Parquet dataset.
+    The pages are fetched in batches while the batches fetched before are tokenized, romanized and written.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :param dataset_dir: Directory of the Parquet dataset.
+    :param batch_size: Number of URLs that flow through the pipeline together.
+    :return: Number of rows appended to the dataset.
+    """
+    logger.info("Automated Scraper started")
+
+    base_url = 'https://www3.nhk.or.jp'
+    initial_url = base_url + '/news/'
 
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H_%M_%S')
+    cleaned_url_list: list[str] = get_cleaned_url_list(initial_url, http_cache)
 
-    logger.info('Convert DataFrame to Parquet')
-    parquet_file_path = f'{timestamp}.parquet'
-    table = pa.Table.from_pandas(filtered_df)
-    pq.write_table(table, parquet_file_path)
+    process_batch = functools.partial(process_batch_for_dataset, archive_dir=archive_dir)
+    write_batch = functools.partial(write_to_morpheme_dataset, dataset_dir=dataset_dir)
+    rows_written = asyncio.run(run_async_pipeline(
+        cleaned_url_list, process_batch, write_batch, batch_size, http_cache=http_cache, base_url=base_url))
+    logger.info('Appended %d rows to the Parquet dataset', rows_written)
+    return rows_written
 
 
 if __name__ == '__main__':
-    start_daily_news_scraper()
+    parser = argparse.ArgumentParser(description='Scrape the news currently listed on NHK News to the Parquet dataset.')
+    parser.add_argument('--http-cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='directory of the on-disk cache of the fetched pages')
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--no-http-cache', action='store_true', help='always fetch the pages from the server')
+    cache_mode.add_argument('--offline', action='store_true',
+                            help='replay a crawl from the cache, whatever the age of the pages, without the network')
+    # The workflow uploads every Parquet file under the repository, so the archive is opt-in.
+    parser.add_argument('--archive-dir', help='directory of the raw article archive, which is off by default')
+    args = parser.parse_args()
+
+    http_cache = None if args.no_http_cache else HttpCache(args.http_cache_dir, offline=args.offline)
+    try:
+        start_daily_news_scraper(http_cache, args.archive_dir)
+    finally:
+        if http_cache is not None:
+            http_cache.close()
+    metrics.export()
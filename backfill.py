@@ -0,0 +1,51 @@
+import argparse
+
+from jp_news_scraper_pipeline.backfill import run_backfill, read_urls_from_parquet, read_urls_from_db, \
+    BackfillReport, DEFAULT_URL_PARQUET, DEFAULT_BACKFILL_DIR, DEFAULT_SHARD_SIZE, DEFAULT_BACKFILL_WORKERS
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import DEFAULT_CONCURRENCY
+from jp_news_scraper_pipeline.metrics import metrics
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+
+def start_backfill(
+        url_parquet: str = DEFAULT_URL_PARQUET,
+        sqlite_db: str | None = None,
+        backfill_dir: str = DEFAULT_BACKFILL_DIR,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        workers: int = DEFAULT_BACKFILL_WORKERS,
+        concurrency: int = DEFAULT_CONCURRENCY) -> BackfillReport:
+    """
+    Rebuild the morpheme data of the historical NHK News URLs.
+    Run it again after a crash to resume from the last completed shard.
+    :param url_parquet: Parquet file with a Url column.
+    :param sqlite_db: SQLite database file path whose NewsUrls table is read instead of the Parquet file.
+                    Default is None, which reads the Parquet file.
+    :param backfill_dir: Directory of the shard files and the merged file.
+    :param shard_size: Maximum number of URLs per shard.
+    :param workers: Number of worker processes.
+    :param concurrency: Maximum number of requests in flight in each worker.
+    :return: BackfillReport.
+    """
+    urls = read_urls_from_parquet(url_parquet) if sqlite_db is None else read_urls_from_db(sqlite_db)
+    if not urls:
+        logger.warning('No URLs to backfill.')
+    return run_backfill(urls, backfill_dir, shard_size, workers, concurrency)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild morpheme data from historical NHK News URLs in shards.')
+    parser.add_argument('--url-parquet', default=DEFAULT_URL_PARQUET, help='Parquet file with a Url column')
+    parser.add_argument('--sqlite-db', help='read the URLs from the NewsUrls table of this database instead')
+    parser.add_argument('--backfill-dir', default=DEFAULT_BACKFILL_DIR,
+                        help='directory of the shard checkpoints and the merged file')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='number of URLs per shard')
+    parser.add_argument('--workers', type=int, default=DEFAULT_BACKFILL_WORKERS, help='number of worker processes')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='maximum number of requests in flight in each worker')
+    args = parser.parse_args()
+
+    start_backfill(args.url_parquet, args.sqlite_db, args.backfill_dir, args.shard_size, args.workers,
+                   args.concurrency)
+    metrics.export()
@@ -0,0 +1,114 @@
+"""
+Measure the import time of the scraper entry points with 'python -X importtime'
+and check it against a budget, so that polling runs without new articles stay fast.
+
+Usage:
+    python -m benchmarks.import_time --budget-ms 400 main automated_news_scraper reprocess
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = ('main', 'automated_news_scraper', 'reprocess')
+
+# Import time budget of each entry point in milliseconds.
+DEFAULT_BUDGET_MS = 400
+
+# Dependencies that importing an entry point must not load. Each is imported by the first stage that needs it:
+# aiohttp and BeautifulSoup with lxml by the fetching and parsing of pages, the others by the stages after URL polling.
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'sudachipy', 'cutlet', 'fugashi', 'requests', 'aiohttp', 'bs4', 'lxml')
+
+DEFAULT_TOP = 10
+
+
+class ImportTime(NamedTuple):
+    module: str
+    # Nesting level, where 0 is a module imported by the interpreter or by the '-c' code.
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """
+    Parse the output of 'python -X importtime'.
+    :param stderr: Standard error of the Python process.
+    :return: List of import times in the order of the output, where imported modules come before their importer.
+    """
+    import_times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix('import time:').split('|')
+        # The module name is indented by two spaces per nesting level after the separating space.
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        import_times.append(ImportTime(module.strip(), depth, int(self_us), int(cumulative_us)))
+    return import_times
+
+
+def get_direct_imports(import_times: list[ImportTime], module: str) -> tuple[ImportTime, list[ImportTime]]:
+    """
+    Find the import time of a top-level module and of the modules it imports directly.
+    :param import_times: Import times from 'parse_importtime'.
+    :param module: Name of a top-level module.
+    :return: Tuple of the import time of the module and the list of its direct imports.
+    """
+    index = next(i for i, import_time in enumerate(import_times)
+                 if import_time.module == module and import_time.depth == 0)
+    direct_imports = []
+    for import_time in reversed(import_times[:index]):
+        if import_time.depth == 0:
+            break
+        if import_time.depth == 1:
+            direct_imports.append(import_time)
+    return import_times[index], direct_imports[::-1]
+
+
+def measure_import(module: str) -> tuple[list[ImportTime], list[str]]:
+    """
+    Import a module in a new Python process.
+    :param module: Module name.
+    :return: Tuple of the parsed import times and the heavy dependencies that were loaded.
+    """
+    code = (f'import sys, {module}; '
+            f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'})
+    loaded_heavy_modules = [name for name in result.stdout.strip().split(',') if name]
+    return parse_importtime(result.stderr), loaded_heavy_modules
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='entry point modules to import')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='maximum cumulative import time of each module in milliseconds')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='number of slowest imports to report')
+    args = parser.parse_args(argv)
+
+    over_budget = False
+    for module in args.modules:
+        import_times, loaded_heavy_modules = measure_import(module)
+        module_import_time, direct_imports = get_direct_imports(import_times, module)
+        total_ms = module_import_time.cumulative_us / 1000
+        status = 'ok' if total_ms <= args.budget_ms else 'OVER BUDGET'
+        print(f'{module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms) {status}')
+        if loaded_heavy_modules:
+            print(f'  heavy dependencies loaded at import: {", ".join(loaded_heavy_modules)}')
+
+        for import_time in sorted(direct_imports, key=lambda item: -item.cumulative_us)[:args.top]:
+            print(f'  {import_time.cumulative_us / 1000:>8.1f} ms  {import_time.module}')
+        over_budget |= total_ms > args.budget_ms or bool(loaded_heavy_modules)
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
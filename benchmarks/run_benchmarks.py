@@ -0,0 +1,221 @@
+"""
+Replay the recorded NHK pages in 'tests/fixtures/nhk' through a local HTTP server,
+time each stage of the pipeline and write a JSON report that can be compared between commits.
+
+Usage:
+    python -m benchmarks.run_benchmarks --repeat 50 --output benchmark_report.json
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morphemes, extract_pos, translate_pos, \
+    extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import romanize_morpheme, filter_out_pos, \
+    filter_out_non_jp_characters, add_timestamp_to_df
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import get_unique_urls, extract_text_from_url_list
+from jp_news_scraper_pipeline.jp_news_scraper.utils import warm_up_tokenizer
+from jp_news_scraper_pipeline.pipeline import load_to_sqlite
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / 'tests' / 'fixtures' / 'nhk'
+
+# Path that the recorded articles are served at, as on NHK News.
+ARTICLE_PATH_PREFIX = '/news/html/20240704/'
+
+DEFAULT_REPEAT = 20
+
+
+class FixtureServer:
+    """Local HTTP server that serves the recorded NHK pages."""
+
+    def __init__(self, fixture_dir: Path = FIXTURE_DIR):
+        """
+        :param fixture_dir: Directory with 'front_page.html' and 'article_<id>.html' files.
+        """
+        self.pages = {'/news/': (fixture_dir / 'front_page.html').read_bytes()}
+        for article_file in sorted(fixture_dir.glob('article_*.html')):
+            article_id = article_file.stem.removeprefix('article_')
+            self.pages[f'{ARTICLE_PATH_PREFIX}{article_id}.html'] = article_file.read_bytes()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def article_paths(self) -> list[str]:
+        return [path for path in self.pages if path.startswith(ARTICLE_PATH_PREFIX)]
+
+    def _make_handler(self):
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                # The query string only makes repeated articles distinct URLs.
+                body = pages.get(urlsplit(self.path).path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body or b'')))
+                self.end_headers()
+                self.wfile.write(body or b'')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def get_peak_rss_kib() -> int | None:
+    """
+    Get the peak resident set size of the current process.
+    :return: Peak RSS in KiB, or None if the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB.
+    return peak_rss // 1024 if sys.platform == 'darwin' else peak_rss
+
+
+def get_commit() -> str | None:
+    """
+    Get the commit that the benchmark runs on.
+    :return: Commit hash, or None if it is not a git checkout.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageTimer:
+    """Collect the duration and throughput of each benchmarked stage."""
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+
+    def run(self, name: str, unit: str, func, *args, items: int | None = None, **kwargs):
+        """
+        Run a stage once and record its duration.
+        :param name: Stage name.
+        :param unit: Unit of the processed items, such as 'articles' or 'morphemes'.
+        :param func: Function of the stage.
+        :param args: Positional arguments of the function.
+        :param items: Number of processed items. Default is None, which uses the length of the result.
+        :param kwargs: Keyword arguments of the function.
+        :return: Result of the function.
+        """
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        if items is None:
+            items = len(result)
+        self.stages[name] = {
+            'seconds': round(seconds, 6),
+            'items': items,
+            'unit': unit,
+            'per_second': round(items / seconds, 2) if seconds > 0 else None,
+            'peak_rss_kib': get_peak_rss_kib()
+        }
+        print(f'{name:<28} {seconds:>9.3f} s {items:>9} {unit:<10} '
+              f'{self.stages[name]["per_second"] or 0:>12.1f} {unit}/s', file=sys.stderr)
+        return result
+
+
+def run_benchmarks(repeat: int = DEFAULT_REPEAT, sqlite_db: str | None = None) -> dict:
+    """
+    Replay the recorded corpus through every stage of the pipeline.
+    :param repeat: Number of times each recorded article is fetched and processed.
+    :param sqlite_db: SQLite database file path used by the load stage.
+                    Default is None, which uses a temporary database.
+    :return: Report as a dictionary.
+    """
+    timer = StageTimer()
+    warm_up_tokenizer()
+
+    with FixtureServer() as server:
+        timer.run('get_unique_urls', 'pages', get_unique_urls, f'{server.base_url}/news/', items=1)
+        hrefs = [f'{path}?copy={copy}' for copy in range(repeat) for path in server.article_paths]
+        # The per-host rate limit protects NHK, not the local server, so it would only measure the sleeps.
+        texts = timer.run('extract_text_from_url_list', 'articles', extract_text_from_url_list, hrefs,
+                          base_url=server.base_url, min_request_interval=0, items=len(hrefs))
+
+    morphemes = timer.run('extract_morphemes', 'morphemes', extract_morphemes, texts)
+    pos_list = timer.run('extract_pos', 'morphemes', extract_pos, morphemes)
+    pos_translated_list = timer.run('translate_pos', 'morphemes', translate_pos, pos_list)
+    timer.run('extract_morpheme_records', 'morphemes', extract_morpheme_records, texts, filter_tokens=True,
+              items=len(morphemes))
+
+    romanize_morpheme.cache_clear()
+    romaji_list = timer.run('romanize_morpheme', 'morphemes', lambda: [romanize_morpheme(m) for m in morphemes])
+
+    df = pd.DataFrame({'Kanji': morphemes, 'Romanji': romaji_list, 'PartOfSpeech': pos_list,
+                       'PartOfSpeechEnglish': pos_translated_list})
+    add_timestamp_to_df(df)
+    df = timer.run('filter_out_pos', 'morphemes', filter_out_pos, df, items=len(df))
+    df = timer.run('filter_out_non_jp_characters', 'morphemes', filter_out_non_jp_characters, df, items=len(df))
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        db_path = sqlite_db or str(Path(temporary_dir) / 'benchmark.db')
+        timer.run('load_to_sqlite', 'morphemes', load_to_sqlite, df, db_path, items=len(df))
+
+    return {
+        'commit': get_commit(),
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {
+            'repeat': repeat,
+            'articles': len(hrefs),
+            'texts': len(texts),
+            'morphemes': len(morphemes)
+        },
+        'stages': timer.stages,
+        'peak_rss_kib': get_peak_rss_kib()
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='number of times each recorded article is fetched and processed')
+    parser.add_argument('--output', default='benchmark_report.json', help='path of the JSON report')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.repeat)
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'Report written to {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+from jp_news_scraper_pipeline.jp_news_scraper.parquet_dataset import compact_morpheme_dataset, DEFAULT_DATASET_DIR
+
+if __name__ == '__main__':
+    # Merge the small files that each run of 'automated_news_scraper.py' adds to the Parquet dataset.
+    # Adjust the dataset directory as needed.
+    compact_morpheme_dataset(DEFAULT_DATASET_DIR)
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, TypeVar, TYPE_CHECKING
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import archive_texts
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import iter_page_batches, DEFAULT_CONCURRENCY
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_df_from_token_buffer
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import extract_texts_from_pages, NHK_BASE_URL
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_crawl_state_table, \
+    create_text_hash_table, create_romaji_cache_table, update_crawl_status, record_crawl_error, save_text_hashes, \
+    save_romaji_to_cache, CRAWL_FETCHED, CRAWL_LOADED
+from jp_news_scraper_pipeline.jp_news_scraper.text_dedup import deduplicate_texts
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from jp_news_scraper_pipeline.metrics import metrics
+from jp_news_scraper_pipeline.pipeline import load_to_sqlite, DEFAULT_STREAM_BATCH_SIZE
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+# Maximum number of batches waiting between two stages.
+# A full queue pauses the stage before it, so that a slow stage never lets the others pile up batches in memory.
+DEFAULT_QUEUE_SIZE = 4
+
+# Result of the CPU stage of a batch, handed to the writer stage.
+T = TypeVar('T')
+
+
+class FetchedBatch(NamedTuple):
+    url_batch: list[str]
+    # HTML page of each URL of the batch. None stands for a page that could not be fetched.
+    pages: list[str | None]
+
+
+class SqliteBatch(NamedTuple):
+    url_batch: list[str]
+    # URLs of the batch with a news article.
+    fetched_urls: list[str]
+    # Rows of the batch, or None if the batch has no new morpheme.
+    df: pd.DataFrame | None
+    text_hashes: dict[bytes, str]
+    new_romaji: dict[str, str]
+
+
+async def _fetch_stage(
+        urls: list[str],
+        fetch_queue: asyncio.Queue,
+        batch_size: int,
+        concurrency: int,
+        http_cache: HttpCache | None,
+        base_url: str) -> None:
+    """
+    Fetch the pages of the URLs in batches on the event loop and put each batch on the fetch queue.
+    :return: None
+    """
+    page_batches = iter_page_batches([base_url + url for url in urls], batch_size, concurrency, cache=http_cache)
+    start = 0
+    async with contextlib.aclosing(page_batches):
+        while True:
+            with metrics.stage('fetch'):
+                page_batch = await anext(page_batches, None)
+            if page_batch is None:
+                break
+            _, pages = page_batch
+            url_batch = urls[start:start + len(pages)]
+            logger.info('Fetched URLs %d-%d of %d', start + 1, start + len(pages), len(urls))
+            start += len(pages)
+            await fetch_queue.put(FetchedBatch(url_batch, pages))
+    # None marks the end of a queue.
+    await fetch_queue.put(None)
+
+
+async def _process_stage(
+        process_batch: Callable[[list[str], list[str | None]], T],
+        fetch_queue: asyncio.Queue,
+        write_queue: asyncio.Queue,
+        executor: ThreadPoolExecutor) -> None:
+    """
+    Run the CPU-bound work of each fetched batch in the executor and put its result on the write queue.
+    :return: None
+    """
+    loop = asyncio.get_running_loop()
+    while (fetched_batch := await fetch_queue.get()) is not None:
+        result = await loop.run_in_executor(executor, process_batch, fetched_batch.url_batch, fetched_batch.pages)
+        await write_queue.put(result)
+    await write_queue.put(None)
+
+
+async def _write_stage(
+        write_batch: Callable[[T], int],
+        write_queue: asyncio.Queue,
+        executor: ThreadPoolExecutor) -> int:
+    """
+    Write each processed batch in the writer's own thread, one batch at a time.
+    :return: Number of written rows.
+    """
+    loop = asyncio.get_running_loop()
+    rows_written = 0
+    while (result := await write_queue.get()) is not None:
+        rows_written += await loop.run_in_executor(executor, write_batch, result)
+        logger.info('%d rows written so far', rows_written)
+    return rows_written
+
+
+async def run_async_pipeline(
+        urls: list[str],
+        process_batch: Callable[[list[str], list[str | None]], T],
+        write_batch: Callable[[T], int],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        http_cache: HttpCache | None = None,
+        base_url: str = NHK_BASE_URL) -> int:
+    """
+    Run the fetch, CPU and write stages of a pipeline concurrently, connected by bounded queues.
+    The pages are fetched on the event loop, while the CPU stage works on the batch fetched before
+    and the writer saves the batch processed before that,
+    so that a run takes about as long as its slowest stage rather than the sum of the stages.
+    Each of the CPU and write stages runs in its own thread, one batch at a time and in fetch order.
+    The first error of any stage cancels the others and is raised.
+    :param urls: URLs relative to the base URL.
+    :param process_batch: Function that turns the URL batch and its pages into the result to write,
+                        such as parsing, tokenizing and romanizing.
+    :param write_batch: Function that writes a result and returns the number of written rows.
+    :param batch_size: Number of URLs fetched per batch.
+    :param queue_size: Maximum number of batches waiting between two stages.
+    :param concurrency: Maximum number of requests in flight.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param base_url: URL that the URLs are relative to.
+                    Default is NHK's URL.
+    :return: Number of written rows.
+    """
+    fetch_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='process') as process_executor, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix='writer') as writer_executor:
+        tasks = [
+            asyncio.create_task(_fetch_stage(urls, fetch_queue, batch_size, concurrency, http_cache, base_url)),
+            asyncio.create_task(_process_stage(process_batch, fetch_queue, write_queue, process_executor)),
+            asyncio.create_task(_write_stage(write_batch, write_queue, writer_executor)),
+        ]
+        try:
+            *_, rows_written = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return rows_written
+
+
+def process_batch_for_sqlite(
+        url_batch: list[str],
+        pages: list[str | None],
+        sqlite_db: str,
+        archive_dir: str | None = None,
+        deduplicate: bool = True,
+        pending_hashes: set[bytes] | None = None) -> SqliteBatch:
+    """
+    Parse, archive, deduplicate, tokenize, filter and romanize a fetched batch.
+    The database is only read, so that the writer stage is its only writer.
+    :param url_batch: URLs of the batch.
+    :param pages: HTML page of each URL, in the same order.
+    :param sqlite_db: SQLite database file path.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :param deduplicate: Whether to skip the articles and paragraphs that were already loaded.
+                        Default is True.
+    :param pending_hashes: Hashes of the texts of the earlier batches of the run,
+                        which receives those of this batch.
+                        Default is None, which only looks up the TextHashes table.
+    :return: SqliteBatch.
+    """
+    with metrics.stage('parse'):
+        texts_by_url = extract_texts_from_pages(url_batch, pages)
+    if archive_dir is not None:
+        with metrics.stage('archive'):
+            archive_texts(texts_by_url, archive_dir)
+    fetched_urls = list(texts_by_url)
+
+    with contextlib.closing(sqlite3.connect(sqlite_db)) as conn:
+        new_text_hashes = {}
+        if deduplicate:
+            texts_by_url, new_text_hashes = deduplicate_texts(conn, texts_by_url, pending_hashes)
+            if pending_hashes is not None:
+                pending_hashes.update(new_text_hashes)
+        text_list = [text for texts in texts_by_url.values() for text in texts]
+        with metrics.stage('tokenize'):
+            token_buffer = TokenBuffer.from_records(extract_morpheme_records(text_list, filter_tokens=True))
+        if not len(token_buffer):
+            return SqliteBatch(url_batch, fetched_urls, None, new_text_hashes, {})
+
+        new_romaji = {}
+        with metrics.stage('transform'):
+            df = create_df_from_token_buffer(token_buffer, conn, new_romaji)
+    return SqliteBatch(url_batch, fetched_urls, df, new_text_hashes, new_romaji)
+
+
+def write_batch_to_sqlite(batch: SqliteBatch, sqlite_db: str) -> int:
+    """
+    Write a processed batch to the database and record the crawl status of its URLs.
+    A URL is marked as loaded in the same transaction as its rows.
+    :param batch: SqliteBatch.
+    :param sqlite_db: SQLite database file path.
+    :return: Number of rows written to the database.
+    """
+    with contextlib.closing(sqlite3.connect(sqlite_db)) as conn:
+        with conn:
+            update_crawl_status(conn, batch.fetched_urls, CRAWL_FETCHED, count_attempt=True)
+            record_crawl_error(conn, [url for url in batch.url_batch if url not in batch.fetched_urls],
+                               'No news article found', count_attempt=True)
+            if batch.new_romaji:
+                save_romaji_to_cache(conn, batch.new_romaji)
+
+        if batch.df is None:
+            with conn:
+                update_crawl_status(conn, batch.fetched_urls, CRAWL_LOADED)
+                save_text_hashes(conn, batch.text_hashes)
+            return 0
+
+        try:
+            load_to_sqlite(batch.df, sqlite_db, loaded_urls=batch.fetched_urls, text_hashes=batch.text_hashes)
+        except Exception as e:
+            with conn:
+                record_crawl_error(conn, batch.fetched_urls, repr(e))
+            raise
+    return len(batch.df)
+
+
+def stream_data_to_sqlite_async(
+        new_urls: list[str],
+        sqlite_db: str,
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = None,
+        deduplicate: bool = True,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY) -> int:
+    """
+    Stream the new URLs to SQLite database like 'stream_data_to_sqlite',
+    but fetch the next batches while the earlier ones are tokenized, romanized and written.
+    The CPU stage only reads the database, and every write goes through the writer stage.
+    :param new_urls: New URL list.
+    :param sqlite_db: SQLite database file path.
+    :param batch_size: Number of URLs that flow through the pipeline together.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :param deduplicate: Whether to skip the articles and paragraphs that were already loaded.
+                        Default is True.
+    :param queue_size: Maximum number of batches waiting between two stages.
+    :param concurrency: Maximum number of requests in flight.
+    :return: Number of rows written to the database.
+    """
+    logger.info('Streaming data from new URLs list to SQLite database with overlapping stages...')
+    with contextlib.closing(sqlite3.connect(sqlite_db)) as conn:
+        with conn:
+            create_crawl_state_table(conn)
+            create_text_hash_table(conn)
+            create_romaji_cache_table(conn)
+
+    process_batch = functools.partial(process_batch_for_sqlite, sqlite_db=sqlite_db, archive_dir=archive_dir,
+                                      deduplicate=deduplicate, pending_hashes=set())
+    write_batch = functools.partial(write_batch_to_sqlite, sqlite_db=sqlite_db)
+    return asyncio.run(run_async_pipeline(
+        new_urls, process_batch, write_batch, batch_size, queue_size, concurrency, http_cache))
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple, TYPE_CHECKING
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import DEFAULT_CONCURRENCY, fetch_pages
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_df_from_token_buffer
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import extract_texts_from_pages, NHK_BASE_URL
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import fetch_exist_url_from_db
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from jp_news_scraper_pipeline.metrics import metrics, MetricsSnapshot
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+DEFAULT_URL_PARQUET = 'data/news_url_data_from_nhk_as_of_2024-07-04.parquet'
+
+DEFAULT_BACKFILL_DIR = 'data/backfill'
+
+# Number of URLs fetched and tokenized together by a worker, and checkpointed as one file.
+DEFAULT_SHARD_SIZE = 32
+
+# Number of worker processes. Each worker rate-limits its own requests,
+# so the request rate to NHK grows with the number of workers.
+DEFAULT_BACKFILL_WORKERS = 4
+
+BACKFILL_COMPRESSION = 'zstd'
+
+# File name of the merged morpheme data in the backfill directory.
+MERGED_FILE_NAME = 'morphemes.parquet'
+
+
+class BackfillShard(NamedTuple):
+    index: int
+    urls: list[str]
+    # TimeStamp of each URL, in the same order. None stands for a URL without a known TimeStamp.
+    timestamps: list[str | None]
+    # Checkpoint file of the shard, which only exists once the shard is complete.
+    path: Path
+
+
+class ShardFetchError(Exception):
+    """Raised when some URLs of a shard could not be fetched, so that the shard is retried by the next run."""
+
+    def __init__(self, index: int, failed_urls: list[str]):
+        """
+        :param index: Index of the shard.
+        :param failed_urls: URLs that could not be fetched.
+        """
+        super().__init__(f'{len(failed_urls)} URLs of shard {index} could not be fetched')
+        self.index = index
+        self.failed_urls = failed_urls
+
+
+class ShardResult(NamedTuple):
+    index: int
+    url_count: int
+    article_count: int
+    token_count: int
+    seconds: float
+
+
+class BackfillReport(NamedTuple):
+    shard_count: int
+    # Shards processed by this run, and shards skipped because a previous run completed them.
+    completed_shards: int
+    skipped_shards: int
+    failed_shards: int
+    url_count: int
+    token_count: int
+    seconds: float
+    # Path of the merged file. None if a shard failed and the merge was skipped.
+    merged_path: Path | None
+
+    @property
+    def urls_per_second(self) -> float:
+        return self.url_count / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.token_count / self.seconds if self.seconds else 0.0
+
+
+def read_urls_from_parquet(url_parquet: str | os.PathLike = DEFAULT_URL_PARQUET) -> dict[str, str | None]:
+    """
+    Read the hrefs of a URL Parquet file, such as the historical NHK News URL data, with the time they were collected.
+    :param url_parquet: Parquet file with a Url column and an optional TimeStamp column.
+    :return: Dictionary where key is the URL and value is the TimeStamp of its first row, or None without one,
+            in the order of the file.
+    """
+    import pyarrow.parquet as pq
+
+    logger.info('Read URLs from %s', url_parquet)
+    table = pq.read_table(url_parquet)
+    urls = table.column('Url').to_pylist()
+    timestamps = table.column('TimeStamp').to_pylist() if 'TimeStamp' in table.column_names else [None] * len(urls)
+    url_timestamps = {}
+    for url, timestamp in zip(urls, timestamps):
+        if url and url not in url_timestamps:
+            url_timestamps[url] = timestamp
+    return url_timestamps
+
+
+def read_urls_from_db(sqlite_db: str) -> dict[str, str]:
+    """
+    Read the hrefs of the NewsUrls table with the time they were collected.
+    :param sqlite_db: SQLite database file path.
+    :return: Dictionary where key is the URL and value is its TimeStamp,
+            sorted by URL so that the shards are the same on every run.
+    """
+    with sqlite3.connect(sqlite_db) as conn:
+        return dict(conn.execute('SELECT Url, TimeStamp FROM NewsUrls ORDER BY Url'))
+
+
+def get_shard_path(shard_dir: Path, index: int, urls: list[str], timestamps: list[str | None]) -> Path:
+    """
+    Get the checkpoint file path of a shard.
+    The name includes a digest of the shard's URLs and TimeStamps,
+    so that a checkpoint is not reused after the URL source or the shard size changes.
+    :param shard_dir: Directory of the shard files.
+    :param index: Index of the shard.
+    :param urls: URLs of the shard.
+    :param timestamps: TimeStamp of each URL.
+    :return: File path.
+    """
+    lines = (f'{url}\t{timestamp or ""}' for url, timestamp in zip(urls, timestamps))
+    digest = hashlib.blake2b('\n'.join(lines).encode('utf-8'), digest_size=8).hexdigest()
+    return shard_dir / f'shard-{index:05d}-{digest}.parquet'
+
+
+def split_into_shards(
+        urls: list[str],
+        shard_dir: Path,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        timestamps: dict[str, str | None] | None = None) -> list[BackfillShard]:
+    """
+    Split the URL list into consecutive shards.
+    :param urls: URL list.
+    :param shard_dir: Directory of the shard files.
+    :param shard_size: Maximum number of URLs per shard.
+    :param timestamps: Dictionary where key is the URL and value is its TimeStamp.
+                    Default is None, which stamps the rows with the time of the merge.
+    :return: List of shards.
+    """
+    timestamps = timestamps or {}
+    shards = []
+    for index, start in enumerate(range(0, len(urls), shard_size)):
+        shard_urls = urls[start:start + shard_size]
+        shard_timestamps = [timestamps.get(url) for url in shard_urls]
+        shards.append(BackfillShard(index, shard_urls, shard_timestamps,
+                                    get_shard_path(shard_dir, index, shard_urls, shard_timestamps)))
+    return shards
+
+
+def write_table_atomically(table: pa.Table, path: Path) -> None:
+    """
+    Write a table to a Parquet file under a temporary name and rename it into place,
+    so that a crash never leaves a partial file at the path.
+    :param table: PyArrow table.
+    :param path: File path.
+    :return: None
+    """
+    import pyarrow.parquet as pq
+
+    temporary_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    pq.write_table(table, temporary_path, compression=BACKFILL_COMPRESSION, use_dictionary=True)
+    temporary_path.replace(path)
+
+
+def process_shard(shard: BackfillShard, concurrency: int = DEFAULT_CONCURRENCY) -> ShardResult:
+    """
+    Fetch and tokenize the URLs of a shard,
+    and write its tokens with the TimeStamp of their URL to the shard's checkpoint file.
+    :param shard: Shard.
+    :param concurrency: Maximum number of requests in flight.
+    :return: ShardResult.
+    :raises ShardFetchError: If some URLs could not be fetched, in which case no checkpoint file is written.
+    """
+    import pyarrow as pa
+
+    start = time.perf_counter()
+    with metrics.stage('fetch'):
+        pages = fetch_pages([NHK_BASE_URL + url for url in shard.urls], concurrency=concurrency)
+        failed_urls = [url for url, page in zip(shard.urls, pages) if page is None]
+        if failed_urls:
+            raise ShardFetchError(shard.index, failed_urls)
+        texts_by_url = extract_texts_from_pages(shard.urls, pages)
+    timestamp_by_url = dict(zip(shard.urls, shard.timestamps))
+    token_buffer = TokenBuffer()
+    timestamps = []
+    with metrics.stage('tokenize'):
+        for url, texts in texts_by_url.items():
+            token_count = len(token_buffer)
+            token_buffer.extend_records(extract_morpheme_records(texts, filter_tokens=True))
+            timestamps += [timestamp_by_url.get(url)] * (len(token_buffer) - token_count)
+    table = token_buffer.to_arrow().append_column(
+        'TimeStamp', pa.array(timestamps, pa.string()).dictionary_encode())
+    # A shard whose pages were all fetched but have no article text is written too, so that it is not fetched again.
+    write_table_atomically(table, shard.path)
+    return ShardResult(shard.index, len(shard.urls), len(texts_by_url), len(token_buffer),
+                       time.perf_counter() - start)
+
+
+def _process_shard_in_worker(
+        shard: BackfillShard,
+        concurrency: int = DEFAULT_CONCURRENCY) -> tuple[ShardResult, MetricsSnapshot]:
+    """
+    Process a shard in a worker process.
+    :param shard: Shard.
+    :param concurrency: Maximum number of requests in flight.
+    :return: Tuple of the ShardResult and the snapshot of the shard's metrics, to be merged into the parent's registry.
+    """
+    # The worker's registry only holds the metrics of the current shard.
+    metrics.reset()
+    result = process_shard(shard, concurrency)
+    return result, metrics.snapshot()
+
+
+def merge_shards(shards: list[BackfillShard], merged_path: Path) -> int:
+    """
+    Merge the token files of the shards into a single Parquet file of morpheme data.
+    The morphemes of all shards are romanized once, after they share a string table.
+    Each row keeps the TimeStamp of its URL, and the rows of URLs without one get the time of the merge.
+    :param shards: Completed shards, in order.
+    :param merged_path: File path of the merged data.
+    :return: Number of merged rows.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    logger.info('Merge %d shards into %s', len(shards), merged_path)
+    token_buffer = TokenBuffer()
+    timestamp_chunks = []
+    for shard in shards:
+        table = pq.read_table(shard.path)
+        token_buffer.extend(TokenBuffer.from_arrow(table))
+        if 'TimeStamp' in table.column_names:
+            timestamp_chunks += table.column('TimeStamp').cast(pa.string()).chunks
+        else:
+            timestamp_chunks.append(pa.nulls(table.num_rows, pa.string()))
+
+    merged_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    timestamps = pc.fill_null(pa.chunked_array(timestamp_chunks, pa.string()), merged_at)
+    df = create_df_from_token_buffer(token_buffer)
+    df['TimeStamp'] = timestamps.dictionary_encode().to_pandas()
+    write_table_atomically(pa.Table.from_pandas(df, preserve_index=False), merged_path)
+    return len(df)
+
+
+def _log_shard_result(result: ShardResult, done: int, total: int) -> None:
+    """
+    Log the throughput of a completed shard.
+    :param result: ShardResult.
+    :param done: Number of shards done so far, including skipped ones.
+    :param total: Number of shards.
+    :return: None
+    """
+    metrics.increment('backfill_shards_completed_total')
+    metrics.observe('backfill_shard_seconds', result.seconds)
+    logger.info('Shard %d done (%d/%d): %d URLs, %d articles, %d tokens in %.1f s',
+                result.index, done, total, result.url_count, result.article_count, result.token_count,
+                result.seconds)
+
+
+def run_backfill(
+        urls: list[str] | dict[str, str | None],
+        backfill_dir: str | os.PathLike = DEFAULT_BACKFILL_DIR,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        workers: int = DEFAULT_BACKFILL_WORKERS,
+        concurrency: int = DEFAULT_CONCURRENCY) -> BackfillReport:
+    """
+    Fetch and tokenize the URLs in shards across worker processes, then merge the shards into a single file.
+    Each completed shard is checkpointed as a file, so that a run after a crash only processes the missing shards.
+    :param urls: URL list, or dictionary where key is the URL and value is the TimeStamp that its rows get,
+                such as from 'read_urls_from_parquet'.
+    :param backfill_dir: Directory of the shard files and the merged file.
+    :param shard_size: Maximum number of URLs per shard.
+    :param workers: Number of worker processes. 1 processes the shards in this process.
+    :param concurrency: Maximum number of requests in flight in each worker.
+    :return: BackfillReport.
+    """
+    start = time.perf_counter()
+    backfill_dir = Path(backfill_dir)
+    shard_dir = backfill_dir / 'shards'
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    timestamps = urls if isinstance(urls, dict) else None
+    urls = list(urls)
+    shards = split_into_shards(urls, shard_dir, shard_size, timestamps)
+    pending_shards = [shard for shard in shards if not shard.path.exists()]
+    skipped_shards = len(shards) - len(pending_shards)
+    metrics.increment('backfill_shards_skipped_total', skipped_shards)
+    logger.info('Backfill %d URLs in %d shards: %d already done, %d to process with %d workers',
+                len(urls), len(shards), skipped_shards, len(pending_shards), workers)
+
+    results = []
+    failed_shards = 0
+    if workers <= 1:
+        for shard in pending_shards:
+            try:
+                result = process_shard(shard, concurrency)
+            except Exception:
+                logger.exception('Shard %d failed', shard.index)
+                failed_shards += 1
+                continue
+            results.append(result)
+            _log_shard_result(result, skipped_shards + len(results), len(shards))
+    elif pending_shards:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_process_shard_in_worker, shard, concurrency): shard
+                       for shard in pending_shards}
+            for future in as_completed(futures):
+                try:
+                    result, shard_metrics = future.result()
+                except Exception:
+                    logger.exception('Shard %d failed', futures[future].index)
+                    failed_shards += 1
+                    continue
+                metrics.merge(shard_metrics)
+                results.append(result)
+                _log_shard_result(result, skipped_shards + len(results), len(shards))
+
+    url_count = sum(result.url_count for result in results)
+    token_count = sum(result.token_count for result in results)
+    merged_path = None
+    if failed_shards:
+        metrics.increment('backfill_shards_failed_total', failed_shards)
+        logger.warning('%d shards failed. Run the backfill again to retry them before merging.', failed_shards)
+    else:
+        merged_path = backfill_dir / MERGED_FILE_NAME
+        with metrics.stage('backfill_merge'):
+            merge_shards(shards, merged_path)
+
+    report = BackfillReport(len(shards), len(results), skipped_shards, failed_shards,
+                            url_count, token_count, time.perf_counter() - start, merged_path)
+    logger.info('Backfilled %d URLs into %d tokens in %.1f s: %.2f URLs/s, %.0f tokens/s',
+                report.url_count, report.token_count, report.seconds,
+                report.urls_per_second, report.tokens_per_second)
+    return report
+
+
+if __name__ == '__main__':
+    pass
@@ -1,9 +1,30 @@
+import atexit
 import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Define a custom log format
+LOG_FORMAT = '%(asctime)s | %(filename)s | line:%(lineno)d | %(funcName)s | %(levelname)s | %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Queue listeners of the loggers configured in this process, by logger name.
+_listeners: dict[str, QueueListener] = {}
+
+# Arguments of 'configure_logging_with_file' of the loggers configured in this process, by logger name,
+# so that a forked child process can configure them again with its own listener thread.
+_file_logging_kwargs: dict[str, dict] = {}
+
+# Whether this process was forked from a process that configured logging.
+_is_forked_child = False
 
 
 def configure_logging(logger: logging.Logger = None, logger_name: str = 'root', level: str = 'DEBUG') -> None | logging.Logger:
     """
     Configure logging for the specified logger or get the root logger by default.
+    The logger is only configured on the first call in this process; later calls return it as it is.
     :param logger: Logger to configure.
                     Default is None, which will get the root logger if 'logger_name' is not specified.
     :param logger_name: Specify logger name.
@@ -15,37 +36,14 @@ def configure_logging(logger: logging.Logger = None, logger_name: str = 'root',
     if logger is None:
         logger = logging.getLogger(logger_name)
 
-    # Clear existing handlers for this logger to avoid duplicate logs
-    if logger.hasHandlers():
-        logger.handlers.clear()
-
-    # Set the logging level
-    if level == 'DEBUG':
-        logger.setLevel(logging.DEBUG)
-    elif level == 'INFO':
-        logger.setLevel(logging.INFO)
-    elif level == 'WARNING':
-        logger.setLevel(logging.WARNING)
-    elif level == 'ERROR':
-        logger.setLevel(logging.ERROR)
-    elif level == 'CRITICAL':
-        logger.setLevel(logging.CRITICAL)
-
-    # Define a custom log format
-    log_format = '%(asctime)s | %(filename)s | line:%(lineno)d | %(funcName)s | %(levelname)s | %(message)s'
+    if logger.name in _listeners:
+        return logger
 
     # Create a StreamHandler (which outputs to the terminal)
     stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
 
-    # Create a Formatter with the custom log format
-    formatter = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
-
-    # Set the Formatter for the StreamHandler
-    stream_handler.setFormatter(formatter)
-
-    # Add the StreamHandler to the root logger
-    logger.addHandler(stream_handler)
-
+    _attach_queue_handler(logger, level, [stream_handler])
     return logger
 
 
@@ -57,7 +55,10 @@ def configure_logging_with_file(
         print_on_terminal: bool = True) -> None | logging.Logger:
     """
     Configure logging with a log file for the specified logger or get the root logger by default.
+    The logger is only configured on the first call in this process; later calls return it as it is,
+    so that every module can call this function at import time without reopening the log file.
     :param log_file: Log file name.
+                    It is overwritten by the main process and appended to by its worker processes.
     :param logger: Logger to configure.
                     Default is None, which will get the root logger if 'logger_name' is not specified.
     :param logger_name: Specify logger name.
@@ -71,43 +72,107 @@ def configure_logging_with_file(
     if logger is None:
         logger = logging.getLogger(logger_name)
 
+    if logger.name in _listeners:
+        return logger
+
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+
+    # The main process starts a new log file, which its worker processes must not truncate.
+    # Every process then appends, so that their lines do not overwrite each other.
+    if not _is_child_process():
+        open(log_file, 'w').close()
+    file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    handlers: list[logging.Handler] = [file_handler]
+
+    if print_on_terminal:
+        # Define a StreamHandler (which outputs to the terminal)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.insert(0, stream_handler)
+
+    _attach_queue_handler(logger, level, handlers)
+    _file_logging_kwargs[logger.name] = {
+        'log_file': log_file, 'level': level, 'print_on_terminal': print_on_terminal}
+    return logger
+
+
+def _attach_queue_handler(logger: logging.Logger, level: str, handlers: list[logging.Handler]) -> None:
+    """
+    Make the logger put its records on a queue, which a listener thread writes to the handlers,
+    so that the calling thread never waits for the terminal or the log file.
+    :param logger: Logger to configure.
+    :param level: Logging level.
+    :param handlers: Handlers that the listener thread writes the records to.
+    :return: None
+    """
     # Clear existing handlers for this logger to avoid duplicate logs
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    # Set the logging level
-    if level == 'DEBUG':
-        logger.setLevel(logging.DEBUG)
-    elif level == 'INFO':
-        logger.setLevel(logging.INFO)
-    elif level == 'WARNING':
-        logger.setLevel(logging.WARNING)
-    elif level == 'ERROR':
-        logger.setLevel(logging.ERROR)
-    elif level == 'CRITICAL':
-        logger.setLevel(logging.CRITICAL)
+    logger.setLevel(level)
 
-    # Define a custom log format
-    log_format = '%(asctime)s | %(filename)s | line:%(lineno)d | %(funcName)s | %(levelname)s | %(message)s'
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger.name] = listener
 
-    # Create a FileHandler to write logs to the specified file in overwrite mode
-    file_handler = logging.FileHandler(log_file, mode='w')  # 'w' for write mode (overwrite)
 
-    # Create a Formatter with the custom log format
-    formatter = logging.Formatter(log_format, datefmt='%Y-%m-%d %H:%M:%S')
+def _is_child_process() -> bool:
+    """
+    Check if this is a worker process, such as one of a ProcessPoolExecutor.
+    The process name is already set while a spawned worker imports the modules,
+    while a forked worker is flagged by '_configure_logging_after_fork'.
+    :return: True if this is a worker process, False otherwise.
+    """
+    return _is_forked_child or multiprocessing.current_process().name != 'MainProcess'
 
-    # Set the Formatter for the FileHandler
-    file_handler.setFormatter(formatter)
 
-    if print_on_terminal:
-        # Define a StreamHandler (which outputs to the terminal)
-        stream_handler = logging.StreamHandler()
-        # Set the Formatter for the StreamHandler
-        stream_handler.setFormatter(formatter)
-        # Add the StreamHandler to the root logger
-        logger.addHandler(stream_handler)
+def stop_logging(logger_name: str | None = None) -> None:
+    """
+    Write the queued records and stop the listener threads of the loggers configured in this process.
+    :param logger_name: Name of the logger to stop.
+                        Default is None, which stops every logger.
+    :return: None
+    """
+    logger_names = list(_listeners) if logger_name is None else [logger_name]
+    for name in logger_names:
+        listener = _listeners.pop(name, None)
+        if listener is None:
+            continue
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        logging.getLogger(name).handlers.clear()
+        _file_logging_kwargs.pop(name, None)
+
+
+def _configure_logging_after_fork() -> None:
+    """
+    Give the loggers of a forked child process their own listener thread,
+    because the threads of the parent process do not exist in the child.
+    :return: None
+    """
+    global _is_forked_child
+    _is_forked_child = True
+    _listeners.clear()
+    for logger_name, kwargs in list(_file_logging_kwargs.items()):
+        logging.getLogger(logger_name).handlers.clear()
+        configure_logging_with_file(logger_name=logger_name, **kwargs)
 
-    # Add both the FileHandler to the logger
-    logger.addHandler(file_handler)
 
-    return logger
+def _stop_logging_on_worker_exit(stop_logging_func) -> None:
+    """
+    Stop logging when a worker process exits,
+    because worker processes leave with 'os._exit', which skips the 'atexit' handlers.
+    :param stop_logging_func: Function that stops logging.
+    :return: None
+    """
+    multiprocessing.util.Finalize(None, stop_logging_func, exitpriority=0)
+
+
+atexit.register(stop_logging)
+multiprocessing.util.register_after_fork(stop_logging, _stop_logging_on_worker_exit)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_configure_logging_after_fork)
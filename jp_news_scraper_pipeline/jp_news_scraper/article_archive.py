@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import datetime
+import functools
+import os
+import uuid
+from pathlib import Path
+from typing import Iterator, NamedTuple, TYPE_CHECKING
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+
+if TYPE_CHECKING:
+    # PyArrow is imported on first use, so that runs without new articles do not load it.
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+DEFAULT_ARCHIVE_DIR = 'data/article_archive'
+
+ARCHIVE_COMPRESSION = 'zstd'
+
+# Number of archived texts that flow through the reprocessing pipeline together.
+DEFAULT_ARCHIVE_BATCH_SIZE = 256
+
+
+class ArchivedBatch(NamedTuple):
+    # Time when the articles of the batch were fetched.
+    fetched_at: datetime.datetime
+    # Archived texts of each article of the batch, by URL.
+    texts_by_url: dict[str, list[str]]
+
+
+@functools.cache
+def get_archive_schema() -> pa.Schema:
+    """
+    Get the schema of the archive.
+    :return: PyArrow schema with url, fetched_at, text and date columns.
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        ('url', pa.string()),
+        ('fetched_at', pa.timestamp('s')),
+        ('text', pa.string()),
+        ('date', pa.string()),
+    ])
+
+
+@functools.cache
+def get_archive_partitioning() -> ds.Partitioning:
+    """
+    Get the partitioning of the archive.
+    The archive is partitioned by the day the articles were fetched, as in 'date=2024-07-04/'.
+    :return: PyArrow hive partitioning on the date column.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+
+def archive_texts(
+        texts_by_url: dict[str, list[str]],
+        archive_dir: str | os.PathLike = DEFAULT_ARCHIVE_DIR,
+        fetched_at: datetime.datetime | None = None) -> int:
+    """
+    Append the raw texts of news articles to the archive,
+    so that they can be tokenized again later without crawling NHK.
+    :param texts_by_url: Dictionary where key is the href and value is the list of its extracted texts.
+    :param archive_dir: Directory of the archive.
+    :param fetched_at: Time when the articles were fetched.
+                    Default is None, which uses the current time.
+    :return: Number of archived texts.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = [(url, text) for url, texts in texts_by_url.items() for text in texts]
+    if not rows:
+        logger.warning('No texts to archive')
+        return 0
+
+    if fetched_at is None:
+        fetched_at = datetime.datetime.now()
+    fetched_at = fetched_at.replace(microsecond=0)
+
+    logger.info('Archive %d texts to %s', len(rows), archive_dir)
+    urls, texts = zip(*rows)
+    table = pa.Table.from_pydict({
+        'url': list(urls),
+        'fetched_at': [fetched_at] * len(rows),
+        'text': list(texts),
+        'date': [fetched_at.strftime('%Y-%m-%d')] * len(rows),
+    }, schema=get_archive_schema())
+    pq.write_to_dataset(
+        table,
+        archive_dir,
+        partitioning=get_archive_partitioning(),
+        # The file names start with the fetch time, so that reading them in path order replays the fetches in order.
+        basename_template=f'{fetched_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        compression=ARCHIVE_COMPRESSION)
+    return len(rows)
+
+
+def open_archive(archive_dir: str | os.PathLike = DEFAULT_ARCHIVE_DIR) -> ds.Dataset:
+    """
+    Open the archive as a PyArrow dataset.
+    :param archive_dir: Directory of the archive.
+    :return: PyArrow dataset.
+    """
+    import pyarrow.dataset as ds
+
+    return ds.dataset(archive_dir, schema=get_archive_schema(), format='parquet',
+                      partitioning=get_archive_partitioning())
+
+
+def build_date_filter(since: str | None = None, until: str | None = None) -> ds.Expression | None:
+    """
+    Build a filter expression on the date partition.
+    :param since: First day to include, as 'YYYY-MM-DD'.
+                Default is None, which has no lower bound.
+    :param until: Last day to include, as 'YYYY-MM-DD'.
+                Default is None, which has no upper bound.
+    :return: PyArrow filter expression, or None if there is no bound.
+    """
+    import pyarrow.dataset as ds
+
+    expression = None
+    if since is not None:
+        expression = ds.field('date') >= since
+    if until is not None:
+        upper_bound = ds.field('date') <= until
+        expression = upper_bound if expression is None else expression & upper_bound
+    return expression
+
+
+def iter_archived_batches(
+        archive_dir: str | os.PathLike = DEFAULT_ARCHIVE_DIR,
+        batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE,
+        since: str | None = None,
+        until: str | None = None) -> Iterator[ArchivedBatch]:
+    """
+    Read the archived articles in the order they were fetched, in batches that share a fetch time,
+    skipping the date partitions outside the given range.
+    The texts of an article are never split across batches, so a batch can go over the batch size by one article.
+    :param archive_dir: Directory of the archive.
+    :param batch_size: Number of texts after which a batch is closed at the next article.
+    :param since: First day to include, as 'YYYY-MM-DD'.
+                Default is None, which has no lower bound.
+    :param until: Last day to include, as 'YYYY-MM-DD'.
+                Default is None, which has no upper bound.
+    :return: Iterator of ArchivedBatch.
+    """
+    if not Path(archive_dir).exists():
+        logger.warning('Archive %s does not exist', archive_dir)
+        return
+
+    import pyarrow.dataset as ds
+
+    dataset = open_archive(archive_dir)
+    fragments = sorted(dataset.get_fragments(filter=build_date_filter(since, until)),
+                       key=lambda fragment: fragment.path)
+    fetched_at = None
+    texts_by_url: dict[str, list[str]] = {}
+    text_count = 0
+    for fragment in fragments:
+        scanner = ds.Scanner.from_fragment(
+            fragment, schema=dataset.schema, columns=['url', 'fetched_at', 'text'], batch_size=batch_size)
+        for record_batch in scanner.to_batches():
+            columns = (record_batch.column(name).to_pylist() for name in ('url', 'fetched_at', 'text'))
+            for url, row_fetched_at, text in zip(*columns):
+                is_new_article = url not in texts_by_url
+                if texts_by_url and (row_fetched_at != fetched_at or (is_new_article and text_count >= batch_size)):
+                    yield ArchivedBatch(fetched_at, texts_by_url)
+                    texts_by_url, text_count = {}, 0
+                fetched_at = row_fetched_at
+                texts_by_url.setdefault(url, []).append(text)
+                text_count += 1
+    if texts_by_url:
+        yield ArchivedBatch(fetched_at, texts_by_url)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import time
+from typing import AsyncIterator, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache
+from jp_news_scraper_pipeline.metrics import metrics
+
+if TYPE_CHECKING:
+    # aiohttp is imported when the first session is opened, so that importing the entry points does not load it.
+    import aiohttp
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+# Maximum number of requests in flight at once, which is also the size of the connection pool.
+DEFAULT_CONCURRENCY = 8
+
+# Total timeout of a single request in seconds.
+DEFAULT_TIMEOUT = 30.0
+
+# Number of retries after the first attempt fails with a connection error, a timeout or a retryable status.
+DEFAULT_RETRIES = 3
+
+# Base delay in seconds of the exponential backoff between retries.
+DEFAULT_BACKOFF = 0.5
+
+# Minimum interval in seconds between the start of two requests to the same host.
+DEFAULT_MIN_REQUEST_INTERVAL = 0.1
+
+# Maximum delay in seconds taken from a Retry-After header, so that a single URL never stalls a run for long.
+MAX_RETRY_AFTER = 120.0
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Statuses whose Retry-After header tells how long to wait before retrying.
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+
+
+class RetryableStatusError(Exception):
+    """Raised when the server answers with a status that is worth retrying."""
+
+    def __init__(self, status: int, retry_after: float | None = None):
+        """
+        :param status: HTTP status.
+        :param retry_after: Delay in seconds asked by the server before retrying, or None if it asked for none.
+        """
+        super().__init__(f'status {status}')
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a Retry-After header, given either as a number of seconds or as an HTTP date.
+    :param value: Header value.
+    :return: Delay in seconds, capped by MAX_RETRY_AFTER, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        delay = float(value)
+    else:
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            return None
+        delay = retry_at.timestamp() - time.time()
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+class HostRateLimiter:
+    """Space out the start of requests to the same host by a minimum interval."""
+
+    def __init__(self, min_interval: float):
+        """
+        :param min_interval: Minimum interval in seconds between two requests to the same host.
+        """
+        self.min_interval = min_interval
+        self._next_slot: dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        """
+        Wait until a request to the host of the given URL is allowed.
+        :param url: URL to request.
+        :return: None
+        """
+        if self.min_interval <= 0:
+            return
+
+        host = urlsplit(url).netloc
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def fetch_text(
+        session: aiohttp.ClientSession,
+        url: str,
+        semaphore: asyncio.Semaphore,
+        rate_limiter: HostRateLimiter,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        cache: HttpCache | None = None) -> str | None:
+    """
+    Fetch the text of a URL, retrying with exponential backoff, or after the delay of a Retry-After header.
+    The rate limiter is waited on before taking a connection slot, so that waiting requests hold no slot.
+    The cache's SQLite index and body files are accessed in worker threads, so that they never block the event loop.
+    The latency of each request, the number of fetched bytes and the outcome are added to the metrics.
+    :param session: aiohttp client session.
+    :param url: URL to fetch.
+    :param semaphore: Semaphore that bounds the number of requests in flight.
+    :param rate_limiter: Per-host rate limiter.
+    :param retries: Number of retries after the first attempt.
+    :param backoff: Base delay in seconds of the exponential backoff.
+    :param cache: HTTP cache that serves fresh pages and revalidates stale ones.
+                Default is None, which always fetches from the server.
+    :return: Response text decoded as UTF-8, or None if the URL could not be fetched.
+    """
+    import aiohttp
+
+    entry = await asyncio.to_thread(cache.lookup, url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        body = await asyncio.to_thread(cache.read, entry)
+        if body is not None:
+            metrics.increment('http_cache_hits_total')
+            return body
+        entry = None
+    if cache is not None and cache.offline:
+        logger.warning('%s is not in the offline HTTP cache', url)
+        metrics.increment('urls_failed_total')
+        return None
+
+    headers = HttpCache.conditional_headers(entry)
+    attempt = 0
+    while True:
+        try:
+            await rate_limiter.wait(url)
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and entry is not None:
+                        metrics.observe('fetch_seconds', time.perf_counter() - start)
+                        await asyncio.to_thread(cache.refresh, entry)
+                        body = await asyncio.to_thread(cache.read, entry)
+                        if body is not None:
+                            metrics.increment('http_not_modified_total')
+                            return body
+                        # The cached body is gone, so ask again without validators.
+                        # The server did not fail, so this does not count as a retry.
+                        entry, headers = None, {}
+                        continue
+                    if response.status in RETRYABLE_STATUSES:
+                        retry_after = None
+                        if response.status in RETRY_AFTER_STATUSES:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        raise RetryableStatusError(response.status, retry_after)
+                    if response.status >= 400:
+                        logger.warning('Failed to fetch %s: status %d', url, response.status)
+                        metrics.increment('urls_failed_total')
+                        return None
+                    data = await response.read()
+                    metrics.observe('fetch_seconds', time.perf_counter() - start)
+                    metrics.increment('urls_fetched_total')
+                    metrics.increment('bytes_fetched_total', len(data))
+                    body = data.decode('utf-8', errors='replace')
+                    if cache is not None:
+                        await asyncio.to_thread(cache.store, url, body, response.headers.get('ETag'),
+                                                response.headers.get('Last-Modified'))
+                    return body
+        except (aiohttp.ClientError, asyncio.TimeoutError, RetryableStatusError) as e:
+            metrics.increment('fetch_retries_total')
+            if attempt == retries:
+                logger.error('Failed to fetch %s after %d attempts: %r', url, retries + 1, e)
+                metrics.increment('urls_failed_total')
+                return None
+            delay = backoff * 2 ** attempt
+            if isinstance(e, RetryableStatusError) and e.retry_after is not None:
+                delay = e.retry_after
+            attempt += 1
+            logger.debug('Retry fetching %s in %.2f seconds after error: %r', url, delay, e)
+            await asyncio.sleep(delay)
+
+
+def _create_session(concurrency: int, timeout: float) -> aiohttp.ClientSession:
+    """
+    :param concurrency: Size of the connection pool.
+    :param timeout: Total timeout of a single request in seconds.
+    :return: aiohttp client session over a pool of keep-alive connections.
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+async def fetch_all(
+        urls: list[str],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        min_request_interval: float = DEFAULT_MIN_REQUEST_INTERVAL,
+        cache: HttpCache | None = None) -> list[str | None]:
+    """
+    Fetch all URLs concurrently over a pool of keep-alive connections.
+    :param urls: URLs to fetch.
+    :param concurrency: Maximum number of requests in flight.
+    :param timeout: Total timeout of a single request in seconds.
+    :param retries: Number of retries after the first attempt.
+    :param backoff: Base delay in seconds of the exponential backoff.
+    :param min_request_interval: Minimum interval in seconds between two requests to the same host.
+    :param cache: HTTP cache that serves fresh pages and revalidates stale ones.
+                Default is None, which always fetches from the server.
+    :return: Response texts in the same order as the URLs. Failed URLs give None.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = HostRateLimiter(min_request_interval)
+    async with _create_session(concurrency, timeout) as session:
+        tasks = [fetch_text(session, url, semaphore, rate_limiter, retries, backoff, cache) for url in urls]
+        return await asyncio.gather(*tasks)
+
+
+async def iter_page_batches(
+        urls: list[str],
+        batch_size: int,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        min_request_interval: float = DEFAULT_MIN_REQUEST_INTERVAL,
+        cache: HttpCache | None = None) -> AsyncIterator[tuple[list[str], list[str | None]]]:
+    """
+    Fetch the URLs concurrently in batches over a single pool of keep-alive connections,
+    yielding each batch as soon as all of its pages are fetched.
+    :param urls: URLs to fetch.
+    :param batch_size: Number of URLs per batch.
+    :param concurrency: Maximum number of requests in flight.
+    :param timeout: Total timeout of a single request in seconds.
+    :param retries: Number of retries after the first attempt.
+    :param backoff: Base delay in seconds of the exponential backoff.
+    :param min_request_interval: Minimum interval in seconds between two requests to the same host.
+    :param cache: HTTP cache that serves fresh pages and revalidates stale ones.
+                Default is None, which always fetches from the server.
+    :return: Async iterator of tuples of the URL batch and its response texts, in the same order.
+            Failed URLs give None.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = HostRateLimiter(min_request_interval)
+    async with _create_session(concurrency, timeout) as session:
+        for start in range(0, len(urls), batch_size):
+            url_batch = urls[start:start + batch_size]
+            tasks = [fetch_text(session, url, semaphore, rate_limiter, retries, backoff, cache) for url in url_batch]
+            yield url_batch, await asyncio.gather(*tasks)
+
+
+def fetch_pages(urls: list[str], **kwargs) -> list[str | None]:
+    """
+    Fetch all URLs concurrently from synchronous code.
+    :param urls: URLs to fetch.
+    :param kwargs: Keyword arguments passed to 'fetch_all'.
+    :return: Response texts in the same order as the URLs. Failed URLs give None.
+    """
+    logger.info('Fetch %d pages concurrently', len(urls))
+    if not urls:
+        return []
+    return asyncio.run(fetch_all(urls, **kwargs))
+
+
+if __name__ == '__main__':
+    pass
@@ -1,6 +1,16 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
-from jp_news_scraper_pipeline.jp_news_scraper.utils import get_jp_pos_dict, get_tokenizer, get_tokenizer_mode
+from jp_news_scraper_pipeline.metrics import metrics, MetricsRegistry
+from jp_news_scraper_pipeline.jp_news_scraper.token_cache import get_token_cache, TokenCache
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_tokenizer, get_tokenizer_mode, \
+    get_excluded_pos_ids, has_non_jp_character, get_pos_codes, JP_POS_TRANSLATIONS, JP_POS_LABELS
 
+if TYPE_CHECKING:
+    from sudachipy import Tokenizer
 
 logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
@@ -15,8 +25,10 @@ def extract_morphemes(joined_text_list: list[str]) -> list[str]:
     words = []
     tokenizer_obj = get_tokenizer()
     mode = get_tokenizer_mode()
+    token_cache = get_token_cache()
     for text in joined_text_list:
-        words += [m.dictionary_form() for m in tokenizer_obj.tokenize(text, mode)]
+        words += [morpheme for morpheme, _ in token_cache.tokenize(text, tokenizer_obj, mode, metrics)]
+    token_cache.flush()
 
     if not words:
         logger.warning('No morphemes found.')
@@ -24,6 +36,78 @@ def extract_morphemes(joined_text_list: list[str]) -> list[str]:
     return words
 
 
+def tokenize_text_to_records(
+        text: str,
+        tokenizer_obj: Tokenizer,
+        mode: Tokenizer.SplitMode,
+        pos_codes: tuple[int, ...],
+        excluded_pos_ids: frozenset[int] | None = None,
+        metrics_registry: MetricsRegistry | None = None,
+        token_cache: TokenCache | None = None) -> list[tuple[str, int]]:
+    """
+    Tokenize a text once and build a record for each of its morphemes.
+    :param text: Text to tokenize.
+    :param tokenizer_obj: SudachiPy's tokenizer.
+    :param mode: SudachiPy's tokenizer's mode.
+    :param pos_codes: Part of Speech code of every SudachiPy's Part of Speech ID, from 'get_pos_codes'.
+    :param excluded_pos_ids: Part of Speech IDs to drop, along with morphemes containing non-Japanese characters.
+                            Default is None, which keeps every morpheme.
+    :param metrics_registry: Registry that receives the tokenize latency and the token counts of the text.
+                            Default is None, which records nothing.
+    :param token_cache: Cache of the tokenizer output, built for the same tokenizer and mode.
+                        Default is None, which always tokenizes the text.
+    :return: List of (morpheme, Part of Speech code) tuples.
+    """
+    start = time.perf_counter()
+    records = []
+    if token_cache is None:
+        morpheme_list = [(m.dictionary_form(), m.part_of_speech_id()) for m in tokenizer_obj.tokenize(text, mode)]
+    else:
+        morpheme_list = token_cache.tokenize(text, tokenizer_obj, mode, metrics_registry)
+    for morpheme, pos_id in morpheme_list:
+        if excluded_pos_ids is not None and (pos_id in excluded_pos_ids or has_non_jp_character(morpheme)):
+            continue
+        records.append((morpheme, pos_codes[pos_id]))
+
+    if metrics_registry is not None:
+        metrics_registry.observe('tokenize_seconds', time.perf_counter() - start)
+        metrics_registry.increment('tokens_total', len(morpheme_list))
+        metrics_registry.increment('tokens_filtered_total', len(morpheme_list) - len(records))
+    return records
+
+
+def extract_morpheme_records(
+        joined_text_list: list[str],
+        filter_tokens: bool = False) -> list[tuple[str, int]]:
+    """
+    Extract morphemes together with their Part of Speech code.
+    Each text is tokenized only once, and the Part of Speech is read from the same morpheme
+    that gives the dictionary form.
+    :param joined_text_list: Text list.
+    :param filter_tokens: Whether to drop morphemes with an excluded Part of Speech or non-Japanese characters
+                        as they are emitted.
+                        Default is False.
+    :return: List of (morpheme, Part of Speech code) tuples.
+            The code indexes 'JP_POS_LABELS' and 'EN_POS_LABELS'.
+    """
+    logger.info('Extract morphemes with their Part of Speech from text list.')
+    records = []
+    tokenizer_obj = get_tokenizer()
+    mode = get_tokenizer_mode()
+    pos_codes = get_pos_codes()
+    excluded_pos_ids = get_excluded_pos_ids() if filter_tokens else None
+    token_cache = get_token_cache()
+    for text in joined_text_list:
+        records += tokenize_text_to_records(
+            text, tokenizer_obj, mode, pos_codes, excluded_pos_ids, metrics, token_cache)
+    token_cache.flush()
+
+    if not records:
+        logger.warning('No morphemes found.')
+
+    return records
+
+
 def extract_pos(kanji_list: list[str]) -> list[str]:
     """
     Extract Part of Speech from the Kanji list.
@@ -34,10 +118,12 @@ def extract_pos(kanji_list: list[str]) -> list[str]:
     part_of_speech_list = []
     tokenizer_obj = get_tokenizer()
     mode = get_tokenizer_mode()
+    pos_codes = get_pos_codes()
+    # The same morphemes come back many times, so their Part of Speech is served from the LRU tier of the cache.
+    token_cache = get_token_cache()
     for kanji in kanji_list:
-        tokenized_kanji = tokenizer_obj.tokenize(kanji, mode)
-        part_of_speech = tokenized_kanji[0].part_of_speech()
-        part_of_speech_list.append(part_of_speech[0])
+        _, pos_id = token_cache.tokenize(kanji, tokenizer_obj, mode, metrics)[0]
+        part_of_speech_list.append(JP_POS_LABELS[pos_codes[pos_id]])
 
     return part_of_speech_list
 
@@ -49,10 +135,4 @@ def translate_pos(part_of_speech_list: list[str]) -> list[str]:
     :return: Translated Part of Speech list.
     """
     logger.info('Translate Japanese Part of Speech to English.')
-    pos_translated_list = []
-    japanese_pos_dict = get_jp_pos_dict()
-    for pos in part_of_speech_list:
-        translated_pos = japanese_pos_dict[pos]
-        pos_translated_list.append(translated_pos)
-
-    return pos_translated_list
+    return [JP_POS_TRANSLATIONS[pos] for pos in part_of_speech_list]
@@ -1,35 +1,138 @@
+from __future__ import annotations
+
 import datetime
+import functools
 import re
 import sqlite3
-
-import cutlet
-import pandas as pd
-
+from collections import Counter
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
 
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
-from jp_news_scraper_pipeline.jp_news_scraper.utils import get_excluded_jp_pos
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_romaji_cache_table, \
+    fetch_cached_romaji, save_romaji_to_cache, bulk_insert
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_excluded_jp_pos, JP_POS_LABELS, EN_POS_LABELS
 
+if TYPE_CHECKING:
+    # Cutlet and Pandas are imported on first use, so that URL polling runs do not load them.
+    import cutlet
+    import pandas as pd
+
+    from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
 
 logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
+# Maximum number of morphemes kept in the in-process romanization cache.
+ROMAJI_CACHE_SIZE = 65536
+
 
+@functools.cache
+def get_cutlet() -> cutlet.Cutlet:
+    """
+    Get the Cutlet instance of the current process, creating it on the first call.
+    :return: Cutlet instance.
+    """
+    import cutlet
+
+    logger.info('Create Cutlet instance')
+    return cutlet.Cutlet()
+
+
+@functools.lru_cache(maxsize=ROMAJI_CACHE_SIZE)
 def romanize_morpheme(morpheme: str) -> str:
     """
     Romanize Japanese morpheme.
+    Results are memoized in a bounded LRU cache.
     :param morpheme: Morpheme.
     :return: Romanized morpheme.
     """
-    return cutlet.Cutlet().romaji(morpheme)
+    return get_cutlet().romaji(morpheme)
 
 
-def add_timestamp_to_df(df: pd.DataFrame) -> None:
+def romanize_series(
+        morphemes: pd.Series,
+        conn: sqlite3.Connection | None = None,
+        new_romaji_sink: dict[str, str] | None = None) -> pd.Series:
+    """
+    Romanize a Series of morphemes, romanizing each unique morpheme only once.
+    :param morphemes: Pandas Series of morphemes.
+    :param conn: Sqlite3 connection to the database holding the persistent romaji cache.
+                Default is None, which only uses the in-process cache.
+    :param new_romaji_sink: Dictionary that receives the romaji missing from the persistent cache,
+                            instead of saving them with the connection,
+                            for callers that leave every write to another connection.
+                            Default is None, which saves them with the connection.
+    :return: Pandas Series of romanized morphemes with the same index as the morphemes.
+    """
+    unique_morphemes = morphemes.unique().tolist()
+    logger.info('Romanize %d unique morphemes out of %d', len(unique_morphemes), len(morphemes))
+
+    romaji_by_morpheme = {}
+    if conn is not None:
+        create_romaji_cache_table(conn)
+        romaji_by_morpheme = fetch_cached_romaji(conn, unique_morphemes)
+
+    new_romaji = {morpheme: romanize_morpheme(morpheme)
+                  for morpheme in unique_morphemes if morpheme not in romaji_by_morpheme}
+
+    if new_romaji_sink is not None:
+        new_romaji_sink.update(new_romaji)
+    elif conn is not None and new_romaji:
+        save_romaji_to_cache(conn, new_romaji)
+
+    romaji_by_morpheme.update(new_romaji)
+    return morphemes.map(romaji_by_morpheme)
+
+
+def create_pos_columns(pos_codes: Sequence[int]) -> tuple[pd.Categorical, pd.Categorical]:
+    """
+    Translate Part of Speech codes into Japanese and English Part of Speech columns.
+    Both columns share the same integer codes, so the translation is a single vectorized take.
+    :param pos_codes: Part of Speech codes, which index 'JP_POS_LABELS' and 'EN_POS_LABELS'.
+    :return: Tuple of the Japanese and English Part of Speech as Pandas Categoricals.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes = np.asarray(pos_codes, dtype=np.int8)
+    return (pd.Categorical.from_codes(codes, categories=JP_POS_LABELS),
+            pd.Categorical.from_codes(codes, categories=EN_POS_LABELS))
+
+
+def split_morpheme_records(records: list[tuple[str, int]]) -> tuple[list[str], pd.Categorical, pd.Categorical]:
+    """
+    Split morpheme records into a morpheme list and Part of Speech columns.
+    :param records: List of (morpheme, Part of Speech code) tuples.
+    :return: Tuple of a morpheme list, Part of Speech column and English translation of Part of Speech column.
+    """
+    morpheme_list = [record[0] for record in records]
+    pos_list, pos_translated_list = create_pos_columns([record[1] for record in records])
+    return morpheme_list, pos_list, pos_translated_list
+
+
+def add_timestamp_to_df(df: pd.DataFrame, timestamp: datetime.datetime | None = None) -> None:
     """
     Add a timestamp column to the given DataFrame.
     :param df: Pandas DataFrame
+    :param timestamp: Time when the texts of the DataFrame were fetched.
+                    Default is None, which uses the current time.
     :return: None
     """
     logger.info('Add TimeStamp column to DataFrame')
-    df['TimeStamp'] = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if timestamp is None:
+        timestamp = datetime.datetime.now()
+    df['TimeStamp'] = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def count_morphemes_by_day(df: pd.DataFrame) -> Counter:
+    """
+    Count the morphemes of the given DataFrame per Part of Speech and day.
+    :param df: Pandas DataFrame with Kanji, PartOfSpeech and TimeStamp columns.
+    :return: Counter where key is a (morpheme, Part of Speech, day) tuple and value is its count.
+    """
+    logger.info('Count morphemes per Part of Speech and day')
+    days = df['TimeStamp'].str.slice(0, 10)
+    return Counter(zip(df['Kanji'], df['PartOfSpeech'], days))
 
 
 def clean_url_list(initial_urls: list[str]) -> list[str]:
@@ -53,15 +156,17 @@ def clean_url_list(initial_urls: list[str]) -> list[str]:
     return cleaned_urls
 
 
-def filter_out_urls_existed_in_db(existing_urls: list[str], urls: list[str]) -> list[str]:
+def filter_out_urls_existed_in_db(existing_urls: list[str] | set[str], urls: list[str]) -> list[str]:
     """
     Filter out URLs that are already in the database.
-    :param existing_urls: Existing URLs from the database as a list.
+    This is the in-memory fallback of 'fetch_new_urls_from_db'.
+    :param existing_urls: Existing URLs from the database as a list or a set.
     :param urls: URL list.
     :return: Filtered URL list.
     """
     logger.info('Filter out URLs that are already in the database.')
-    new_urls = [url for url in urls if url not in existing_urls]
+    existing_url_set = set(existing_urls)
+    new_urls = [url for url in urls if url not in existing_url_set]
 
     if not new_urls:
         logger.warning('No new URLs found.')
@@ -84,19 +189,24 @@ def filter_out_non_jp_characters(df: pd.DataFrame) -> pd.DataFrame:
 
 def create_df_for_japan_news_table(
         kanji_list: list[str],
-        pos_list: list[str],
-        pos_translated_list: list[str]) -> pd.DataFrame:
+        pos_list: Sequence[str],
+        pos_translated_list: Sequence[str],
+        romaji_cache_conn: sqlite3.Connection | None = None) -> pd.DataFrame:
     """
     Create a dataframe containing data to be inserted into JapanNews table.
     :param kanji_list: Kanji list.
-    :param pos_list: Part of Speech list.
-    :param pos_translated_list: Translated Part of Speech list.
+    :param pos_list: Part of Speech list or Categorical.
+    :param pos_translated_list: Translated Part of Speech list or Categorical.
+    :param romaji_cache_conn: Sqlite3 connection to the database holding the persistent romaji cache.
+                            Default is None, which only uses the in-process cache.
     :return: Pandas DataFrame.
     """
+    import pandas as pd
+
     logger.info('Create DataFrame with Kanji column')
     df = pd.DataFrame(kanji_list, columns=['Kanji'])
     logger.info('Add Romanji Column')
-    df['Romanji'] = df['Kanji'].apply(romanize_morpheme)
+    df['Romanji'] = romanize_series(df['Kanji'], romaji_cache_conn)
     logger.info('Add PartOfSpeech Column')
     df['PartOfSpeech'] = pos_list
     logger.info('Add PartOfSpeechEnglish Column')
@@ -105,6 +215,36 @@ def create_df_for_japan_news_table(
     return df
 
 
+def create_df_from_token_buffer(
+        token_buffer: TokenBuffer,
+        romaji_cache_conn: sqlite3.Connection | None = None,
+        new_romaji_sink: dict[str, str] | None = None,
+        timestamp: datetime.datetime | None = None) -> pd.DataFrame:
+    """
+    Create a dataframe containing data to be inserted into JapanNews table from a token buffer.
+    Only the string table of the buffer is romanized, and the romaji are spread to the tokens by their IDs.
+    :param token_buffer: TokenBuffer.
+    :param romaji_cache_conn: Sqlite3 connection to the database holding the persistent romaji cache.
+                            Default is None, which only uses the in-process cache.
+    :param new_romaji_sink: Dictionary that receives the romaji missing from the persistent cache,
+                            instead of saving them with the connection.
+                            Default is None, which saves them with the connection.
+    :param timestamp: Time when the texts of the tokens were fetched.
+                    Default is None, which uses the current time.
+    :return: Pandas DataFrame with categorical Kanji, PartOfSpeech and PartOfSpeechEnglish columns.
+    """
+    import pandas as pd
+
+    logger.info('Create DataFrame from the token buffer')
+    df = token_buffer.to_pandas()
+    logger.info('Add Romanji Column')
+    romaji_table = romanize_series(
+        pd.Series(token_buffer.morphemes, dtype=object), romaji_cache_conn, new_romaji_sink).to_numpy()
+    df.insert(1, 'Romanji', romaji_table.take(token_buffer.morpheme_id_view()))
+    add_timestamp_to_df(df, timestamp)
+    return df
+
+
 def load_new_urls_to_db(conn: sqlite3.Connection, new_urls: list[str]) -> None:
     """
     Load new urls to the SQLite database.
@@ -114,13 +254,9 @@ def load_new_urls_to_db(conn: sqlite3.Connection, new_urls: list[str]) -> None:
     """
     logger.info("Loading a new set of news urls into the SQLite database...")
     if new_urls:
-        logger.info('Prepare DataFrame for new URLs')
-        df = pd.DataFrame(new_urls, columns=['Url'])
-
-        add_timestamp_to_df(df)
-
-        logger.info('Add the DataFrame to NewsUrls table')
-        df.to_sql('NewsUrls', conn, if_exists='append', index=False)
+        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        logger.info('Add the new URLs to NewsUrls table')
+        bulk_insert(conn, 'NewsUrls', ['Url', 'TimeStamp'], ((url, timestamp) for url in new_urls))
     else:
         logger.warning('No new URLs found')
 
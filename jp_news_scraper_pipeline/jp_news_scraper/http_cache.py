@@ -0,0 +1,261 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+DEFAULT_CACHE_DIR = '.http_cache'
+
+# Seconds during which a cached page is served without contacting the server.
+DEFAULT_TTL = 3600
+
+# Seconds after which a page that has not been used is evicted.
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+# Maximum total size in bytes of the compressed pages kept on disk.
+DEFAULT_MAX_SIZE_BYTES = 512 * 1024 * 1024
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    digest: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class HttpCache:
+    """
+    On-disk HTTP cache for fetched pages.
+    Page bodies are stored gzip-compressed and content-addressed by their SHA-256 digest,
+    so identical pages served under several URLs are stored once.
+    The index of URLs, validators and timestamps lives in a SQLite database next to the bodies.
+    The methods may be called from several threads, such as those of 'asyncio.to_thread'.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR,
+            ttl: float = DEFAULT_TTL,
+            max_age: float = DEFAULT_MAX_AGE,
+            max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+            offline: bool = False):
+        """
+        :param cache_dir: Directory of the cache.
+        :param ttl: Seconds during which a cached page is served without contacting the server.
+        :param max_age: Seconds after which a page that has not been used is evicted.
+        :param max_size_bytes: Maximum total size in bytes of the compressed pages kept on disk.
+        :param offline: Whether to serve every page from the cache, whatever its age, and never use the network.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_size_bytes = max_size_bytes
+        self.offline = offline
+        (self.cache_dir / 'bodies').mkdir(parents=True, exist_ok=True)
+        # Guards the index connection and the running size, which the fetching threads share.
+        # The body files are written and read outside of it.
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.cache_dir / 'index.db', check_same_thread=False)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS HttpCache (
+                    Url TEXT NOT NULL PRIMARY KEY,
+                    Digest TEXT NOT NULL,
+                    ETag TEXT,
+                    LastModified TEXT,
+                    FetchedAt REAL NOT NULL,
+                    LastUsedAt REAL NOT NULL,
+                    Size INTEGER NOT NULL
+                )
+                ''')
+        # Running total of the sizes of the entries, so that a store only scans the index when it is over the limit.
+        # Other processes sharing the cache are only accounted for when 'evict' recounts it.
+        self._size_bytes = self.get_size_bytes()
+        self.evict()
+
+    def _body_path(self, digest: str) -> Path:
+        """
+        :param digest: SHA-256 digest of the page body.
+        :return: Path of the compressed body file.
+        """
+        return self.cache_dir / 'bodies' / digest[:2] / f'{digest}.gz'
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        """
+        Look up the cache entry of a URL.
+        :param url: URL.
+        :return: Cache entry, or None if the URL is not cached.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT Url, Digest, ETag, LastModified, FetchedAt FROM HttpCache WHERE Url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(*row)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        Check if a cache entry can be served without contacting the server.
+        :param entry: Cache entry.
+        :return: True if the cache is offline or the entry is younger than the TTL, False otherwise.
+        """
+        return self.offline or time.time() - entry.fetched_at < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+        """
+        Build the headers that revalidate a cache entry.
+        :param entry: Cache entry, or None.
+        :return: Dictionary with If-None-Match and If-Modified-Since headers, when the entry has validators.
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def read(self, entry: CacheEntry) -> str | None:
+        """
+        Read the page body of a cache entry and mark the entry as used.
+        :param entry: Cache entry.
+        :return: Page body, or None if its file is missing.
+        """
+        try:
+            body = gzip.decompress(self._body_path(entry.digest).read_bytes()).decode('utf-8')
+        except FileNotFoundError:
+            logger.warning('Cached body of %s is missing', entry.url)
+            return None
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE HttpCache SET LastUsedAt = ? WHERE Url = ?', (time.time(), entry.url))
+        return body
+
+    def store(self, url: str, body: str, etag: str | None = None, last_modified: str | None = None) -> None:
+        """
+        Store a page body and its validators, then evict old entries if the cache grew over its maximum size.
+        :param url: URL.
+        :param body: Page body.
+        :param etag: ETag header of the response.
+        :param last_modified: Last-Modified header of the response.
+        :return: None
+        """
+        data = body.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        body_path = self._body_path(digest)
+        if not body_path.exists():
+            body_path.parent.mkdir(exist_ok=True)
+            temporary_path = body_path.with_suffix(f'.{os.getpid()}.tmp')
+            temporary_path.write_bytes(gzip.compress(data))
+            temporary_path.replace(body_path)
+
+        now = time.time()
+        size = body_path.stat().st_size
+        with self._lock:
+            previous = self._conn.execute('SELECT Digest, Size FROM HttpCache WHERE Url = ?', (url,)).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO HttpCache (Url, Digest, ETag, LastModified, FetchedAt, LastUsedAt, Size) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (url, digest, etag, last_modified, now, now, size))
+            self._size_bytes += size
+            if previous is not None:
+                previous_digest, previous_size = previous
+                self._size_bytes -= previous_size
+                if previous_digest != digest:
+                    self._remove_unreferenced_body(previous_digest)
+            if self._size_bytes > self.max_size_bytes:
+                self.evict()
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """
+        Mark a cache entry as fetched now, after the server answered 304 Not Modified.
+        :param entry: Cache entry.
+        :return: None
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE HttpCache SET FetchedAt = ?, LastUsedAt = ? WHERE Url = ?',
+                               (now, now, entry.url))
+
+    def _remove_unreferenced_body(self, digest: str) -> None:
+        """
+        Remove a body file if no URL refers to it anymore.
+        :param digest: SHA-256 digest of the page body.
+        :return: None
+        """
+        if self._conn.execute('SELECT 1 FROM HttpCache WHERE Digest = ? LIMIT 1', (digest,)).fetchone() is None:
+            self._body_path(digest).unlink(missing_ok=True)
+
+    def _delete_entries(self, rows: list[tuple[str, str]]) -> None:
+        """
+        Delete cache entries and the body files that no other URL refers to.
+        :param rows: List of (URL, digest) tuples.
+        :return: None
+        """
+        if not rows:
+            return
+        with self._conn:
+            self._conn.executemany('DELETE FROM HttpCache WHERE Url = ?', ((url,) for url, _ in rows))
+        for digest in {digest for _, digest in rows}:
+            self._remove_unreferenced_body(digest)
+
+    def evict(self) -> int:
+        """
+        Evict entries unused for longer than the maximum age,
+        then the least recently used entries until the cache fits its maximum size.
+        It scans the whole index, so it runs once per opened cache and whenever a store goes over the maximum size.
+        :return: Number of evicted entries.
+        """
+        if self.offline:
+            return 0
+
+        with self._lock:
+            expired_rows = self._conn.execute(
+                'SELECT Url, Digest FROM HttpCache WHERE LastUsedAt < ?', (time.time() - self.max_age,)).fetchall()
+            self._delete_entries(expired_rows)
+
+            oversize_rows = []
+            total_size = self.get_size_bytes()
+            if total_size > self.max_size_bytes:
+                rows = self._conn.execute('SELECT Url, Digest, Size FROM HttpCache ORDER BY LastUsedAt')
+                for url, digest, size in rows:
+                    if total_size <= self.max_size_bytes:
+                        break
+                    oversize_rows.append((url, digest))
+                    total_size -= size
+            self._delete_entries(oversize_rows)
+            self._size_bytes = total_size
+
+        evicted_count = len(expired_rows) + len(oversize_rows)
+        if evicted_count:
+            logger.info('Evicted %d pages from the HTTP cache', evicted_count)
+        return evicted_count
+
+    def get_size_bytes(self) -> int:
+        """
+        Get the total size of the compressed pages of the cache.
+        :return: Size in bytes. Pages shared by several URLs are counted once per URL.
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(Size), 0) FROM HttpCache').fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Close the index database.
+        :return: None
+        """
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == '__main__':
+    pass
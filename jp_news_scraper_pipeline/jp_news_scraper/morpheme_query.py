@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import calendar
+import datetime
+import os
+import sqlite3
+from pathlib import Path
+from typing import NamedTuple, TYPE_CHECKING
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.parquet_dataset import open_morpheme_dataset, PARTITION_COLUMN
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import has_table, OCCURRENCE_TABLE
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+# File suffixes of the SQLite databases. Any other path is read as a Parquet file or dataset directory.
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+# Time buckets of 'frequency_trend', each labelled with its first day.
+BUCKETS = ('day', 'week', 'month')
+
+# SQLite expressions of the first day of each bucket, formatted with the time value of the rows,
+# a day, a TimeStamp or a TsEpoch column followed by the 'unixepoch' modifier.
+_SQLITE_BUCKET_EXPRESSIONS = {
+    'day': 'date({})',
+    'week': "date({}, '-6 days', 'weekday 1')",
+    'month': "date({}, 'start of month')",
+}
+
+_OCCURRENCE_TIME = "o.TsEpoch, 'unixepoch'"
+
+_OCCURRENCE_POS_CONDITION = 'AND o.PosId = (SELECT PosId FROM PartsOfSpeech WHERE PartOfSpeech = :pos)'
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class MorphemeCount(NamedTuple):
+    kanji: str
+    part_of_speech: str
+    count: int
+
+
+class TrendPoint(NamedTuple):
+    # First day of the bucket, formatted as 'YYYY-MM-DD'.
+    bucket: str
+    count: int
+
+
+class _SqliteSource(NamedTuple):
+    table: str
+    # Column of the day or the TimeStamp of the rows.
+    time_column: str
+    # Aggregate expression of the number of occurrences of a group of rows.
+    count_expression: str
+
+
+# Tables that the SQLite queries read, in order of preference, when the normalized tables are missing or incomplete.
+_SQLITE_SOURCES = (
+    # Aggregate table that every load adds its counts to, and that is filled from the rows loaded before it existed.
+    _SqliteSource('MorphemeFrequency', 'Day', 'SUM(Count)'),
+    # One row per occurrence, in the databases that were not loaded since the aggregate table was added.
+    _SqliteSource('JapanNews', 'TimeStamp', 'COUNT(*)'),
+)
+
+
+def _to_epoch(day: str) -> int:
+    """
+    :param day: Day formatted as 'YYYY-MM-DD'.
+    :return: Seconds since the epoch of the start of the day, read as UTC like the TsEpoch column.
+    """
+    return calendar.timegm(datetime.date.fromisoformat(day).timetuple())
+
+
+def _get_epoch_range(since: str | None, until: str | None) -> tuple[int, int]:
+    """
+    :param since: First day, formatted as 'YYYY-MM-DD', or None for no lower bound.
+    :param until: Last day, formatted as 'YYYY-MM-DD', or None for no upper bound.
+    :return: Tuple of the inclusive lower bound and the exclusive upper bound, in seconds since the epoch.
+    """
+    start = _to_epoch(since) if since is not None else -2 ** 63
+    end = _to_epoch(until) + 86400 if until is not None else 2 ** 63 - 1
+    return start, end
+
+
+def _has_complete_occurrences(conn: sqlite3.Connection) -> bool:
+    """
+    Check whether the normalized tables hold every morpheme of the database.
+    Once they exist, loads only add their rows to them,
+    so they are complete unless JapanNews table still has rows to migrate.
+    :param conn: Sqlite3 connection.
+    :return: True if the queries can read the normalized tables.
+    """
+    if not has_table(conn, OCCURRENCE_TABLE):
+        return False
+    if not has_table(conn, 'JapanNews'):
+        return True
+    max_id = conn.execute('SELECT COALESCE(MAX(ID), 0) FROM JapanNews').fetchone()[0]
+    if not max_id:
+        return True
+    if not has_table(conn, 'SchemaMigrations'):
+        return False
+    row = conn.execute("SELECT LastId FROM SchemaMigrations WHERE Name = 'JapanNews'").fetchone()
+    return row is not None and row[0] >= max_id
+
+
+def _is_sqlite_source(source: str | os.PathLike | sqlite3.Connection) -> bool:
+    return isinstance(source, sqlite3.Connection) or Path(source).suffix in SQLITE_SUFFIXES
+
+
+def _connect(source: str | os.PathLike | sqlite3.Connection) -> sqlite3.Connection:
+    """
+    :param source: SQLite database file path or connection.
+    :return: Read-only connection to the database file, or the given connection.
+    """
+    if isinstance(source, sqlite3.Connection):
+        return source
+    return sqlite3.connect(f'{Path(source).resolve().as_uri()}?mode=ro', uri=True)
+
+
+def _open_dataset(source: str | os.PathLike) -> ds.Dataset:
+    """
+    :param source: Parquet file, or directory of the date-partitioned Parquet dataset.
+    :return: PyArrow dataset.
+    """
+    import pyarrow.dataset as ds
+
+    if Path(source).is_dir():
+        return open_morpheme_dataset(source)
+    return ds.dataset(str(source), format='parquet')
+
+
+def _build_filter(
+        dataset: ds.Dataset,
+        kanji: str | None = None,
+        pos: str | None = None,
+        since: str | None = None,
+        until: str | None = None) -> ds.Expression | None:
+    """
+    Build a filter expression that PyArrow pushes down to the row group statistics,
+    and to the date partitions of a dataset directory.
+    TimeStamp strings formatted as 'YYYY-MM-DD HH:MM:SS' sort like the times they stand for.
+    :return: Filter expression, or None if nothing is filtered.
+    """
+    import pyarrow.dataset as ds
+
+    conditions = []
+    if kanji is not None:
+        conditions.append(ds.field('Kanji') == kanji)
+    if pos is not None:
+        conditions.append(ds.field('PartOfSpeech') == pos)
+    has_partitions = PARTITION_COLUMN in dataset.schema.names
+    if since is not None:
+        conditions.append(ds.field('TimeStamp') >= since)
+        if has_partitions:
+            conditions.append(ds.field(PARTITION_COLUMN) >= since)
+    if until is not None:
+        next_day = (datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat()
+        conditions.append(ds.field('TimeStamp') < next_day)
+        if has_partitions:
+            conditions.append(ds.field(PARTITION_COLUMN) <= until)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _aggregate_batches(scanner: ds.Scanner, keys: list[str], key_function=None) -> pa.Table:
+    """
+    Count the rows of each group of a scan, one record batch at a time, so that memory stays bounded by the groups.
+    :param scanner: PyArrow scanner.
+    :param keys: Columns to group by.
+    :param key_function: Function that replaces a record batch by a table with the key columns.
+                        Default is None, which groups the batch as it is.
+    :return: Table with the key columns and a 'count' column.
+    """
+    import pyarrow as pa
+
+    partial_counts = []
+    for batch in scanner.to_batches():
+        if not batch.num_rows:
+            continue
+        table = pa.Table.from_batches([batch]) if key_function is None else key_function(batch)
+        partial_counts.append(table.group_by(keys).aggregate([([], 'count_all')]))
+    if not partial_counts:
+        return pa.table({**{key: pa.array([], pa.string()) for key in keys}, 'count': pa.array([], pa.int64())})
+    counts = pa.concat_tables(partial_counts).group_by(keys).aggregate([('count_all', 'sum')])
+    return counts.select([*keys, 'count_all_sum']).rename_columns([*keys, 'count'])
+
+
+def _find_sqlite_source(conn: sqlite3.Connection) -> _SqliteSource | None:
+    """
+    :param conn: Sqlite3 connection.
+    :return: First of '_SQLITE_SOURCES' that exists in the database, or None if there is none.
+    """
+    for sqlite_source in _SQLITE_SOURCES:
+        if has_table(conn, sqlite_source.table):
+            return sqlite_source
+    logger.warning('No morpheme table in the database')
+    return None
+
+
+def _build_sqlite_conditions(
+        sqlite_source: _SqliteSource,
+        pos: str | None,
+        since: str | None,
+        until: str | None) -> str:
+    """
+    Build the conditions of a query on the morphemes of a SQLite source.
+    Days and TimeStamp strings formatted as 'YYYY-MM-DD HH:MM:SS' sort like the times they stand for.
+    :return: SQL conditions joined with AND, with :pos, :since and :next_day parameters.
+    """
+    conditions = ['true']
+    if pos is not None:
+        conditions.append('PartOfSpeech = :pos')
+    if since is not None:
+        conditions.append(f'{sqlite_source.time_column} >= :since')
+    if until is not None:
+        conditions.append(f'{sqlite_source.time_column} < :next_day')
+    return ' AND '.join(conditions)
+
+
+def _get_next_day(until: str | None) -> str | None:
+    """
+    :param until: Day formatted as 'YYYY-MM-DD', or None.
+    :return: Following day formatted as 'YYYY-MM-DD', or None.
+    """
+    if until is None:
+        return None
+    return (datetime.date.fromisoformat(until) + datetime.timedelta(days=1)).isoformat()
+
+
+def _top_morphemes_from_occurrences(
+        conn: sqlite3.Connection,
+        pos: str | None,
+        since: str | None,
+        until: str | None,
+        limit: int) -> list[MorphemeCount]:
+    start, end = _get_epoch_range(since, until)
+    # The counts are aggregated on the integer keys, through the primary key or the Part of Speech index,
+    # and only the top groups are joined with the dimension tables.
+    pos_condition = _OCCURRENCE_POS_CONDITION if pos is not None else ''
+    query = f'''
+        SELECT l.Kanji, p.PartOfSpeech, c.Total
+        FROM (
+            SELECT o.MorphemeId, o.PosId, SUM(o.Occurrences) AS Total FROM {OCCURRENCE_TABLE} AS o
+            WHERE o.TsEpoch >= :start AND o.TsEpoch < :end {pos_condition}
+            GROUP BY o.MorphemeId, o.PosId
+        ) AS c
+        JOIN Lexicon AS l ON l.MorphemeId = c.MorphemeId
+        JOIN PartsOfSpeech AS p ON p.PosId = c.PosId
+        ORDER BY c.Total DESC, l.Kanji
+        LIMIT :limit
+        '''
+    parameters = {'pos': pos, 'start': start, 'end': end, 'limit': limit}
+    return [MorphemeCount(*row) for row in conn.execute(query, parameters)]
+
+
+def _top_morphemes_from_sqlite(
+        conn: sqlite3.Connection,
+        pos: str | None,
+        since: str | None,
+        until: str | None,
+        limit: int) -> list[MorphemeCount]:
+    if _has_complete_occurrences(conn):
+        return _top_morphemes_from_occurrences(conn, pos, since, until, limit)
+    sqlite_source = _find_sqlite_source(conn)
+    if sqlite_source is None:
+        return []
+    query = f'''
+        SELECT Kanji, PartOfSpeech, {sqlite_source.count_expression} AS Total FROM {sqlite_source.table}
+        WHERE {_build_sqlite_conditions(sqlite_source, pos, since, until)}
+        GROUP BY Kanji, PartOfSpeech
+        ORDER BY Total DESC, Kanji
+        LIMIT :limit
+        '''
+    parameters = {'pos': pos, 'since': since, 'next_day': _get_next_day(until), 'limit': limit}
+    return [MorphemeCount(*row) for row in conn.execute(query, parameters)]
+
+
+def _top_morphemes_from_parquet(
+        source: str | os.PathLike,
+        pos: str | None,
+        since: str | None,
+        until: str | None,
+        limit: int) -> list[MorphemeCount]:
+    dataset = _open_dataset(source)
+    scanner = dataset.scanner(columns=['Kanji', 'PartOfSpeech'],
+                              filter=_build_filter(dataset, pos=pos, since=since, until=until))
+    counts = _aggregate_batches(scanner, ['Kanji', 'PartOfSpeech'])
+    top_counts = counts.sort_by([('count', 'descending'), ('Kanji', 'ascending')]).slice(0, limit)
+    return [MorphemeCount(*row.values()) for row in top_counts.to_pylist()]
+
+
+def top_morphemes(
+        source: str | os.PathLike | sqlite3.Connection,
+        pos: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 10) -> list[MorphemeCount]:
+    """
+    Get the most common morphemes, aggregated where the data is stored,
+    by SQLite or by a PyArrow scan of the Parquet files.
+    A migrated SQLite database is read from the normalized tables through their covering indexes,
+    and any other from MorphemeFrequency table, or else from JapanNews table.
+    :param source: SQLite database file path or connection,
+                    or Parquet file, or directory of the date-partitioned Parquet dataset.
+    :param pos: Japanese Part of Speech, such as '名詞'.
+                Default is None, which counts all Parts of Speech.
+    :param since: First day to count, formatted as 'YYYY-MM-DD'.
+                Default is None, which starts from the oldest day.
+    :param until: Last day to count, formatted as 'YYYY-MM-DD'.
+                Default is None, which goes up to the newest day.
+    :param limit: Number of morphemes to get.
+    :return: List of MorphemeCount, most common first.
+    """
+    if not _is_sqlite_source(source):
+        return _top_morphemes_from_parquet(source, pos, since, until, limit)
+
+    conn = _connect(source)
+    try:
+        return _top_morphemes_from_sqlite(conn, pos, since, until, limit)
+    finally:
+        if conn is not source:
+            conn.close()
+
+
+def _frequency_trend_from_occurrences(
+        conn: sqlite3.Connection,
+        morpheme: str,
+        bucket: str,
+        pos: str | None,
+        since: str | None,
+        until: str | None) -> list[TrendPoint]:
+    start, end = _get_epoch_range(since, until)
+    # The morpheme index covers the query, so the table itself is never read.
+    pos_condition = _OCCURRENCE_POS_CONDITION if pos is not None else ''
+    bucket_expression = _SQLITE_BUCKET_EXPRESSIONS[bucket].format(_OCCURRENCE_TIME)
+    query = f'''
+        SELECT {bucket_expression} AS Bucket, SUM(o.Occurrences) FROM {OCCURRENCE_TABLE} AS o
+        WHERE o.MorphemeId = (SELECT MorphemeId FROM Lexicon WHERE Kanji = :morpheme)
+            AND o.TsEpoch >= :start AND o.TsEpoch < :end {pos_condition}
+        GROUP BY Bucket
+        ORDER BY Bucket
+        '''
+    parameters = {'morpheme': morpheme, 'pos': pos, 'start': start, 'end': end}
+    return [TrendPoint(*row) for row in conn.execute(query, parameters)]
+
+
+def _frequency_trend_from_sqlite(
+        conn: sqlite3.Connection,
+        morpheme: str,
+        bucket: str,
+        pos: str | None,
+        since: str | None,
+        until: str | None) -> list[TrendPoint]:
+    if _has_complete_occurrences(conn):
+        return _frequency_trend_from_occurrences(conn, morpheme, bucket, pos, since, until)
+    sqlite_source = _find_sqlite_source(conn)
+    if sqlite_source is None:
+        return []
+    bucket_expression = _SQLITE_BUCKET_EXPRESSIONS[bucket].format(sqlite_source.time_column)
+    query = f'''
+        SELECT {bucket_expression} AS Bucket, {sqlite_source.count_expression} FROM {sqlite_source.table}
+        WHERE Kanji = :morpheme AND {_build_sqlite_conditions(sqlite_source, pos, since, until)}
+        GROUP BY Bucket
+        ORDER BY Bucket
+        '''
+    parameters = {'morpheme': morpheme, 'pos': pos, 'since': since, 'next_day': _get_next_day(until)}
+    return [TrendPoint(*row) for row in conn.execute(query, parameters)]
+
+
+def _frequency_trend_from_parquet(
+        source: str | os.PathLike,
+        morpheme: str,
+        bucket: str,
+        pos: str | None,
+        since: str | None,
+        until: str | None) -> list[TrendPoint]:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    def to_buckets(batch: pa.RecordBatch) -> pa.Table:
+        timestamps = pc.strptime(batch.column('TimeStamp'), format=TIMESTAMP_FORMAT, unit='s')
+        first_days = pc.floor_temporal(timestamps, unit=bucket, week_starts_monday=True)
+        return pa.table({'Bucket': pc.strftime(first_days, format='%Y-%m-%d')})
+
+    dataset = _open_dataset(source)
+    scanner = dataset.scanner(columns=['TimeStamp'],
+                              filter=_build_filter(dataset, kanji=morpheme, pos=pos, since=since, until=until))
+    counts = _aggregate_batches(scanner, ['Bucket'], to_buckets).sort_by('Bucket')
+    return [TrendPoint(*row.values()) for row in counts.to_pylist()]
+
+
+def frequency_trend(
+        source: str | os.PathLike | sqlite3.Connection,
+        morpheme: str,
+        bucket: str = 'day',
+        pos: str | None = None,
+        since: str | None = None,
+        until: str | None = None) -> list[TrendPoint]:
+    """
+    Get the number of occurrences of a morpheme per time bucket, aggregated where the data is stored,
+    from the same SQLite tables as 'top_morphemes'.
+    Buckets without any occurrence are left out.
+    :param source: SQLite database file path or connection,
+                    or Parquet file, or directory of the date-partitioned Parquet dataset.
+    :param morpheme: Morpheme, in its dictionary form.
+    :param bucket: One of 'BUCKETS'. Weeks start on Monday.
+    :param pos: Japanese Part of Speech, such as '名詞'.
+                Default is None, which counts all Parts of Speech.
+    :param since: First day to count, formatted as 'YYYY-MM-DD'.
+                Default is None, which starts from the oldest day.
+    :param until: Last day to count, formatted as 'YYYY-MM-DD'.
+                Default is None, which goes up to the newest day.
+    :return: List of TrendPoint, oldest bucket first.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f'Unknown bucket: {bucket}')
+    if not _is_sqlite_source(source):
+        return _frequency_trend_from_parquet(source, morpheme, bucket, pos, since, until)
+
+    conn = _connect(source)
+    try:
+        return _frequency_trend_from_sqlite(conn, morpheme, bucket, pos, since, until)
+    finally:
+        if conn is not source:
+            conn.close()
+
+
+if __name__ == '__main__':
+    pass
@@ -1,12 +1,63 @@
-import bs4
-import requests
-from bs4 import BeautifulSoup
-from requests import Response
+from __future__ import annotations
+
+import functools
+import importlib.util
+import logging
+import re
+from typing import TYPE_CHECKING
 
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import fetch_pages, DEFAULT_CONCURRENCY
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache
+from jp_news_scraper_pipeline.metrics import metrics
+
+if TYPE_CHECKING:
+    # BeautifulSoup is imported on first use, so that importing the entry points does not load it and lxml.
+    import bs4
+    from bs4 import BeautifulSoup, SoupStrainer
+    from requests import Response
 
 logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
+NHK_BASE_URL = 'https://www3.nhk.or.jp'
+
+# Pattern of the class attribute of the news article sections.
+# The strainer sees the raw class attribute, so the class is matched as a whole word of it.
+NEWS_ARTICLE_CLASS_PATTERN = re.compile(r'(?:^|\s)content--detail-main(?:\s|$)')
+
+
+@functools.cache
+def get_href_strainer() -> SoupStrainer:
+    """
+    Get the strainer that keeps only the anchor tags with an href, so the rest of the page is never built into a tree.
+    :return: BeautifulSoup SoupStrainer.
+    """
+    from bs4 import SoupStrainer
+
+    return SoupStrainer('a', href=True)
+
+
+@functools.cache
+def get_news_article_strainer() -> SoupStrainer:
+    """
+    Get the strainer that keeps only the news article sections, so the rest of the page is never built into a tree.
+    :return: BeautifulSoup SoupStrainer.
+    """
+    from bs4 import SoupStrainer
+
+    return SoupStrainer('section', class_=NEWS_ARTICLE_CLASS_PATTERN)
+
+
+@functools.cache
+def get_html_parser() -> str:
+    """
+    Get the fastest HTML parser available to BeautifulSoup.
+    :return: 'lxml' if lxml is installed, otherwise 'html.parser'.
+    """
+    if importlib.util.find_spec('lxml') is not None:
+        return 'lxml'
+    return 'html.parser'
+
 
 def extract_href_tags(soup: BeautifulSoup) -> list[str]:
     """
@@ -14,7 +65,7 @@ def extract_href_tags(soup: BeautifulSoup) -> list[str]:
     :param soup: BeautifulSoup object.
     :return: List of URLs.
     """
-    logger.info(f'Extract href attributes with BeautifulSoup')
+    logger.info('Extract href attributes with BeautifulSoup')
     href_tags = soup.find_all('a', href=True)
     if len(href_tags) == 0:
         logger.error("No href tags found.")
@@ -30,20 +81,57 @@ def parse_response_to_bs4(response: Response) -> BeautifulSoup:
     :param response: Response from the URL.
     :return: BeautifulSoup object.
     """
-    logger.info(f'Parsing a response to BeautifulSoup')
+    from bs4 import BeautifulSoup
+
+    logger.debug('Parsing a response to BeautifulSoup')
     return BeautifulSoup(response.text, 'html.parser')
 
 
-def get_unique_urls(url: str) -> list[str]:
+def parse_hrefs(html: str, parser: str | None = None) -> list[str]:
+    """
+    Parse only the anchor tags of an HTML page and extract their href attributes.
+    :param html: HTML page.
+    :param parser: BeautifulSoup parser name.
+                    Default is None, which uses 'get_html_parser'.
+    :return: List of URLs.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, parser or get_html_parser(), parse_only=get_href_strainer())
+    return extract_href_tags(soup)
+
+
+def parse_news_article_texts(html: str, parser: str | None = None) -> list[str]:
+    """
+    Parse only the news article sections of an HTML page and extract their texts.
+    :param html: HTML page.
+    :param parser: BeautifulSoup parser name.
+                    Default is None, which uses 'get_html_parser'.
+    :return: List of extracted texts. Empty if the page has no news article.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, parser or get_html_parser(), parse_only=get_news_article_strainer())
+    news_articles = find_all_news_articles(soup)
+    if news_articles:
+        return append_extracted_text(news_articles)
+    return []
+
+
+def get_unique_urls(url: str, cache: HttpCache | None = None) -> list[str]:
     """
     Get a list of unique URLs from the given URL.
     :param url: URL to parse.
-    :return: List of unique URLs.
+    :param cache: HTTP cache used to fetch the page.
+                Default is None, which always fetches from the server.
+    :return: List of unique URLs. Empty if the page could not be fetched.
     """
-    logger.info(f'Get unique hrefs from {url}')
-    response = requests.get(url)
-    soup = parse_response_to_bs4(response)
-    url_list = extract_href_tags(soup)
+    logger.info('Get unique hrefs from %s', url)
+    page = fetch_pages([url], cache=cache)[0]
+    if page is None:
+        logger.error('Failed to fetch %s', url)
+        return []
+    url_list = parse_hrefs(page)
     return list(set(url_list))
 
 
@@ -74,27 +162,77 @@ def append_extracted_text(news_articles: bs4.ResultSet) -> list[str]:
     return news_article_list
 
 
-def extract_text_from_url_list(href_list: list[str]) -> list[str]:
+def extract_texts_by_url(
+        href_list: list[str],
+        base_url: str = NHK_BASE_URL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        **fetch_kwargs) -> dict[str, list[str]]:
     """
-    Extract all text from the given href attributes.
+    Extract the news articles' texts of each href, fetching the pages concurrently.
     :param href_list: List of href attributes.
-    :return: List of extracted texts.
+    :param base_url: URL that the hrefs are relative to.
+                    Default is NHK's URL.
+    :param concurrency: Maximum number of requests in flight.
+    :param fetch_kwargs: Other keyword arguments passed to 'fetch_all', such as 'timeout' or 'retries'.
+    :return: Dictionary where key is the href and value is the list of its extracted texts,
+            in the same order as the href list. Hrefs without any news article are left out.
     """
     logger.info('Extract news articles\' texts from a href list')
-    text_list = []
-    for href in href_list:
-        url = 'https://www3.nhk.or.jp' + href
-
-        inner_response = requests.get(url)
-        inner_response.encoding = 'utf-8'
-        inner_soup = BeautifulSoup(inner_response.text, 'html.parser')
+    urls = [base_url + href for href in href_list]
+    pages = fetch_pages(urls, concurrency=concurrency, **fetch_kwargs)
+    return extract_texts_from_pages(href_list, pages, base_url)
 
-        news_articles = find_all_news_articles(inner_soup)
 
-        if news_articles:
-            text_list += append_extracted_text(news_articles)
+def extract_texts_from_pages(
+        href_list: list[str],
+        pages: list[str | None],
+        base_url: str = NHK_BASE_URL) -> dict[str, list[str]]:
+    """
+    Extract the news articles' texts of fetched pages.
+    :param href_list: List of href attributes.
+    :param pages: HTML page of each href, in the same order. None stands for a page that could not be fetched.
+    :param base_url: URL that the hrefs are relative to, used in the log messages.
+                    Default is NHK's URL.
+    :return: Dictionary where key is the href and value is the list of its extracted texts,
+            in the same order as the href list. Hrefs without any news article are left out.
+    """
+    texts_by_url = {}
+    for href, page in zip(href_list, pages):
+        if page is None:
+            continue
+
+        url = base_url + href
+        news_article_texts = parse_news_article_texts(page)
+
+        if news_article_texts:
+            texts_by_url[href] = news_article_texts
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Extracted %d texts with %d characters from %s',
+                             len(news_article_texts), sum(map(len, news_article_texts)), url)
         else:
-            logger.warning(f"No news articles found from url: {url}.")
+            logger.warning("No news articles found from url: %s.", url)
+            metrics.increment('articles_without_text_total')
+
+    return texts_by_url
+
+
+def extract_text_from_url_list(
+        href_list: list[str],
+        base_url: str = NHK_BASE_URL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        **fetch_kwargs) -> list[str]:
+    """
+    Extract all text from the given href attributes.
+    :param href_list: List of href attributes.
+    :param base_url: URL that the hrefs are relative to.
+                    Default is NHK's URL.
+    :param concurrency: Maximum number of requests in flight.
+    :param fetch_kwargs: Other keyword arguments passed to 'fetch_all', such as 'timeout' or 'retries'.
+    :return: List of extracted texts.
+    """
+    text_list = []
+    for texts in extract_texts_by_url(href_list, base_url, concurrency, **fetch_kwargs).values():
+        text_list += texts
 
     if not text_list:
         logger.warning('No text extracted from the news articles')
@@ -0,0 +1,211 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import tokenize_text_to_records
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from jp_news_scraper_pipeline.jp_news_scraper.token_cache import get_token_cache, set_persistent_token_cache_path, \
+    get_persistent_token_cache_path
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_pos_codes, get_tokenizer, get_tokenizer_mode, \
+    warm_up_tokenizer, get_excluded_pos_ids
+from jp_news_scraper_pipeline.metrics import metrics, MetricsRegistry, MetricsSnapshot
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+# Minimum number of texts each worker should get before a process pool is worth its startup cost.
+MIN_TEXTS_PER_WORKER = 8
+
+# Number of chunks handed to each worker, so that a worker with short articles can pick up more work.
+CHUNKS_PER_WORKER = 4
+
+# Tokenizer, mode, Part of Speech codes, excluded Part of Speech IDs and token cache of the current worker process.
+# It is only set in pool workers, whose settings never change after the initializer.
+_worker_state: tuple | None = None
+
+
+def _build_state() -> tuple:
+    """
+    Get the tokenizer, mode, Part of Speech codes, excluded Part of Speech IDs and token cache from the registries.
+    :return: Tuple of the tokenization state.
+    """
+    warm_up_tokenizer()
+    return get_tokenizer(), get_tokenizer_mode(), get_pos_codes(), get_excluded_pos_ids(), get_token_cache()
+
+
+def _init_worker(persistent_cache_path: str | None = None) -> None:
+    """
+    Build the tokenizer and the token cache once for the current worker process.
+    :param persistent_cache_path: File of the persistent tier of the token cache in the parent process.
+                                Default is None, which only uses the in-process LRU tier.
+    :return: None
+    """
+    global _worker_state
+    if persistent_cache_path is not None:
+        set_persistent_token_cache_path(persistent_cache_path)
+    _worker_state = _build_state()
+
+
+def _tokenize_chunk(
+        text_chunk: list[str],
+        filter_tokens: bool = False) -> tuple[list[list[tuple[str, int]]], MetricsSnapshot]:
+    """
+    Tokenize a chunk of texts in a worker process, or in the parent process on the serial path.
+    :param text_chunk: Texts to tokenize.
+    :param filter_tokens: Whether to drop morphemes with an excluded Part of Speech or non-Japanese characters.
+    :return: Tuple of the morpheme records of each text, in the same order as the chunk,
+            and the snapshot of the chunk's metrics, to be merged into the parent's registry.
+    """
+    # The serial path reads the registries on every call, so that it follows the parent's current settings.
+    state = _worker_state if _worker_state is not None else _build_state()
+    tokenizer_obj, mode, pos_codes, excluded_pos_ids, token_cache = state
+    if not filter_tokens:
+        excluded_pos_ids = None
+    chunk_metrics = MetricsRegistry()
+    records_per_text = [tokenize_text_to_records(
+        text, tokenizer_obj, mode, pos_codes, excluded_pos_ids, chunk_metrics, token_cache) for text in text_chunk]
+    token_cache.flush()
+    return records_per_text, chunk_metrics.snapshot()
+
+
+def _tokenize_chunk_to_buffer(
+        text_chunk: list[str],
+        filter_tokens: bool = False) -> tuple[TokenBuffer, MetricsSnapshot]:
+    """
+    Tokenize a chunk of texts in a worker process into a single token buffer,
+    which is much smaller to send back to the parent than the morpheme records.
+    :param text_chunk: Texts to tokenize.
+    :param filter_tokens: Whether to drop morphemes with an excluded Part of Speech or non-Japanese characters.
+    :return: Tuple of the token buffer of the chunk and the snapshot of the chunk's metrics.
+    """
+    records_per_text, chunk_metrics = _tokenize_chunk(text_chunk, filter_tokens)
+    token_buffer = TokenBuffer()
+    for records in records_per_text:
+        token_buffer.extend_records(records)
+    return token_buffer, chunk_metrics
+
+
+def split_into_chunks(items: list, chunk_count: int) -> list[list]:
+    """
+    Split a list into contiguous chunks of nearly equal size.
+    :param items: List to split.
+    :param chunk_count: Number of chunks.
+    :return: List of chunks, which keep the order of the original list when concatenated.
+    """
+    chunk_count = max(1, min(chunk_count, len(items)))
+    chunk_size, remainder = divmod(len(items), chunk_count)
+    chunks = []
+    start = 0
+    for i in range(chunk_count):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def get_worker_count(text_count: int, max_workers: int | None = None) -> int:
+    """
+    Get the number of worker processes to use for the given number of texts.
+    :param text_count: Number of texts to tokenize.
+    :param max_workers: Maximum number of worker processes.
+                        Default is None, which uses the number of CPUs.
+    :return: Number of worker processes. 1 means the texts should be tokenized serially.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    return max(1, min(max_workers, text_count // MIN_TEXTS_PER_WORKER))
+
+
+def tokenize_texts(
+        joined_text_list: list[str],
+        max_workers: int | None = None,
+        filter_tokens: bool = False) -> list[list[tuple[str, int]]]:
+    """
+    Tokenize texts across a process pool, falling back to the serial path for small inputs.
+    :param joined_text_list: Text list.
+    :param max_workers: Maximum number of worker processes.
+                        Default is None, which uses the number of CPUs.
+    :param filter_tokens: Whether to drop morphemes with an excluded Part of Speech or non-Japanese characters.
+                        Default is False.
+    :return: Morpheme records of each text, in the same order as the text list.
+    """
+    worker_count = get_worker_count(len(joined_text_list), max_workers)
+    if worker_count == 1:
+        logger.info('Tokenize texts serially.')
+        records_per_text, chunk_metrics = _tokenize_chunk(joined_text_list, filter_tokens)
+        metrics.merge(chunk_metrics)
+        return records_per_text
+
+    logger.info('Tokenize texts with %d worker processes.', worker_count)
+    chunks = split_into_chunks(joined_text_list, worker_count * CHUNKS_PER_WORKER)
+    records_per_text = []
+    with ProcessPoolExecutor(max_workers=worker_count, initializer=_init_worker,
+                             initargs=(get_persistent_token_cache_path(),)) as executor:
+        for chunk_records, chunk_metrics in executor.map(_tokenize_chunk, chunks, itertools.repeat(filter_tokens)):
+            records_per_text += chunk_records
+            metrics.merge(chunk_metrics)
+    return records_per_text
+
+
+def extract_morpheme_records_parallel(
+        joined_text_list: list[str],
+        max_workers: int | None = None,
+        filter_tokens: bool = False) -> list[tuple[str, int]]:
+    """
+    Extract morphemes together with their Part of Speech code across a process pool.
+    :param joined_text_list: Text list.
+    :param max_workers: Maximum number of worker processes.
+                        Default is None, which uses the number of CPUs.
+    :param filter_tokens: Whether to drop morphemes with an excluded Part of Speech or non-Japanese characters.
+                        Default is False.
+    :return: List of (morpheme, Part of Speech code) tuples,
+            in the same order as the serial 'extract_morpheme_records'.
+    """
+    logger.info('Extract morphemes with their Part of Speech from text list.')
+    records = []
+    for text_records in tokenize_texts(joined_text_list, max_workers, filter_tokens):
+        records += text_records
+
+    if not records:
+        logger.warning('No morphemes found.')
+
+    return records
+
+
+def extract_token_buffer_parallel(
+        joined_text_list: list[str],
+        max_workers: int | None = None,
+        filter_tokens: bool = False) -> TokenBuffer:
+    """
+    Extract morphemes together with their Part of Speech code across a process pool into a token buffer.
+    :param joined_text_list: Text list.
+    :param max_workers: Maximum number of worker processes.
+                        Default is None, which uses the number of CPUs.
+    :param filter_tokens: Whether to drop morphemes with an excluded Part of Speech or non-Japanese characters.
+                        Default is False.
+    :return: TokenBuffer with the morphemes in the same order as the serial 'extract_morpheme_records'.
+    """
+    logger.info('Extract morphemes with their Part of Speech from text list into a token buffer.')
+    worker_count = get_worker_count(len(joined_text_list), max_workers)
+    if worker_count == 1:
+        token_buffer, chunk_metrics = _tokenize_chunk_to_buffer(joined_text_list, filter_tokens)
+        metrics.merge(chunk_metrics)
+    else:
+        logger.info('Tokenize texts with %d worker processes.', worker_count)
+        chunks = split_into_chunks(joined_text_list, worker_count * CHUNKS_PER_WORKER)
+        token_buffer = TokenBuffer()
+        with ProcessPoolExecutor(max_workers=worker_count, initializer=_init_worker,
+                                 initargs=(get_persistent_token_cache_path(),)) as executor:
+            for chunk_buffer, chunk_metrics in executor.map(
+                    _tokenize_chunk_to_buffer, chunks, itertools.repeat(filter_tokens)):
+                token_buffer.extend(chunk_buffer)
+                metrics.merge(chunk_metrics)
+
+    if not len(token_buffer):
+        logger.warning('No morphemes found.')
+
+    return token_buffer
+
+
+if __name__ == '__main__':
+    pass
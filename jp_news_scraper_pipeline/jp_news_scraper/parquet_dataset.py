@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+
+if TYPE_CHECKING:
+    # PyArrow is imported on first use, so that runs without new articles do not load it.
+    import pandas as pd
+    import pyarrow.dataset as ds
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+DEFAULT_DATASET_DIR = 'data/morpheme_dataset'
+
+DATASET_COMPRESSION = 'zstd'
+
+# Maximum number of rows per row group.
+# Large row groups keep the per-group overhead low when scanning a whole partition,
+# while the min/max statistics of each group still let filters skip most of a sorted file.
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+
+# Column that the daily partitions are named after, as in 'Date=2024-07-04/'.
+PARTITION_COLUMN = 'Date'
+
+# Columns that compacted files are sorted by, so that their row group statistics are selective.
+DEFAULT_SORT_COLUMNS = ('Kanji',)
+
+
+def write_to_morpheme_dataset(
+        df: pd.DataFrame,
+        dataset_dir: str | os.PathLike = DEFAULT_DATASET_DIR,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> int:
+    """
+    Append a DataFrame to the Parquet dataset, partitioned by the day of its TimeStamp column.
+    Each call adds one new file per day, compressed with zstd and with dictionary-encoded columns.
+    :param df: Pandas DataFrame with a TimeStamp column formatted as 'YYYY-MM-DD HH:MM:SS'.
+    :param dataset_dir: Directory of the dataset.
+    :param row_group_size: Maximum number of rows per row group.
+    :return: Number of written rows.
+    """
+    if df.empty:
+        logger.warning('No rows to write to the Parquet dataset')
+        return 0
+
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    logger.info('Append %d rows to the Parquet dataset %s', len(df), dataset_dir)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.append_column(PARTITION_COLUMN, pc.utf8_slice_codeunits(table['TimeStamp'], 0, 10))
+    pq.write_to_dataset(
+        table,
+        dataset_dir,
+        partition_cols=[PARTITION_COLUMN],
+        row_group_size=row_group_size,
+        compression=DATASET_COMPRESSION,
+        use_dictionary=True,
+        write_statistics=True)
+    return len(df)
+
+
+def open_morpheme_dataset(dataset_dir: str | os.PathLike = DEFAULT_DATASET_DIR) -> ds.Dataset:
+    """
+    Open the Parquet dataset with its date partitions.
+    :param dataset_dir: Directory of the dataset.
+    :return: PyArrow dataset.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+    return ds.dataset(dataset_dir, format='parquet', partitioning=partitioning)
+
+
+def compact_partition(
+        partition_dir: Path,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        sort_columns: tuple[str, ...] = DEFAULT_SORT_COLUMNS) -> int:
+    """
+    Merge the files of a partition into a single file sorted by the given columns.
+    The merged file is written next to the small files and renamed into place before they are removed,
+    so that readers never see a partition without its rows.
+    :param partition_dir: Directory of the partition.
+    :param row_group_size: Maximum number of rows per row group.
+    :param sort_columns: Columns that the merged file is sorted by.
+    :return: Number of merged files. 0 if the partition has a single file.
+    """
+    files = sorted(partition_dir.glob('*.parquet'))
+    if len(files) < 2:
+        return 0
+
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    table = ds.dataset([str(file) for file in files], format='parquet').to_table()
+    table = table.sort_by([(column, 'ascending') for column in sort_columns]).unify_dictionaries()
+
+    # Files starting with '.' are ignored by dataset readers until the rename.
+    temporary_path = partition_dir / f'.{uuid.uuid4().hex}.tmp'
+    pq.write_table(
+        table,
+        temporary_path,
+        row_group_size=row_group_size,
+        compression=DATASET_COMPRESSION,
+        use_dictionary=True,
+        write_statistics=True)
+    temporary_path.replace(partition_dir / f'compacted-{uuid.uuid4().hex}.parquet')
+    for file in files:
+        file.unlink()
+    return len(files)
+
+
+def compact_morpheme_dataset(
+        dataset_dir: str | os.PathLike = DEFAULT_DATASET_DIR,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        sort_columns: tuple[str, ...] = DEFAULT_SORT_COLUMNS) -> int:
+    """
+    Merge the small files of every partition of the Parquet dataset.
+    :param dataset_dir: Directory of the dataset.
+    :param row_group_size: Maximum number of rows per row group.
+    :param sort_columns: Columns that the merged files are sorted by.
+    :return: Number of merged files.
+    """
+    logger.info('Compact the Parquet dataset %s', dataset_dir)
+    merged_count = 0
+    for partition_dir in sorted(Path(dataset_dir).glob(f'{PARTITION_COLUMN}=*')):
+        merged_count += compact_partition(partition_dir, row_group_size, sort_columns)
+    logger.info('Merged %d files', merged_count)
+    return merged_count
+
+
+if __name__ == '__main__':
+    pass
@@ -1,11 +1,43 @@
-import sqlite3
+from __future__ import annotations
 
-import pandas as pd
+import itertools
+import sqlite3
+from collections import Counter
+from typing import Iterable, TYPE_CHECKING
 
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
+# Number of rows sent to SQLite per executemany call during bulk loads.
+DEFAULT_BULK_CHUNK_SIZE = 10000
+
+# Page cache size in KiB used during bulk loads.
+DEFAULT_CACHE_SIZE_KIB = 65536
+
+# Maximum number of bytes of the database file that SQLite may memory-map.
+DEFAULT_MMAP_SIZE = 268435456
+
+# Statuses of a URL in the CrawlState table, in pipeline order.
+CRAWL_PENDING = 'pending'
+CRAWL_FETCHED = 'fetched'
+CRAWL_TOKENIZED = 'tokenized'
+CRAWL_LOADED = 'loaded'
+CRAWL_STATUSES = (CRAWL_PENDING, CRAWL_FETCHED, CRAWL_TOKENIZED, CRAWL_LOADED)
+
+# Number of fetches after which a URL that never reaches the loaded status is given up,
+# such as a page without any news article.
+DEFAULT_MAX_CRAWL_ATTEMPTS = 3
+
+# Number of JapanNews rows migrated to the normalized tables per transaction.
+DEFAULT_MIGRATION_CHUNK_SIZE = 1000000
+
+# Fact table of the normalized schema, whose presence means new rows are no longer appended to JapanNews table.
+OCCURRENCE_TABLE = 'MorphemeOccurrences'
+
 
 def create_japan_news_table(conn: sqlite3.Connection) -> None:
     """
@@ -50,8 +82,560 @@ def fetch_exist_url_from_db(conn: sqlite3.Connection) -> list[str]:
     """
     logger.info('Fetch existing URLs from the database')
     existing_urls_query = 'SELECT Url FROM NewsUrls'
-    existing_urls = pd.read_sql_query(existing_urls_query, conn)['Url'].tolist()
-    return existing_urls
+    return [url for url, in conn.execute(existing_urls_query)]
+
+
+def fetch_new_urls_from_db(conn: sqlite3.Connection, urls: list[str]) -> list[str]:
+    """
+    Fetch the URLs that are not in the NewsUrls table yet.
+    The URLs are loaded into a temporary table and anti-joined against the NewsUrls primary key,
+    so the existing URLs never leave the database.
+    :param conn: SQLite 3 connection.
+    :param urls: URL list.
+    :return: URLs that are not in the database, in the same order as the URL list.
+    """
+    logger.info('Fetch new URLs from the database')
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS CandidateUrls (
+            Position INTEGER PRIMARY KEY,
+            Url TEXT NOT NULL
+        )
+        ''')
+    conn.execute('DELETE FROM CandidateUrls')
+    conn.executemany('INSERT INTO CandidateUrls (Url) VALUES (?)', ((url,) for url in urls))
+    new_urls_query = '''
+        SELECT c.Url FROM CandidateUrls AS c
+        WHERE NOT EXISTS (SELECT 1 FROM NewsUrls AS n WHERE n.Url = c.Url)
+        ORDER BY c.Position
+        '''
+    new_urls = [row[0] for row in conn.execute(new_urls_query)]
+    conn.execute('DELETE FROM CandidateUrls')
+    return new_urls
+
+
+def create_crawl_state_table(conn: sqlite3.Connection) -> None:
+    """
+    Create the CrawlState table if not exist.
+    The table keeps the status of each URL through the pipeline,
+    the number of times it was fetched and the last error.
+    URLs of NewsUrls table without a row in this table were crawled before the table existed and count as loaded.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    query = '''
+        CREATE TABLE IF NOT EXISTS CrawlState (
+            Url TEXT NOT NULL PRIMARY KEY,
+            Status TEXT NOT NULL,
+            Attempts INTEGER NOT NULL DEFAULT 0,
+            LastError TEXT,
+            UpdatedAt TEXT NOT NULL
+        )
+        '''
+    conn.execute(query)
+
+
+def enqueue_crawl_urls(conn: sqlite3.Connection, urls: list[str]) -> None:
+    """
+    Add URLs to the CrawlState table as pending. URLs that are already in the table keep their state.
+    The statement is not committed, so that it can share a transaction with the NewsUrls insert.
+    :param conn: Sqlite3 connection.
+    :param urls: URL list.
+    :return: None
+    """
+    query = f'''
+        INSERT OR IGNORE INTO CrawlState (Url, Status, UpdatedAt)
+        VALUES (?, '{CRAWL_PENDING}', datetime('now', 'localtime'))
+        '''
+    conn.executemany(query, ((url,) for url in urls))
+
+
+def fetch_unfinished_crawl_urls(
+        conn: sqlite3.Connection,
+        max_attempts: int = DEFAULT_MAX_CRAWL_ATTEMPTS) -> list[str]:
+    """
+    Fetch the URLs that are not loaded yet and have attempts left, such as those of a crawl that stopped midway.
+    :param conn: Sqlite3 connection.
+    :param max_attempts: Number of fetches after which a URL is given up.
+    :return: URL list, in the order the URLs were added.
+    """
+    query = f'''
+        SELECT Url FROM CrawlState
+        WHERE Status != '{CRAWL_LOADED}' AND Attempts < ?
+        ORDER BY rowid
+        '''
+    return [url for url, in conn.execute(query, (max_attempts,))]
+
+
+def update_crawl_status(
+        conn: sqlite3.Connection,
+        urls: list[str],
+        status: str,
+        count_attempt: bool = False) -> None:
+    """
+    Set the status of URLs in the CrawlState table and clear their last error.
+    The statement is not committed, so that a status can be committed together with the data it stands for.
+    :param conn: Sqlite3 connection.
+    :param urls: URL list.
+    :param status: One of 'CRAWL_STATUSES'.
+    :param count_attempt: Whether to count a fetch attempt. Default is False.
+    :return: None
+    """
+    if status not in CRAWL_STATUSES:
+        raise ValueError(f'Unknown crawl status: {status}')
+    query = f'''
+        UPDATE CrawlState
+        SET Status = ?, Attempts = Attempts + {int(count_attempt)}, LastError = NULL,
+            UpdatedAt = datetime('now', 'localtime')
+        WHERE Url = ?
+        '''
+    conn.executemany(query, ((status, url) for url in urls))
+
+
+def record_crawl_error(conn: sqlite3.Connection, urls: list[str], error: str, count_attempt: bool = False) -> None:
+    """
+    Record an error for URLs in the CrawlState table and set them back to pending,
+    because the work after their fetch only exists in memory.
+    :param conn: Sqlite3 connection.
+    :param urls: URL list.
+    :param error: Error message.
+    :param count_attempt: Whether to count a fetch attempt. Default is False.
+    :return: None
+    """
+    query = f'''
+        UPDATE CrawlState
+        SET Status = '{CRAWL_PENDING}', Attempts = Attempts + {int(count_attempt)}, LastError = ?,
+            UpdatedAt = datetime('now', 'localtime')
+        WHERE Url = ?
+        '''
+    conn.executemany(query, ((error, url) for url in urls))
+
+
+def create_text_hash_table(conn: sqlite3.Connection) -> None:
+    """
+    Create the TextHashes table if not exist.
+    The table keeps the content hash of every article and paragraph that was loaded, with the URL it was first seen at.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    query = '''
+        CREATE TABLE IF NOT EXISTS TextHashes (
+            Hash BLOB NOT NULL PRIMARY KEY,
+            Url TEXT NOT NULL,
+            TimeStamp TEXT NOT NULL
+        ) WITHOUT ROWID
+        '''
+    conn.execute(query)
+
+
+def fetch_known_text_hashes(conn: sqlite3.Connection, hashes: list[bytes], chunk_size: int = 500) -> set[bytes]:
+    """
+    Fetch the given content hashes that are already in the TextHashes table.
+    :param conn: Sqlite3 connection.
+    :param hashes: Content hashes to look up.
+    :param chunk_size: Number of hashes looked up per query, which keeps each query under SQLite's variable limit.
+    :return: Set of known hashes.
+    """
+    known_hashes = set()
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size]
+        placeholders = ', '.join('?' * len(chunk))
+        query = f'SELECT Hash FROM TextHashes WHERE Hash IN ({placeholders})'
+        known_hashes.update(text_hash for text_hash, in conn.execute(query, chunk))
+    return known_hashes
+
+
+def save_text_hashes(conn: sqlite3.Connection, url_by_hash: dict[bytes, str]) -> None:
+    """
+    Save content hashes to the TextHashes table.
+    The statement is not committed, so that the hashes can be committed together with the rows of their texts.
+    :param conn: Sqlite3 connection.
+    :param url_by_hash: Dictionary where key is the content hash and value is the URL of its text.
+    :return: None
+    """
+    query = '''
+        INSERT OR IGNORE INTO TextHashes (Hash, Url, TimeStamp)
+        VALUES (?, ?, datetime('now', 'localtime'))
+        '''
+    conn.executemany(query, url_by_hash.items())
+
+
+def create_romaji_cache_table(conn: sqlite3.Connection) -> None:
+    """
+    Create the RomajiCache table if not exist.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    query = '''
+        CREATE TABLE IF NOT EXISTS RomajiCache (
+            Kanji TEXT NOT NULL PRIMARY KEY,
+            Romanji TEXT NOT NULL
+        )
+        '''
+    conn.execute(query)
+
+
+def fetch_cached_romaji(conn: sqlite3.Connection, morphemes: list[str], chunk_size: int = 500) -> dict[str, str]:
+    """
+    Fetch the cached romaji of the given morphemes from the RomajiCache table.
+    :param conn: Sqlite3 connection.
+    :param morphemes: Morphemes to look up.
+    :param chunk_size: Number of morphemes looked up per query, which keeps each query under SQLite's variable limit.
+    :return: Dictionary where key is the morpheme and value is its romaji. Morphemes not in the cache are left out.
+    """
+    logger.info('Fetch cached romaji from the database')
+    cached_romaji = {}
+    for start in range(0, len(morphemes), chunk_size):
+        chunk = morphemes[start:start + chunk_size]
+        placeholders = ', '.join('?' * len(chunk))
+        query = f'SELECT Kanji, Romanji FROM RomajiCache WHERE Kanji IN ({placeholders})'
+        cached_romaji.update(conn.execute(query, chunk).fetchall())
+    return cached_romaji
+
+
+def save_romaji_to_cache(conn: sqlite3.Connection, romaji_by_morpheme: dict[str, str]) -> None:
+    """
+    Save romaji to the RomajiCache table.
+    :param conn: Sqlite3 connection.
+    :param romaji_by_morpheme: Dictionary where key is the morpheme and value is its romaji.
+    :return: None
+    """
+    logger.info('Save %d romaji to the database cache', len(romaji_by_morpheme))
+    query = 'INSERT OR REPLACE INTO RomajiCache (Kanji, Romanji) VALUES (?, ?)'
+    conn.executemany(query, romaji_by_morpheme.items())
+
+
+def create_morpheme_frequency_table(conn: sqlite3.Connection) -> None:
+    """
+    Create the MorphemeFrequency table and its index if not exist.
+    The table keeps one row with a count per morpheme, Part of Speech and day,
+    and is the aggregate table that the queries of 'morpheme_query' read.
+    A new table is filled from the rows loaded before it existed.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    is_new = not has_table(conn, 'MorphemeFrequency')
+    query = '''
+        CREATE TABLE IF NOT EXISTS MorphemeFrequency (
+            Kanji TEXT NOT NULL,
+            PartOfSpeech TEXT NOT NULL,
+            Day TEXT NOT NULL,
+            Count INTEGER NOT NULL,
+            PRIMARY KEY (Kanji, PartOfSpeech, Day)
+        ) WITHOUT ROWID
+        '''
+    conn.execute(query)
+    index_query = '''
+        CREATE INDEX IF NOT EXISTS MorphemeFrequencyDayIndex
+        ON MorphemeFrequency (Day, Kanji, PartOfSpeech, Count)
+        '''
+    conn.execute(index_query)
+    if is_new:
+        _fill_morpheme_frequency(conn)
+
+
+def _fill_morpheme_frequency(conn: sqlite3.Connection) -> None:
+    """
+    Count the rows of the normalized tables, or else of JapanNews table, into the new MorphemeFrequency table.
+    Once a database is migrated, the loads only add their rows to the normalized tables.
+    The statements are not committed.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    if has_table(conn, OCCURRENCE_TABLE):
+        logger.info('Fill MorphemeFrequency table from %s table', OCCURRENCE_TABLE)
+        conn.execute(f'''
+            INSERT INTO MorphemeFrequency (Kanji, PartOfSpeech, Day, Count)
+            SELECT l.Kanji, p.PartOfSpeech, date(o.TsEpoch, 'unixepoch'), SUM(o.Occurrences)
+            FROM {OCCURRENCE_TABLE} AS o
+            JOIN Lexicon AS l ON l.MorphemeId = o.MorphemeId
+            JOIN PartsOfSpeech AS p ON p.PosId = o.PosId
+            GROUP BY 1, 2, 3
+            ''')
+    elif has_table(conn, 'JapanNews'):
+        logger.info('Fill MorphemeFrequency table from JapanNews table')
+        conn.execute('''
+            INSERT INTO MorphemeFrequency (Kanji, PartOfSpeech, Day, Count)
+            SELECT Kanji, PartOfSpeech, substr(TimeStamp, 1, 10), COUNT(*) FROM JapanNews
+            GROUP BY 1, 2, 3
+            ''')
+
+
+def upsert_morpheme_frequency(conn: sqlite3.Connection, morpheme_counter: Counter) -> None:
+    """
+    Add the counts of a batch to the MorphemeFrequency table.
+    :param conn: Sqlite3 connection.
+    :param morpheme_counter: Counter where key is a (morpheme, Part of Speech, day) tuple and value is its count.
+    :return: None
+    """
+    logger.info('Upsert %d morpheme counts into MorphemeFrequency table', len(morpheme_counter))
+    query = '''
+        INSERT INTO MorphemeFrequency (Kanji, PartOfSpeech, Day, Count) VALUES (?, ?, ?, ?)
+        ON CONFLICT (Kanji, PartOfSpeech, Day) DO UPDATE SET Count = Count + excluded.Count
+        '''
+    conn.executemany(query, ((*key, count) for key, count in morpheme_counter.items()))
+
+
+def configure_bulk_pragmas(
+        conn: sqlite3.Connection,
+        cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+        mmap_size: int = DEFAULT_MMAP_SIZE) -> None:
+    """
+    Tune the connection for bulk loads: WAL journal, NORMAL synchronous mode, a larger page cache and memory-mapped I/O.
+    :param conn: Sqlite3 connection.
+    :param cache_size_kib: Page cache size in KiB.
+    :param mmap_size: Maximum number of bytes of the database file to memory-map. 0 disables memory-mapped I/O.
+    :return: None
+    """
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = {-int(cache_size_kib)}')
+    conn.execute(f'PRAGMA mmap_size = {int(mmap_size)}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+
+def bulk_insert(
+        conn: sqlite3.Connection,
+        table: str,
+        columns: list[str],
+        rows: Iterable[tuple],
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> int:
+    """
+    Insert rows with one prepared INSERT statement, in chunks, inside a single transaction.
+    :param conn: Sqlite3 connection.
+    :param table: Table name.
+    :param columns: Column names, in the same order as the values of each row.
+    :param rows: Rows to insert.
+    :param chunk_size: Number of rows sent per executemany call.
+    :return: Number of inserted rows.
+    """
+    placeholders = ', '.join('?' * len(columns))
+    query = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+    row_iterator = iter(rows)
+    inserted = 0
+    with conn:
+        while chunk := list(itertools.islice(row_iterator, chunk_size)):
+            conn.executemany(query, chunk)
+            inserted += len(chunk)
+    logger.info('Insert %d rows into %s table', inserted, table)
+    return inserted
+
+
+def insert_dataframe(
+        conn: sqlite3.Connection,
+        table: str,
+        df: pd.DataFrame,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> int:
+    """
+    Insert a DataFrame into a table with 'bulk_insert', without going through 'DataFrame.to_sql'.
+    :param conn: Sqlite3 connection.
+    :param table: Table name.
+    :param df: Pandas DataFrame whose column names match the table's columns.
+    :param chunk_size: Number of rows sent per executemany call.
+    :return: Number of inserted rows.
+    """
+    return bulk_insert(conn, table, list(df.columns), df.itertuples(index=False, name=None), chunk_size)
+
+
+def has_table(conn: sqlite3.Connection, table: str) -> bool:
+    """
+    Check whether a table exists in the database.
+    :param conn: Sqlite3 connection.
+    :param table: Table name.
+    :return: True if the table exists.
+    """
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return conn.execute(query, (table,)).fetchone() is not None
+
+
+def create_normalized_tables(conn: sqlite3.Connection) -> None:
+    """
+    Create the tables of the normalized schema if not exist.
+    Lexicon and PartsOfSpeech tables give each morpheme and Part of Speech an integer key.
+    MorphemeOccurrences table keeps one row with a count per TimeStamp, Part of Speech and morpheme,
+    as the rows of a load share their TimeStamp, and is clustered by TimeStamp for time-range queries.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS Lexicon (
+            MorphemeId INTEGER PRIMARY KEY,
+            Kanji TEXT NOT NULL UNIQUE,
+            Romanji TEXT NOT NULL
+        )
+        ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS PartsOfSpeech (
+            PosId INTEGER PRIMARY KEY,
+            PartOfSpeech TEXT NOT NULL UNIQUE,
+            PartOfSpeechEnglish TEXT NOT NULL
+        )
+        ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {OCCURRENCE_TABLE} (
+            TsEpoch INTEGER NOT NULL,
+            PosId INTEGER NOT NULL REFERENCES PartsOfSpeech (PosId),
+            MorphemeId INTEGER NOT NULL REFERENCES Lexicon (MorphemeId),
+            Occurrences INTEGER NOT NULL,
+            PRIMARY KEY (TsEpoch, PosId, MorphemeId)
+        ) WITHOUT ROWID
+        ''')
+
+
+def create_normalized_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Create the covering indexes of MorphemeOccurrences table if not exist,
+    so that Part of Speech and per-morpheme queries never read the table itself.
+    Time-range queries are served by the primary key.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    logger.info('Creating %s indexes if not exist', OCCURRENCE_TABLE)
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS MorphemeOccurrencesPosIndex
+        ON {OCCURRENCE_TABLE} (PosId, TsEpoch, MorphemeId, Occurrences)
+        ''')
+    conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS MorphemeOccurrencesMorphemeIndex
+        ON {OCCURRENCE_TABLE} (MorphemeId, TsEpoch, PosId, Occurrences)
+        ''')
+
+
+def _upsert_occurrences_from(
+        conn: sqlite3.Connection,
+        source: str,
+        condition: str = 'true',
+        parameters: tuple = ()) -> None:
+    """
+    Add the rows of a table with the JapanNews columns to the normalized tables.
+    The statements are not committed.
+    :param conn: Sqlite3 connection.
+    :param source: Source table name.
+    :param condition: SQL condition on the source rows to add.
+    :param parameters: Parameters of the condition.
+    :return: None
+    """
+    conn.execute(f'''
+        INSERT OR IGNORE INTO Lexicon (Kanji, Romanji)
+        SELECT Kanji, MIN(Romanji) FROM {source} WHERE {condition} GROUP BY Kanji
+        ''', parameters)
+    conn.execute(f'''
+        INSERT OR IGNORE INTO PartsOfSpeech (PartOfSpeech, PartOfSpeechEnglish)
+        SELECT PartOfSpeech, MIN(PartOfSpeechEnglish) FROM {source} WHERE {condition} GROUP BY PartOfSpeech
+        ''', parameters)
+    # TimeStamp is local time without a zone. It is read as UTC, so that the days of TsEpoch match those of TimeStamp.
+    conn.execute(f'''
+        INSERT INTO {OCCURRENCE_TABLE} (TsEpoch, PosId, MorphemeId, Occurrences)
+        SELECT CAST(strftime('%s', s.TimeStamp) AS INTEGER), p.PosId, l.MorphemeId, COUNT(*)
+        FROM {source} AS s
+        JOIN Lexicon AS l ON l.Kanji = s.Kanji
+        JOIN PartsOfSpeech AS p ON p.PartOfSpeech = s.PartOfSpeech
+        WHERE {condition}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (TsEpoch, PosId, MorphemeId) DO UPDATE SET Occurrences = Occurrences + excluded.Occurrences
+        ''', parameters)
+
+
+def insert_normalized_dataframe(
+        conn: sqlite3.Connection,
+        df: pd.DataFrame,
+        chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> int:
+    """
+    Add a DataFrame with the JapanNews columns to the normalized tables, through a temporary staging table.
+    The statements are not committed, so that they can share a transaction with the rest of a load.
+    :param conn: Sqlite3 connection.
+    :param df: Pandas DataFrame with Kanji, Romanji, PartOfSpeech, PartOfSpeechEnglish and TimeStamp columns.
+    :param chunk_size: Number of rows sent per executemany call.
+    :return: Number of added morpheme occurrences.
+    """
+    columns = ['Kanji', 'Romanji', 'PartOfSpeech', 'PartOfSpeechEnglish', 'TimeStamp']
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS StagedMorphemes (
+            Kanji TEXT NOT NULL,
+            Romanji TEXT NOT NULL,
+            PartOfSpeech TEXT NOT NULL,
+            PartOfSpeechEnglish TEXT NOT NULL,
+            TimeStamp TEXT NOT NULL
+        )
+        ''')
+    conn.execute('DELETE FROM StagedMorphemes')
+    query = f'INSERT INTO StagedMorphemes ({", ".join(columns)}) VALUES (?, ?, ?, ?, ?)'
+    row_iterator = df[columns].itertuples(index=False, name=None)
+    while chunk := list(itertools.islice(row_iterator, chunk_size)):
+        conn.executemany(query, chunk)
+    _upsert_occurrences_from(conn, 'temp.StagedMorphemes')
+    conn.execute('DELETE FROM StagedMorphemes')
+    logger.info('Add %d morpheme occurrences to %s table', len(df), OCCURRENCE_TABLE)
+    return len(df)
+
+
+def migrate_japan_news_table(
+        conn: sqlite3.Connection,
+        chunk_size: int = DEFAULT_MIGRATION_CHUNK_SIZE,
+        drop_japan_news: bool = False) -> int:
+    """
+    Move the rows of JapanNews table to the normalized tables, one committed chunk of IDs at a time.
+    The last migrated ID is saved with each chunk, so an interrupted migration resumes where it stopped.
+    Once the normalized tables exist, loads add their rows to them instead of JapanNews table.
+    :param conn: Sqlite3 connection.
+    :param chunk_size: Number of JapanNews IDs migrated per transaction.
+    :param drop_japan_news: Whether to drop JapanNews table and reclaim its space once it is migrated.
+                            Default is False.
+    :return: Number of migrated rows.
+    """
+    with conn:
+        # The aggregate table is filled from JapanNews table before it moves, unless it already exists.
+        create_morpheme_frequency_table(conn)
+        create_normalized_tables(conn)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS SchemaMigrations (
+                Name TEXT NOT NULL PRIMARY KEY,
+                LastId INTEGER NOT NULL
+            )
+            ''')
+    if not has_table(conn, 'JapanNews'):
+        logger.info('No JapanNews table to migrate')
+        with conn:
+            create_normalized_indexes(conn)
+        return 0
+
+    row = conn.execute("SELECT LastId FROM SchemaMigrations WHERE Name = 'JapanNews'").fetchone()
+    last_id = 0 if row is None else row[0]
+    max_id = conn.execute('SELECT COALESCE(MAX(ID), 0) FROM JapanNews').fetchone()[0]
+    logger.info('Migrate JapanNews rows after ID %d up to ID %d to the normalized tables', last_id, max_id)
+    migrated = 0
+    while last_id < max_id:
+        end_id = min(last_id + chunk_size, max_id)
+        with conn:
+            _upsert_occurrences_from(conn, 'JapanNews', 'ID > ? AND ID <= ?', (last_id, end_id))
+            migrated += conn.execute('SELECT COUNT(*) FROM JapanNews WHERE ID > ? AND ID <= ?',
+                                     (last_id, end_id)).fetchone()[0]
+            conn.execute("INSERT OR REPLACE INTO SchemaMigrations (Name, LastId) VALUES ('JapanNews', ?)", (end_id,))
+        last_id = end_id
+        logger.info('Migrated JapanNews rows up to ID %d', last_id)
+
+    # Indexes are built once after the migration, which is cheaper than updating them on every chunk.
+    with conn:
+        create_normalized_indexes(conn)
+    if drop_japan_news:
+        logger.info('Drop JapanNews table')
+        with conn:
+            conn.execute('DROP TABLE JapanNews')
+            conn.execute("DELETE FROM SchemaMigrations WHERE Name = 'JapanNews'")
+        conn.execute('VACUUM')
+    return migrated
+
+
+def create_deferred_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Create the secondary indexes of JapanNews table if not exist.
+    Creating them once after a bulk load is cheaper than updating them on every insert.
+    :param conn: Sqlite3 connection.
+    :return: None
+    """
+    logger.info('Creating JapanNews indexes if not exist')
+    conn.execute('CREATE INDEX IF NOT EXISTS JapanNewsKanjiIndex ON JapanNews (Kanji)')
+    conn.execute('CREATE INDEX IF NOT EXISTS JapanNewsPartOfSpeechIndex ON JapanNews (PartOfSpeech)')
+    conn.execute('CREATE INDEX IF NOT EXISTS JapanNewsTimeStampIndex ON JapanNews (TimeStamp)')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,119 @@
+import hashlib
+import sqlite3
+import unicodedata
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import fetch_known_text_hashes
+from jp_news_scraper_pipeline.metrics import metrics
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+# Size in bytes of the BLAKE2b content hashes.
+TEXT_HASH_SIZE = 16
+
+# BLAKE2b personalization of each level, so that an article of a single paragraph and that paragraph differ.
+ARTICLE_HASH_PERSON = b'article'
+PARAGRAPH_HASH_PERSON = b'paragraph'
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a text for hashing, so that width variants and whitespace changes do not make it look new.
+    :param text: Text.
+    :return: NFKC-normalized text with each run of whitespace replaced by a single space.
+    """
+    return ' '.join(unicodedata.normalize('NFKC', text).split())
+
+
+def hash_text(normalized_text: str, person: bytes = PARAGRAPH_HASH_PERSON) -> bytes:
+    """
+    Hash a normalized text with BLAKE2b.
+    :param normalized_text: Text from 'normalize_text'.
+    :param person: BLAKE2b personalization of the level of the text.
+                    Default is the paragraph level.
+    :return: Content hash.
+    """
+    return hashlib.blake2b(normalized_text.encode('utf-8'), digest_size=TEXT_HASH_SIZE, person=person).digest()
+
+
+def hash_paragraph(url: str, normalized_paragraph: str) -> bytes:
+    """
+    Hash a normalized paragraph together with the URL of its article,
+    so that a paragraph is only known to the page it was loaded from.
+    :param url: URL of the article.
+    :param normalized_paragraph: Paragraph from 'normalize_text'.
+    :return: Content hash.
+    """
+    return hash_text(f'{url}\n{normalized_paragraph}', PARAGRAPH_HASH_PERSON)
+
+
+def split_paragraphs(text: str) -> list[str]:
+    """
+    Split the text of a news article section into its non-empty lines.
+    :param text: Text.
+    :return: List of paragraphs.
+    """
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def deduplicate_texts(
+        conn: sqlite3.Connection,
+        texts_by_url: dict[str, list[str]],
+        pending_hashes: set[bytes] | None = None) -> tuple[dict[str, list[str]], dict[bytes, str]]:
+    """
+    Drop the articles that were already loaded, or that appear earlier in the same batch,
+    so that the same story served under several URLs is neither tokenized nor counted again,
+    and the paragraphs already loaded from the same URL, so that only the new paragraphs of an updated page are.
+    A paragraph that recurs in other articles, such as a standard weather or market line, is counted in each of them,
+    and a paragraph repeated within the text of an article is counted as often as it appears.
+    :param conn: Sqlite3 connection to the database holding the TextHashes table.
+    :param texts_by_url: Dictionary where key is the URL and value is the list of its texts.
+    :param pending_hashes: Hashes of the texts of earlier batches that are not loaded yet, which count as known.
+                        Default is None, which only looks up the TextHashes table.
+    :return: Tuple of the dictionary of the new texts by URL, which leaves out URLs without any new paragraph,
+            and the hashes of the new articles and paragraphs by URL, to be saved once their rows are loaded.
+    """
+    hashes_by_url = {}
+    for url, texts in texts_by_url.items():
+        paragraphs = [paragraph for text in texts for paragraph in split_paragraphs(text)]
+        normalized_paragraphs = [normalize_text(paragraph) for paragraph in paragraphs]
+        paragraph_hashes = [hash_paragraph(url, paragraph) for paragraph in normalized_paragraphs]
+        article_hash = hash_text('\n'.join(normalized_paragraphs), ARTICLE_HASH_PERSON)
+        hashes_by_url[url] = (article_hash, paragraphs, paragraph_hashes)
+
+    all_hashes = [text_hash for article_hash, _, paragraph_hashes in hashes_by_url.values()
+                  for text_hash in (article_hash, *paragraph_hashes)]
+    known_hashes = fetch_known_text_hashes(conn, all_hashes)
+    if pending_hashes:
+        known_hashes |= pending_hashes.intersection(all_hashes)
+
+    new_texts_by_url = {}
+    new_hashes: dict[bytes, str] = {}
+    duplicate_articles = 0
+    duplicate_paragraphs = 0
+    for url, (article_hash, paragraphs, paragraph_hashes) in hashes_by_url.items():
+        if article_hash in known_hashes or article_hash in new_hashes:
+            duplicate_articles += 1
+            continue
+        new_hashes[article_hash] = url
+
+        new_paragraphs = []
+        for paragraph, paragraph_hash in zip(paragraphs, paragraph_hashes):
+            # Only the fetches of the URL before this one make a paragraph known, not its earlier lines.
+            if paragraph_hash in known_hashes:
+                duplicate_paragraphs += 1
+                continue
+            new_hashes[paragraph_hash] = url
+            new_paragraphs.append(paragraph)
+        if new_paragraphs:
+            new_texts_by_url[url] = ['\n'.join(new_paragraphs)]
+
+    if duplicate_articles or duplicate_paragraphs:
+        logger.info('Skip %d duplicate articles and %d duplicate paragraphs', duplicate_articles, duplicate_paragraphs)
+    metrics.increment('articles_deduplicated_total', duplicate_articles)
+    metrics.increment('paragraphs_deduplicated_total', duplicate_paragraphs)
+    return new_texts_by_url, new_hashes
+
+
+if __name__ == '__main__':
+    pass
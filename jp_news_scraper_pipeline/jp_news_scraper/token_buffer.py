@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS, EN_POS_LABELS
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+
+# Type codes of the columns: 4-byte unsigned morpheme IDs and 1-byte Part of Speech codes.
+MORPHEME_ID_TYPECODE = 'I'
+POS_CODE_TYPECODE = 'B'
+
+
+class TokenBuffer:
+    """
+    Columnar buffer of morphemes and their Part of Speech codes.
+    Each morpheme string is stored once in a string table, and each token only costs
+    a 4-byte morpheme ID and a 1-byte Part of Speech code,
+    instead of a tuple and a string reference per column in parallel lists.
+    Both columns are appended together, so they always have the same length.
+    """
+
+    def __init__(self):
+        self.morpheme_ids = array(MORPHEME_ID_TYPECODE)
+        self.pos_codes = array(POS_CODE_TYPECODE)
+        # String table, where the index of a morpheme is its ID.
+        self.morphemes: list[str] = []
+        self._morpheme_index: dict[str, int] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple[str, int]]) -> TokenBuffer:
+        """
+        Build a buffer from morpheme records.
+        :param records: Iterable of (morpheme, Part of Speech code) tuples.
+        :return: TokenBuffer.
+        """
+        token_buffer = cls()
+        token_buffer.extend_records(records)
+        return token_buffer
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> TokenBuffer:
+        """
+        Build a buffer from a PyArrow table with Kanji and PartOfSpeech columns, such as one from 'to_arrow'
+        that was written to and read back from a Parquet file.
+        The dictionary of the Kanji column becomes the string table, so no string is read per token.
+        :param table: PyArrow table.
+        :return: TokenBuffer.
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        token_buffer = cls()
+        if not table.num_rows:
+            return token_buffer
+
+        table = table.select(['Kanji', 'PartOfSpeech'])
+        for name in table.column_names:
+            if not pa.types.is_dictionary(table.schema.field(name).type):
+                table = table.set_column(table.schema.get_field_index(name), name,
+                                         table.column(name).dictionary_encode())
+        table = table.unify_dictionaries().combine_chunks()
+        kanji = table.column('Kanji').chunk(0)
+        pos = table.column('PartOfSpeech').chunk(0)
+
+        token_buffer.morphemes = kanji.dictionary.to_pylist()
+        token_buffer._morpheme_index = {morpheme: morpheme_id
+                                        for morpheme_id, morpheme in enumerate(token_buffer.morphemes)}
+        token_buffer.morpheme_ids.frombytes(kanji.indices.cast(pa.uint32()).to_numpy().tobytes())
+        # The Part of Speech dictionary read from a file may not keep every label, so map the labels back to codes.
+        pos_code_map = np.array([JP_POS_LABELS.index(label) for label in pos.dictionary.to_pylist()], dtype=np.uint8)
+        token_buffer.pos_codes.frombytes(pos_code_map.take(pos.indices.to_numpy()).tobytes())
+        return token_buffer
+
+    def __len__(self) -> int:
+        return len(self.morpheme_ids)
+
+    def __iter__(self) -> Iterator[tuple[str, int]]:
+        morphemes = self.morphemes
+        for morpheme_id, pos_code in zip(self.morpheme_ids, self.pos_codes):
+            yield morphemes[morpheme_id], pos_code
+
+    def __getstate__(self) -> dict:
+        # The index is rebuilt from the string table, so that worker processes send less data.
+        return {'morpheme_ids': self.morpheme_ids, 'pos_codes': self.pos_codes, 'morphemes': self.morphemes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.morpheme_ids = state['morpheme_ids']
+        self.pos_codes = state['pos_codes']
+        self.morphemes = state['morphemes']
+        self._morpheme_index = {morpheme: morpheme_id for morpheme_id, morpheme in enumerate(self.morphemes)}
+
+    def intern(self, morpheme: str) -> int:
+        """
+        Get the ID of a morpheme, adding it to the string table if it is new.
+        :param morpheme: Morpheme.
+        :return: Morpheme ID.
+        """
+        morpheme_id = self._morpheme_index.get(morpheme)
+        if morpheme_id is None:
+            morpheme_id = self._morpheme_index[morpheme] = len(self.morphemes)
+            self.morphemes.append(morpheme)
+        return morpheme_id
+
+    def append(self, morpheme: str, pos_code: int) -> None:
+        """
+        Append a token.
+        :param morpheme: Morpheme.
+        :param pos_code: Part of Speech code, which indexes 'JP_POS_LABELS' and 'EN_POS_LABELS'.
+        :return: None
+        """
+        self.morpheme_ids.append(self.intern(morpheme))
+        self.pos_codes.append(pos_code)
+
+    def extend_records(self, records: Iterable[tuple[str, int]]) -> None:
+        """
+        Append tokens from morpheme records.
+        :param records: Iterable of (morpheme, Part of Speech code) tuples.
+        :return: None
+        """
+        intern = self.intern
+        for morpheme, pos_code in records:
+            self.morpheme_ids.append(intern(morpheme))
+            self.pos_codes.append(pos_code)
+
+    def extend(self, other: TokenBuffer) -> None:
+        """
+        Append the tokens of another buffer, such as one built in a worker process.
+        Its morpheme IDs are translated to this buffer's string table with a single vectorized take.
+        :param other: TokenBuffer.
+        :return: None
+        """
+        import numpy as np
+
+        if not len(other):
+            return
+        id_map = np.fromiter((self.intern(morpheme) for morpheme in other.morphemes),
+                             dtype=np.uint32, count=len(other.morphemes))
+        self.morpheme_ids.frombytes(id_map.take(other.morpheme_id_view()).tobytes())
+        self.pos_codes.extend(other.pos_codes)
+
+    def morpheme_id_view(self) -> np.ndarray:
+        """
+        :return: NumPy view of the morpheme IDs, sharing the buffer's memory.
+        """
+        import numpy as np
+
+        return np.frombuffer(self.morpheme_ids, dtype=np.uint32)
+
+    def pos_code_view(self) -> np.ndarray:
+        """
+        :return: NumPy view of the Part of Speech codes, sharing the buffer's memory.
+        """
+        import numpy as np
+
+        return np.frombuffer(self.pos_codes, dtype=np.uint8)
+
+    def get_nbytes(self) -> int:
+        """
+        Get the memory used by the ID and code columns.
+        The string table is not included, as its size depends on the vocabulary and not on the number of tokens.
+        :return: Size in bytes.
+        """
+        return (len(self.morpheme_ids) * self.morpheme_ids.itemsize
+                + len(self.pos_codes) * self.pos_codes.itemsize)
+
+    def to_arrow(self) -> pa.Table:
+        """
+        Convert the buffer to a PyArrow table with dictionary-encoded
+        Kanji, PartOfSpeech and PartOfSpeechEnglish columns.
+        The index arrays wrap the buffer's memory without copying it,
+        so the buffer must not be appended to while the table is in use.
+        They are read as signed integers, which Arrow expects for dictionary indices
+        and which hold every ID and code below 2**31 and 128.
+        :return: PyArrow table.
+        """
+        import pyarrow as pa
+
+        token_count = len(self)
+        morpheme_ids = pa.Array.from_buffers(pa.int32(), token_count, [None, pa.py_buffer(self.morpheme_ids)])
+        pos_codes = pa.Array.from_buffers(pa.int8(), token_count, [None, pa.py_buffer(self.pos_codes)])
+        return pa.table({
+            'Kanji': pa.DictionaryArray.from_arrays(morpheme_ids, pa.array(self.morphemes, pa.string())),
+            'PartOfSpeech': pa.DictionaryArray.from_arrays(pos_codes, pa.array(JP_POS_LABELS, pa.string())),
+            'PartOfSpeechEnglish': pa.DictionaryArray.from_arrays(pos_codes, pa.array(EN_POS_LABELS, pa.string())),
+        })
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Convert the buffer to a Pandas DataFrame with categorical
+        Kanji, PartOfSpeech and PartOfSpeechEnglish columns.
+        The categories are the string table and the Part of Speech labels,
+        so no string is created per token.
+        :return: Pandas DataFrame.
+        """
+        import pandas as pd
+
+        from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_pos_columns
+
+        pos_list, pos_translated_list = create_pos_columns(self.pos_code_view())
+        return pd.DataFrame({
+            'Kanji': pd.Categorical.from_codes(self.morpheme_id_view().view('int32'), categories=self.morphemes),
+            'PartOfSpeech': pos_list,
+            'PartOfSpeechEnglish': pos_translated_list,
+        })
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import importlib.metadata
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.utils import DEFAULT_DICT_TYPE, DEFAULT_SPLIT_MODE
+
+if TYPE_CHECKING:
+    from sudachipy import Tokenizer
+
+    from jp_news_scraper_pipeline.metrics import MetricsRegistry
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+DEFAULT_TOKEN_CACHE_PATH = '.token_cache.db'
+
+# Maximum number of short texts kept by the in-process LRU tier.
+DEFAULT_LRU_SIZE = 65536
+
+# Texts up to this length, such as single morphemes, go to the LRU tier. Longer texts go to the persistent tier.
+SHORT_TEXT_MAX_CHARS = 16
+
+# Number of new paragraph results written to the persistent tier per transaction.
+DEFAULT_FLUSH_SIZE = 512
+
+# Size in bytes of the BLAKE2b keys of the persistent tier.
+TOKEN_CACHE_KEY_SIZE = 16
+
+# Seconds after which the entries of a dictionary fingerprint that no cache opened are deleted,
+# such as those of a SudachiDict version that was upgraded.
+STALE_FINGERPRINT_SECONDS = 30 * 24 * 3600
+
+# Type code of the stored Part of Speech IDs, which SudachiPy numbers below 2**16.
+POS_ID_TYPECODE = 'H'
+
+# Separator of the stored morphemes, which never appears in a dictionary form.
+MORPHEME_SEPARATOR = '\x00'
+
+# Tokenizer output of a text: a (dictionary form, SudachiPy's Part of Speech ID) tuple per morpheme.
+RawTokens = tuple[tuple[str, int], ...]
+
+# Token caches of the current process, keyed by dictionary type and split mode.
+_token_caches: dict[tuple[str, str], TokenCache] = {}
+
+# File of the persistent tier of the caches created by 'get_token_cache'. None disables the tier.
+_persistent_path: str | None = None
+
+_registry_lock = threading.Lock()
+
+
+def get_dictionary_fingerprint(dict_type: str = DEFAULT_DICT_TYPE, mode: str = DEFAULT_SPLIT_MODE) -> str:
+    """
+    Describe what the tokenizer output depends on, so that cached results are dropped when any of it changes.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :param mode: Name of the split mode, 'A', 'B' or 'C'.
+    :return: Fingerprint with the SudachiPy version, the SudachiDict version and the split mode.
+    """
+    dict_package = f'SudachiDict-{dict_type}'
+    return (f'SudachiPy={importlib.metadata.version("SudachiPy")};'
+            f'{dict_package}={importlib.metadata.version(dict_package)};mode={mode.upper()}')
+
+
+class TokenCache:
+    """
+    Two-tier cache of tokenizer output.
+    Short texts and single morphemes are kept in a bounded in-process LRU,
+    and paragraphs in an optional SQLite file shared across runs.
+    The entries of the file are keyed by their dictionary fingerprint too,
+    so that caches of several dictionaries or modes can share it without seeing each other's entries.
+    The raw output is cached, so that filters applied afterward give the same records as without the cache.
+    """
+
+    def __init__(
+            self,
+            fingerprint: str,
+            persistent_path: str | os.PathLike | None = None,
+            lru_size: int = DEFAULT_LRU_SIZE,
+            short_text_max_chars: int = SHORT_TEXT_MAX_CHARS,
+            flush_size: int = DEFAULT_FLUSH_SIZE):
+        """
+        :param fingerprint: Dictionary fingerprint from 'get_dictionary_fingerprint'.
+        :param persistent_path: SQLite file of the persistent tier.
+                                Default is None, which only uses the LRU tier.
+        :param lru_size: Maximum number of entries of the LRU tier.
+        :param short_text_max_chars: Maximum length of the texts kept by the LRU tier.
+        :param flush_size: Number of new persistent entries written per transaction.
+        """
+        self.fingerprint = fingerprint
+        self.persistent_path = persistent_path
+        self.lru_size = lru_size
+        self.short_text_max_chars = short_text_max_chars
+        self.flush_size = flush_size
+        self._lru: OrderedDict[str, RawTokens] = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._pending: dict[bytes, RawTokens] = {}
+        # Guards the pending entries and the connection, which the threads of a pipeline share.
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # ID of the fingerprint in the persistent tier.
+        self._fingerprint_id: int | None = None
+        # Process that opened the connection, so that a forked worker opens its own.
+        self._pid: int | None = None
+
+    def tokenize(
+            self,
+            text: str,
+            tokenizer_obj: Tokenizer,
+            mode: Tokenizer.SplitMode,
+            metrics_registry: MetricsRegistry | None = None) -> RawTokens:
+        """
+        Get the tokenizer output of a text from the cache, tokenizing and caching it on a miss.
+        The tokenizer and the mode must be those the fingerprint was built for.
+        :param text: Text to tokenize.
+        :param tokenizer_obj: SudachiPy's tokenizer.
+        :param mode: SudachiPy's tokenizer's mode.
+        :param metrics_registry: Registry that receives the hit, miss and eviction counts.
+                                Default is None, which records nothing.
+        :return: Tuple of (dictionary form, Part of Speech ID) tuples.
+        """
+        if len(text) <= self.short_text_max_chars:
+            tokens = self._get_from_lru(text)
+            tier = 'lru'
+        elif self.persistent_path is not None:
+            tokens = self._get_from_persistent(text)
+            tier = 'persistent'
+        else:
+            return _tokenize(text, tokenizer_obj, mode)
+
+        if tokens is not None:
+            if metrics_registry is not None:
+                metrics_registry.increment(f'token_cache_{tier}_hits_total')
+            return tokens
+
+        tokens = _tokenize(text, tokenizer_obj, mode)
+        if tier == 'lru':
+            evicted = self._put_to_lru(text, tokens)
+        else:
+            evicted = 0
+            self._put_to_persistent(text, tokens)
+        if metrics_registry is not None:
+            metrics_registry.increment(f'token_cache_{tier}_misses_total')
+            if evicted:
+                metrics_registry.increment('token_cache_lru_evictions_total', evicted)
+        return tokens
+
+    def _get_from_lru(self, text: str) -> RawTokens | None:
+        with self._lru_lock:
+            tokens = self._lru.get(text)
+            if tokens is not None:
+                self._lru.move_to_end(text)
+            return tokens
+
+    def _put_to_lru(self, text: str, tokens: RawTokens) -> int:
+        """
+        :return: Number of evicted entries.
+        """
+        evicted = 0
+        with self._lru_lock:
+            self._lru[text] = tokens
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open the persistent tier in this process, and delete the entries of the fingerprints unused for long.
+        :return: Sqlite3 connection.
+        """
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                return self._conn
+
+            # A forked worker must not use the connection or write the pending entries of its parent.
+            self._pending = {}
+            conn = sqlite3.connect(self.persistent_path, timeout=30, check_same_thread=False)
+            with conn:
+                conn.execute('PRAGMA journal_mode = WAL')
+                # Files of the previous layout held the entries of a single fingerprint.
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'TokenCacheInfo'").fetchone():
+                    logger.info('Clear the token cache of the previous layout.')
+                    conn.execute('DROP TABLE IF EXISTS TokenCache')
+                    conn.execute('DROP TABLE TokenCacheInfo')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS TokenCacheFingerprints (
+                        FingerprintId INTEGER PRIMARY KEY,
+                        Fingerprint TEXT NOT NULL UNIQUE,
+                        LastUsedAt REAL NOT NULL
+                    )
+                    ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS TokenCache (
+                        FingerprintId INTEGER NOT NULL,
+                        Key BLOB NOT NULL,
+                        Morphemes TEXT NOT NULL,
+                        PosIds BLOB NOT NULL,
+                        PRIMARY KEY (FingerprintId, Key)
+                    ) WITHOUT ROWID
+                    ''')
+                now = time.time()
+                stale_ids = [fingerprint_id for fingerprint_id, in conn.execute(
+                    'SELECT FingerprintId FROM TokenCacheFingerprints WHERE LastUsedAt < ? AND Fingerprint != ?',
+                    (now - STALE_FINGERPRINT_SECONDS, self.fingerprint))]
+                for fingerprint_id in stale_ids:
+                    conn.execute('DELETE FROM TokenCache WHERE FingerprintId = ?', (fingerprint_id,))
+                    conn.execute('DELETE FROM TokenCacheFingerprints WHERE FingerprintId = ?', (fingerprint_id,))
+                if stale_ids:
+                    logger.info('Delete the token cache entries of %d unused dictionaries.', len(stale_ids))
+                conn.execute(
+                    'INSERT INTO TokenCacheFingerprints (Fingerprint, LastUsedAt) VALUES (?, ?) '
+                    'ON CONFLICT (Fingerprint) DO UPDATE SET LastUsedAt = excluded.LastUsedAt',
+                    (self.fingerprint, now))
+                self._fingerprint_id = conn.execute(
+                    'SELECT FingerprintId FROM TokenCacheFingerprints WHERE Fingerprint = ?',
+                    (self.fingerprint,)).fetchone()[0]
+            self._conn = conn
+            self._pid = os.getpid()
+            return conn
+
+    def _get_from_persistent(self, text: str) -> RawTokens | None:
+        key = _make_key(text)
+        conn = self._connect()
+        tokens = self._pending.get(key)
+        if tokens is not None:
+            return tokens
+        row = conn.execute('SELECT Morphemes, PosIds FROM TokenCache WHERE FingerprintId = ? AND Key = ?',
+                           (self._fingerprint_id, key)).fetchone()
+        if row is None:
+            return None
+        pos_ids = array(POS_ID_TYPECODE)
+        pos_ids.frombytes(row[1])
+        morphemes = row[0].split(MORPHEME_SEPARATOR) if pos_ids else []
+        return tuple(zip(morphemes, pos_ids))
+
+    def _put_to_persistent(self, text: str, tokens: RawTokens) -> None:
+        self._connect()
+        with self._lock:
+            self._pending[_make_key(text)] = tokens
+            is_full = len(self._pending) >= self.flush_size
+        if is_full:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the new paragraph results to the persistent tier in one transaction.
+        The pending entries are swapped out under the lock, so that entries added meanwhile wait for the next flush.
+        The cache is an optimization, so a locked database only drops the results.
+        :return: None
+        """
+        with self._lock:
+            if not self._pending or self._conn is None or self._pid != os.getpid():
+                return
+            pending, self._pending = self._pending, {}
+            conn = self._conn
+        rows = [(self._fingerprint_id, key, MORPHEME_SEPARATOR.join(morpheme for morpheme, _ in tokens),
+                 array(POS_ID_TYPECODE, [pos_id for _, pos_id in tokens]).tobytes())
+                for key, tokens in pending.items()]
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO TokenCache (FingerprintId, Key, Morphemes, PosIds) VALUES (?, ?, ?, ?)',
+                    rows)
+        except sqlite3.OperationalError as e:
+            logger.warning('Could not write %d entries to the token cache: %s', len(rows), e)
+
+    def close(self) -> None:
+        """
+        Flush the persistent tier and close its connection.
+        :return: None
+        """
+        self.flush()
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+def _make_key(text: str) -> bytes:
+    """
+    :param text: Text.
+    :return: BLAKE2b key of the text in the persistent tier.
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=TOKEN_CACHE_KEY_SIZE).digest()
+
+
+def _tokenize(text: str, tokenizer_obj: Tokenizer, mode: Tokenizer.SplitMode) -> RawTokens:
+    """
+    Tokenize a text into its raw output.
+    :param text: Text to tokenize.
+    :param tokenizer_obj: SudachiPy's tokenizer.
+    :param mode: SudachiPy's tokenizer's mode.
+    :return: Tuple of (dictionary form, Part of Speech ID) tuples.
+    """
+    return tuple((m.dictionary_form(), m.part_of_speech_id()) for m in tokenizer_obj.tokenize(text, mode))
+
+
+def set_persistent_token_cache_path(path: str | os.PathLike | None = DEFAULT_TOKEN_CACHE_PATH) -> None:
+    """
+    Set the file of the persistent tier of the token caches of this process, closing the existing caches.
+    :param path: SQLite file path. None only uses the in-process LRU tier.
+    :return: None
+    """
+    global _persistent_path
+    with _registry_lock:
+        _persistent_path = None if path is None else str(path)
+        for token_cache in _token_caches.values():
+            token_cache.close()
+        _token_caches.clear()
+
+
+def get_persistent_token_cache_path() -> str | None:
+    """
+    :return: File of the persistent tier of the token caches of this process, or None if it is disabled.
+    """
+    return _persistent_path
+
+
+def get_token_cache(dict_type: str = DEFAULT_DICT_TYPE, mode: str = DEFAULT_SPLIT_MODE) -> TokenCache:
+    """
+    Get the token cache of a tokenizer, creating it only on the first call in this process.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :param mode: Name of the split mode, 'A', 'B' or 'C'.
+    :return: TokenCache.
+    """
+    key = (dict_type, mode.upper())
+    with _registry_lock:
+        if key not in _token_caches:
+            _token_caches[key] = TokenCache(get_dictionary_fingerprint(dict_type, mode), _persistent_path)
+        return _token_caches[key]
+
+
+def flush_token_caches() -> None:
+    """
+    Write the pending results of every token cache of this process to the persistent tier.
+    :return: None
+    """
+    with _registry_lock:
+        token_caches = list(_token_caches.values())
+    for token_cache in token_caches:
+        token_cache.flush()
+
+
+atexit.register(flush_token_caches)
+
+
+if __name__ == '__main__':
+    pass
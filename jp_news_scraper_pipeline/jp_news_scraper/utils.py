@@ -1,26 +1,131 @@
-from sudachipy import Tokenizer, dictionary, tokenizer
+from __future__ import annotations
+
+import functools
+import string
+import threading
+import time
+from typing import TYPE_CHECKING
 
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
 
-logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+if TYPE_CHECKING:
+    # SudachiPy is imported when the first tokenizer is created.
+    from sudachipy import Tokenizer, dictionary
 
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
-def get_tokenizer() -> Tokenizer:
+DEFAULT_DICT_TYPE = 'core'
+DEFAULT_SPLIT_MODE = 'C'
+
+# Dictionaries loaded by the current process, keyed by dictionary type.
+_dictionaries: dict[str, dictionary.Dictionary] = {}
+
+# Tokenizers created by the current process, keyed by dictionary type and split mode.
+_tokenizers: dict[tuple[str, str], Tokenizer] = {}
+
+# Load and warm-up times in seconds, keyed by the name of the loaded object.
+_load_times: dict[str, float] = {}
+
+_registry_lock = threading.Lock()
+
+# ASCII letters and digits, which mark a morpheme as non-Japanese.
+NON_JP_CHARACTERS = frozenset(string.ascii_letters + string.digits)
+
+# Japanese Part of Speech and its English translation.
+# The position of a Part of Speech in this dictionary is its Part of Speech code.
+JP_POS_TRANSLATIONS = {
+    "代名詞": "Pronoun",
+    "副詞": "Adverb",
+    "助動詞": "Auxiliary Verb",
+    "助詞": "Particle",
+    "動詞": "Verb",
+    "名詞": "Noun",
+    "形容詞": "Adjective",
+    "形状詞": "Adjectival Noun",
+    "感動詞": "Interjection",
+    "接尾辞": "Suffix",
+    "接続詞": "Conjunction",
+    "接頭辞": "Prefix",
+    "空白": "Whitespace",
+    "補助記号": "Supplementary Symbol",
+    "連体詞": "Adnominal",
+    "記号": "Symbol"
+}
+
+# Japanese and English Part of Speech labels, indexed by Part of Speech code.
+JP_POS_LABELS = tuple(JP_POS_TRANSLATIONS)
+EN_POS_LABELS = tuple(JP_POS_TRANSLATIONS.values())
+
+
+def get_dictionary(dict_type: str = DEFAULT_DICT_TYPE) -> dictionary.Dictionary:
     """
-    Get SudachiPys's tokenizer.
-    :return: SudachiPys's tokenizer.
+    Get SudachiPy's dictionary, loading it only on the first call in this process.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :return: SudachiPy's dictionary.
     """
-    logger.info("Get SudachiPys's tokenizer.")
-    return dictionary.Dictionary().create()
+    with _registry_lock:
+        if dict_type not in _dictionaries:
+            logger.info("Load SudachiPy's %s dictionary.", dict_type)
+            from sudachipy import dictionary
+
+            start = time.perf_counter()
+            _dictionaries[dict_type] = dictionary.Dictionary(dict=dict_type)
+            _load_times[f'dictionary:{dict_type}'] = time.perf_counter() - start
+        return _dictionaries[dict_type]
 
 
-def get_tokenizer_mode() -> Tokenizer.SplitMode:
+def get_tokenizer(dict_type: str = DEFAULT_DICT_TYPE, mode: str = DEFAULT_SPLIT_MODE) -> Tokenizer:
+    """
+    Get SudachiPys's tokenizer, creating it only on the first call in this process.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :param mode: Name of the split mode, 'A', 'B' or 'C'.
+    :return: SudachiPys's tokenizer.
+    """
+    key = (dict_type, mode.upper())
+    if key not in _tokenizers:
+        sudachi_dictionary = get_dictionary(dict_type)
+        with _registry_lock:
+            if key not in _tokenizers:
+                logger.info("Create SudachiPy's tokenizer for the %s dictionary in Mode %s.", dict_type, key[1])
+                start = time.perf_counter()
+                _tokenizers[key] = sudachi_dictionary.create(mode=get_tokenizer_mode(mode))
+                _load_times[f'tokenizer:{dict_type}:{key[1]}'] = time.perf_counter() - start
+    return _tokenizers[key]
+
+
+def get_tokenizer_mode(mode: str = DEFAULT_SPLIT_MODE) -> Tokenizer.SplitMode:
     """
     Get SudachiPys's tokenizer's mode.
+    :param mode: Name of the split mode, 'A', 'B' or 'C'.
     :return: SudachiPys's tokenizer's mode.
     """
-    logger.info("Get SudachiPys's tokenizer's Mode C.")
-    return tokenizer.Tokenizer.SplitMode.C
+    from sudachipy import SplitMode
+
+    return SplitMode(mode)
+
+
+def warm_up_tokenizer(dict_type: str = DEFAULT_DICT_TYPE, mode: str = DEFAULT_SPLIT_MODE) -> None:
+    """
+    Load the dictionary and tokenize a short text, so that the first real text does not pay the startup cost.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :param mode: Name of the split mode, 'A', 'B' or 'C'.
+    :return: None
+    """
+    start = time.perf_counter()
+    get_tokenizer(dict_type, mode).tokenize('日本語のニュース。', get_tokenizer_mode(mode))
+    _load_times[f'warm_up:{dict_type}:{mode.upper()}'] = time.perf_counter() - start
+
+
+def get_tokenizer_metrics() -> dict:
+    """
+    Get the load metrics of the tokenizer registry of the current process.
+    :return: Dictionary with the loaded dictionary types, the loaded tokenizers and the load times in seconds.
+    """
+    return {
+        'dictionaries': sorted(_dictionaries),
+        'tokenizers': sorted(f'{dict_type}:{mode}' for dict_type, mode in _tokenizers),
+        'load_seconds': dict(_load_times)
+    }
 
 
 def get_jp_pos_dict():
@@ -28,25 +133,8 @@ def get_jp_pos_dict():
     Get the Japanese Part of Speech dictionary.
     :return: Japanese Part of Speech dictionary.
     """
-    logger.info("Get the Japanese Part of Speech dictionary.")
-    return {
-        "代名詞": "Pronoun",
-        "副詞": "Adverb",
-        "助動詞": "Auxiliary Verb",
-        "助詞": "Particle",
-        "動詞": "Verb",
-        "名詞": "Noun",
-        "形容詞": "Adjective",
-        "形状詞": "Adjectival Noun",
-        "感動詞": "Interjection",
-        "接尾辞": "Suffix",
-        "接続詞": "Conjunction",
-        "接頭辞": "Prefix",
-        "空白": "Whitespace",
-        "補助記号": "Supplementary Symbol",
-        "連体詞": "Adnominal",
-        "記号": "Symbol"
-    }
+    logger.debug("Get the Japanese Part of Speech dictionary.")
+    return dict(JP_POS_TRANSLATIONS)
 
 
 def get_excluded_jp_pos():
@@ -54,7 +142,7 @@ def get_excluded_jp_pos():
     Get the Japanese Part of Speech that needs to be excluded as a dictionary.
     :return: Excluded Japanese Part of Speech dictionary.
     """
-    logger.info("Get the Japanese Part of Speech that needs to be excluded as a dictionary")
+    logger.debug("Get the Japanese Part of Speech that needs to be excluded as a dictionary")
     return {
         "空白": "Whitespace",
         "補助記号": "Supplementary Symbol",
@@ -63,24 +151,62 @@ def get_excluded_jp_pos():
     }
 
 
+@functools.cache
+def get_pos_codes(dict_type: str = DEFAULT_DICT_TYPE) -> tuple[int, ...]:
+    """
+    Get the Part of Speech code of every SudachiPy's Part of Speech ID,
+    so that a morpheme's Part of Speech is looked up by index instead of by its label.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :return: Tuple where the index is SudachiPy's Part of Speech ID and the value is
+            the position of its top-level Part of Speech in 'JP_POS_LABELS'.
+    """
+    sudachi_dictionary = get_dictionary(dict_type)
+    pos_codes = []
+    pos_id = 0
+    while (part_of_speech := sudachi_dictionary.pos_of(pos_id)) is not None:
+        pos_codes.append(JP_POS_LABELS.index(part_of_speech[0]))
+        pos_id += 1
+    return tuple(pos_codes)
+
+
+@functools.cache
+def get_excluded_pos_ids(dict_type: str = DEFAULT_DICT_TYPE) -> frozenset[int]:
+    """
+    Get the SudachiPy's Part of Speech IDs whose top-level Part of Speech needs to be excluded.
+    :param dict_type: Type of the SudachiDict package, such as 'core', 'small' or 'full'.
+    :return: Set of excluded Part of Speech IDs.
+    """
+    excluded_codes = {JP_POS_LABELS.index(part_of_speech) for part_of_speech in get_excluded_jp_pos()}
+    return frozenset(pos_id for pos_id, pos_code in enumerate(get_pos_codes(dict_type)) if pos_code in excluded_codes)
+
+
+def has_non_jp_character(morpheme: str) -> bool:
+    """
+    Check if a morpheme contains non-Japanese characters (numbers and English letters).
+    :param morpheme: Morpheme.
+    :return: True if the morpheme contains an ASCII letter or digit, False otherwise.
+    """
+    return not NON_JP_CHARACTERS.isdisjoint(morpheme)
+
+
 def check_if_all_list_len_is_equal(*args) -> bool:
     """
     Check if all list lengths are equal.
     :param args: Target lists.
     :return: True if all list lengths are equal, False otherwise.
     """
-    logger.info("Check if all list lengths are equal.")
+    logger.debug("Check if all list lengths are equal.")
 
     list_len: tuple = check_list_len(*args)
     kanji_list_len = list_len[0]
-    logger.debug(f'Kanji list length: {kanji_list_len}')
+    logger.debug('Kanji list length: %d', kanji_list_len)
     pos_list_len = list_len[1]
-    logger.debug(f'Part of Speech list length: {pos_list_len}')
+    logger.debug('Part of Speech list length: %d', pos_list_len)
     pos_translated_list_len = list_len[2]
-    logger.debug(f'Translated Part of Speech list length: {pos_translated_list_len}')
+    logger.debug('Translated Part of Speech list length: %d', pos_translated_list_len)
 
     if kanji_list_len == pos_list_len == pos_translated_list_len:
-        logger.info("All list lengths are equal.")
+        logger.debug("All list lengths are equal.")
         return True
     else:
         logger.info("Not all list lengths are equal.")
@@ -93,7 +219,7 @@ def check_list_len(*args) -> tuple:
     :param args: Target lists.
     :return: Length of the target list as Tuple.
     """
-    logger.info(f"Checking length of target lists...")
+    logger.debug("Checking length of target lists...")
     lengths = [len(arg) for arg in args]
     return tuple(lengths)
 
@@ -0,0 +1,264 @@
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Iterator, NamedTuple
+
+# Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prefix of the metric names in the Prometheus text format.
+PROMETHEUS_PREFIX = 'jp_news_'
+
+DEFAULT_JSON_PATH = 'metrics.json'
+DEFAULT_PROMETHEUS_PATH = 'metrics.prom'
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets, as in Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        """
+        :param buckets: Sorted upper bounds of the buckets. Values above the last bound go to a '+Inf' bucket.
+        """
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Add a value to the histogram.
+        :param value: Observed value.
+        :return: None
+        """
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: 'Histogram') -> None:
+        """
+        Add the observations of another histogram with the same buckets.
+        :param other: Histogram to merge.
+        :return: None
+        """
+        if other.buckets != self.buckets:
+            raise ValueError('Cannot merge histograms with different buckets.')
+        self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, other.bucket_counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def cumulative_counts(self) -> list[tuple[str, int]]:
+        """
+        Get the cumulative count of each bucket.
+        :return: List of (upper bound, number of values at or below it) tuples, ending with '+Inf'.
+        """
+        cumulative = []
+        total = 0
+        for bound, bucket_count in zip((*map(str, self.buckets), '+Inf'), self.bucket_counts):
+            total += bucket_count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def to_dict(self) -> dict:
+        """
+        :return: Dictionary with the count, the sum, the mean and the cumulative bucket counts.
+        """
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'buckets': dict(self.cumulative_counts())
+        }
+
+
+class MetricsSnapshot(NamedTuple):
+    """Picklable copy of the counters, histograms and stage timers of a registry."""
+    counters: dict[str, float]
+    histograms: dict[str, Histogram]
+    stages: dict[str, Histogram]
+
+
+def _copy_histograms(histograms: dict[str, Histogram]) -> dict[str, Histogram]:
+    """
+    :param histograms: Dictionary where key is the name and value is the histogram.
+    :return: Dictionary of copies of the histograms.
+    """
+    copies = {}
+    for name, histogram in histograms.items():
+        copies[name] = Histogram(histogram.buckets)
+        copies[name].merge(histogram)
+    return copies
+
+
+class MetricsRegistry:
+    """
+    Counters, histograms and per-stage timers of a pipeline run.
+    Worker processes fill their own registry and send its snapshot back to be merged into the parent's.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self.stages: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """
+        Increment a counter.
+        :param name: Counter name, such as 'urls_fetched_total'.
+        :param value: Amount to add.
+        :return: None
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Add a value to a histogram, creating it with the default latency buckets on the first call.
+        :param name: Histogram name, such as 'fetch_seconds'.
+        :param value: Observed value.
+        :return: None
+        """
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(value)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a pipeline stage. Usable as a context manager or as a decorator.
+        :param name: Stage name.
+        :return: Context manager.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages.setdefault(name, Histogram()).observe(elapsed)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """
+        Get a picklable copy of the counters, histograms and stage timers.
+        :return: MetricsSnapshot.
+        """
+        with self._lock:
+            return MetricsSnapshot(dict(self.counters), _copy_histograms(self.histograms),
+                                   _copy_histograms(self.stages))
+
+    def merge(self, snapshot: MetricsSnapshot) -> None:
+        """
+        Add the counters, histograms and stage timers of a snapshot, such as one taken in a worker process.
+        :param snapshot: MetricsSnapshot from 'snapshot'.
+        :return: None
+        """
+        with self._lock:
+            for name, value in snapshot.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, histogram in snapshot.histograms.items():
+                self.histograms.setdefault(name, Histogram(histogram.buckets)).merge(histogram)
+            for name, histogram in snapshot.stages.items():
+                self.stages.setdefault(name, Histogram(histogram.buckets)).merge(histogram)
+
+    def reset(self) -> None:
+        """
+        Remove every counter, histogram and stage timer.
+        :return: None
+        """
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.stages.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Get a JSON-serializable summary of the run.
+        :return: Dictionary with the counters, the histograms and the stage timers.
+        """
+        with self._lock:
+            return {
+                'counters': dict(sorted(self.counters.items())),
+                'histograms': {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+                'stages': {name: histogram.to_dict() for name, histogram in self.stages.items()}
+            }
+
+    def to_prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        :param prefix: Prefix of the metric names.
+        :return: Metrics as text.
+        """
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE {prefix}{name} counter')
+                lines.append(f'{prefix}{name} {value}')
+
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {prefix}{name} histogram')
+                lines.extend(_format_histogram(f'{prefix}{name}', histogram))
+
+            if self.stages:
+                lines.append(f'# TYPE {prefix}stage_seconds histogram')
+                for stage_name, histogram in self.stages.items():
+                    lines.extend(_format_histogram(f'{prefix}stage_seconds', histogram, f'stage="{stage_name}",'))
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str | os.PathLike) -> None:
+        """
+        Write the JSON summary to a file.
+        :param path: File path.
+        :return: None
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_prometheus(self, path: str | os.PathLike) -> None:
+        """
+        Write the metrics in the Prometheus text format to a file,
+        e.g., for the textfile collector of the node exporter.
+        :param path: File path.
+        :return: None
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+    def export(
+            self,
+            json_path: str | os.PathLike = DEFAULT_JSON_PATH,
+            prometheus_path: str | os.PathLike = DEFAULT_PROMETHEUS_PATH) -> None:
+        """
+        Write the JSON summary and the Prometheus text format at the end of a run.
+        :param json_path: File path of the JSON summary.
+        :param prometheus_path: File path of the Prometheus text format.
+        :return: None
+        """
+        self.write_json(json_path)
+        self.write_prometheus(prometheus_path)
+
+
+def _format_histogram(metric_name: str, histogram: Histogram, labels: str = '') -> list[str]:
+    """
+    Format the sample lines of a histogram in the Prometheus text format.
+    :param metric_name: Metric name with its prefix.
+    :param histogram: Histogram.
+    :param labels: Extra labels, each followed by a comma, such as 'stage="fetch",'.
+    :return: List of sample lines.
+    """
+    lines = [f'{metric_name}_bucket{{{labels}le="{bound}"}} {count}'
+             for bound, count in histogram.cumulative_counts()]
+    label_set = f'{{{labels.rstrip(",")}}}' if labels else ''
+    lines.append(f'{metric_name}_sum{label_set} {histogram.sum:.6f}')
+    lines.append(f'{metric_name}_count{label_set} {histogram.count}')
+    return lines
+
+
+# Metrics of the current process.
+metrics = MetricsRegistry()
+
+
+if __name__ == '__main__':
+    pass
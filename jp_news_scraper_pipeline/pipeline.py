@@ -1,31 +1,54 @@
-import sqlite3
+from __future__ import annotations
 
-import pandas as pd
+import contextlib
+import datetime
+import sqlite3
+from typing import Iterator, TYPE_CHECKING
 
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
-from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morphemes, extract_pos, translate_pos
-from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_df_for_japan_news_table, \
-    filter_out_non_jp_characters, \
-    filter_out_pos, clean_url_list, filter_out_urls_existed_in_db
-from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import extract_text_from_url_list, get_unique_urls
-from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_japan_news_table, fetch_exist_url_from_db
-from jp_news_scraper_pipeline.jp_news_scraper.utils import check_if_all_list_len_is_equal
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import archive_texts, iter_archived_batches, \
+    DEFAULT_ARCHIVE_DIR, DEFAULT_ARCHIVE_BATCH_SIZE
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_df_from_token_buffer, \
+    clean_url_list, count_morphemes_by_day, load_new_urls_to_db
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import get_unique_urls, extract_texts_by_url
+from jp_news_scraper_pipeline.jp_news_scraper.parallel_tokenizer import extract_token_buffer_parallel
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_japan_news_table, fetch_new_urls_from_db, \
+    create_morpheme_frequency_table, upsert_morpheme_frequency, configure_bulk_pragmas, insert_dataframe, \
+    create_deferred_indexes, create_news_url_table, create_crawl_state_table, enqueue_crawl_urls, \
+    fetch_unfinished_crawl_urls, update_crawl_status, record_crawl_error, create_text_hash_table, save_text_hashes, \
+    has_table, insert_normalized_dataframe, CRAWL_FETCHED, CRAWL_TOKENIZED, CRAWL_LOADED, OCCURRENCE_TABLE
+from jp_news_scraper_pipeline.jp_news_scraper.text_dedup import deduplicate_texts
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from jp_news_scraper_pipeline.metrics import metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
+# Number of articles that flow through the streaming pipeline together.
+DEFAULT_STREAM_BATCH_SIZE = 16
+
 
-def get_cleaned_url_list(initial_url: str):
+@metrics.stage('get_cleaned_url_list')
+def get_cleaned_url_list(initial_url: str, http_cache: HttpCache | None = None):
     """
     Get a cleaned URL list from the initial URL list.
     :param initial_url: An Initial URL list.
+    :param http_cache: HTTP cache used to fetch the page.
+                        Default is None, which always fetches from the server.
     :return: A list of cleaned URL.
     """
     logger.info("Getting a cleaned Href list from the initial Href list...")
-    initial_urls: list[str] = get_unique_urls(initial_url)
+    initial_urls: list[str] = get_unique_urls(initial_url, http_cache)
     cleaned_url_list: list[str] = clean_url_list(initial_urls)
+    metrics.increment('urls_discovered_total', len(cleaned_url_list))
     return cleaned_url_list
 
 
+@metrics.stage('get_new_urls')
 def get_new_urls(cleaned_url_list, sqlite_db) -> list[str]:
     """
     Get new urls from cleaned URL list.
@@ -35,59 +58,347 @@ def get_new_urls(cleaned_url_list, sqlite_db) -> list[str]:
     """
     logger.info('Getting new urls from cleaned URL list...')
     with sqlite3.connect(sqlite_db) as conn:
-        existing_urls: list[str] = fetch_exist_url_from_db(conn)
-        new_urls: list[str] = filter_out_urls_existed_in_db(existing_urls, cleaned_url_list)
+        new_urls: list[str] = fetch_new_urls_from_db(conn, cleaned_url_list)
+
+    if not new_urls:
+        logger.warning('No new URLs found.')
+
+    metrics.increment('urls_new_total', len(new_urls))
     return new_urls
 
 
-def transform_data_to_df(kanji_list, pos_list, pos_translated_list) -> pd.DataFrame:
+@metrics.stage('transform')
+def transform_data_to_df(
+        token_buffer: TokenBuffer,
+        sqlite_db: str | None = None,
+        timestamp: datetime.datetime | None = None) -> pd.DataFrame:
     """
     Transform data into Pandas Dataframe.
-    :param kanji_list: Kanji list.
-    :param pos_list: Part of Speech list.
-    :param pos_translated_list: English translation of Part of Speech list.
+    The tokens are expected to be filtered already while tokenizing,
+    so that excluded morphemes are never romanized.
+    :param token_buffer: TokenBuffer with the morphemes and their Part of Speech codes.
+    :param sqlite_db: SQLite database file path that holds the persistent romaji cache.
+                    Default is None, which only uses the in-process cache.
+    :param timestamp: Time when the texts of the tokens were fetched.
+                    Default is None, which uses the current time.
     :return: Pandas Dataframe.
     """
     logger.info('Transforming data into Pandas Dataframe...')
-    df = create_df_for_japan_news_table(kanji_list, pos_list, pos_translated_list)
-    filtered_df = filter_out_pos(df)
-    filtered_df = filter_out_non_jp_characters(filtered_df)
+    if sqlite_db is None:
+        df = create_df_from_token_buffer(token_buffer, timestamp=timestamp)
+    else:
+        with sqlite3.connect(sqlite_db) as conn:
+            df = create_df_from_token_buffer(token_buffer, conn, timestamp=timestamp)
     logger.info("Return a dataframe")
-    return filtered_df
+    return df
 
 
-def extract_data(new_urls: list[str]) -> tuple[list[str], list[str], list[str]]:
+def extract_data(
+        new_urls: list[str],
+        max_workers: int | None = None,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = None) -> TokenBuffer:
     """
     Extract the desired data from the new URL list.
+    Morphemes with an excluded Part of Speech or non-Japanese characters are dropped while tokenizing.
     :param new_urls: New URL list.
-    :return: Tuple of a Kanji list, Part of Speech list, and English translation of Part of Speech list.
+    :param max_workers: Maximum number of worker processes used for tokenization.
+                        Default is None, which uses the number of CPUs.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :return: TokenBuffer with the morphemes and their Part of Speech codes.
     """
     logger.info('Extracting data from new URLs list...')
-    joined_text_list: list[str] = extract_text_from_url_list(new_urls)
-    morpheme_list: list[str] = extract_morphemes(joined_text_list)
-    pos_list: list[str] = extract_pos(morpheme_list)
-    pos_translated_list: list[str] = translate_pos(pos_list)
+    with metrics.stage('fetch'):
+        texts_by_url: dict[str, list[str]] = extract_texts_by_url(new_urls, cache=http_cache)
+    if archive_dir is not None:
+        with metrics.stage('archive'):
+            archive_texts(texts_by_url, archive_dir)
 
-    is_all_list_len_equal: bool = check_if_all_list_len_is_equal(morpheme_list, pos_list, pos_translated_list)
-
-    if not is_all_list_len_equal:
-        raise ValueError("The length of kanji_list, pos_list, and pos_translated_list are not equal.")
-    else:
-        return morpheme_list, pos_list, pos_translated_list
+    joined_text_list: list[str] = [text for texts in texts_by_url.values() for text in texts]
+    with metrics.stage('tokenize'):
+        return extract_token_buffer_parallel(joined_text_list, max_workers, filter_tokens=True)
 
 
-def load_to_sqlite(dataframe: pd.DataFrame, sqlite_db) -> None:
+@metrics.stage('load')
+def load_to_sqlite(
+        dataframe: pd.DataFrame,
+        sqlite_db,
+        store_rows: bool = True,
+        create_indexes: bool = False,
+        loaded_urls: list[str] | None = None,
+        text_hashes: dict[bytes, str] | None = None) -> None:
     """
     Save filtered DataFrame to SQLite database.
+    The morpheme counts of the DataFrame are also added to the MorphemeFrequency table.
     :param dataframe: Pandas DataFrame.
     :param sqlite_db: Sqlite database file path.
+    :param store_rows: Whether to append one row per morpheme occurrence to JapanNews table,
+                    or to the normalized tables once the database was migrated with 'migrate_japan_news_table'.
+                    Default is True.
+    :param create_indexes: Whether to create the secondary indexes of JapanNews table after the load.
+                        The normalized tables get their indexes when they are migrated.
+                        Default is False.
+    :param loaded_urls: URLs that the DataFrame was extracted from, which are marked as loaded in CrawlState table.
+                        Default is None, which does not update the crawl state.
+    :param text_hashes: Content hashes of the articles and paragraphs of the DataFrame by URL,
+                        which are saved to TextHashes table.
+                        Default is None, which does not save any hash.
     :return: None
     """
     logger.info('Migrate data to SQLite database.')
     with sqlite3.connect(sqlite_db) as conn:
-        create_japan_news_table(conn)
-        dataframe.to_sql('JapanNews', conn, if_exists='append', index=False)
-        logger.info('Append to JapanNews table successfully.')
+        configure_bulk_pragmas(conn)
+        create_morpheme_frequency_table(conn)
+        normalized = store_rows and has_table(conn, OCCURRENCE_TABLE)
+        if store_rows and not normalized:
+            create_japan_news_table(conn)
+        if loaded_urls is not None:
+            create_crawl_state_table(conn)
+        if text_hashes is not None:
+            create_text_hash_table(conn)
+
+        # The counts, the crawl state, the content hashes and the rows are committed in one transaction,
+        # so that a crash never leaves a batch loaded without its URLs marked as loaded, or the other way around.
+        upsert_morpheme_frequency(conn, count_morphemes_by_day(dataframe))
+        if loaded_urls is not None:
+            update_crawl_status(conn, loaded_urls, CRAWL_LOADED)
+        if text_hashes is not None:
+            save_text_hashes(conn, text_hashes)
+        if normalized:
+            rows_written = insert_normalized_dataframe(conn, dataframe)
+            metrics.increment('rows_written_total', rows_written)
+            logger.info('Add to %s table successfully.', OCCURRENCE_TABLE)
+        elif store_rows:
+            rows_written = insert_dataframe(conn, 'JapanNews', dataframe)
+            metrics.increment('rows_written_total', rows_written)
+            logger.info('Append to JapanNews table successfully.')
+            if create_indexes:
+                create_deferred_indexes(conn)
+        logger.info('Upsert to MorphemeFrequency table successfully.')
+
+
+def iter_fetched_batches(
+        new_urls: list[str],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = None) -> Iterator[tuple[list[str], dict[str, list[str]]]]:
+    """
+    Fetch the new URLs in batches and yield the extracted texts of each batch by URL.
+    :param new_urls: New URL list.
+    :param batch_size: Number of URLs fetched per batch.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :return: Iterator of tuples of the URL batch and the dictionary of its texts by URL,
+            which leaves out the URLs without any news article.
+    """
+    for start in range(0, len(new_urls), batch_size):
+        url_batch = new_urls[start:start + batch_size]
+        logger.info('Fetch URLs %d-%d of %d', start + 1, start + len(url_batch), len(new_urls))
+        with metrics.stage('fetch'):
+            texts_by_url = extract_texts_by_url(url_batch, cache=http_cache)
+        if archive_dir is not None:
+            with metrics.stage('archive'):
+                archive_texts(texts_by_url, archive_dir)
+        yield url_batch, texts_by_url
+
+
+def iter_text_batches(
+        new_urls: list[str],
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = None) -> Iterator[list[str]]:
+    """
+    Fetch the new URLs in batches and yield the extracted texts of each batch.
+    :param new_urls: New URL list.
+    :param batch_size: Number of URLs fetched per batch.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :return: Iterator of text lists, one per batch of URLs.
+    """
+    for _, texts_by_url in iter_fetched_batches(new_urls, batch_size, http_cache, archive_dir):
+        text_list = []
+        for texts in texts_by_url.values():
+            text_list += texts
+        yield text_list
+
+
+def iter_df_batches(text_batches: Iterator[list[str]], sqlite_db: str | None = None) -> Iterator[pd.DataFrame]:
+    """
+    Tokenize, filter and romanize each batch of texts.
+    :param text_batches: Iterator of text lists.
+    :param sqlite_db: SQLite database file path that holds the persistent romaji cache.
+                    Default is None, which only uses the in-process cache.
+    :return: Iterator of filtered Pandas DataFrames, one per batch of texts.
+    """
+    for text_list in text_batches:
+        with metrics.stage('tokenize'):
+            token_buffer = TokenBuffer.from_records(extract_morpheme_records(text_list, filter_tokens=True))
+        if not len(token_buffer):
+            continue
+
+        yield transform_data_to_df(token_buffer, sqlite_db)
+
+
+def queue_urls_for_crawl(new_urls: list[str], sqlite_db: str) -> list[str]:
+    """
+    Record the new URLs in NewsUrls and CrawlState tables,
+    and get every URL that still has to be crawled, including those of a previous crawl that stopped midway.
+    :param new_urls: New URL list.
+    :param sqlite_db: SQLite database file path.
+    :return: URLs to crawl, in the order they were queued.
+    """
+    with sqlite3.connect(sqlite_db) as conn:
+        create_news_url_table(conn)
+        create_crawl_state_table(conn)
+        if new_urls:
+            # The crawl state is committed together with the NewsUrls rows by 'load_new_urls_to_db'.
+            enqueue_crawl_urls(conn, new_urls)
+            load_new_urls_to_db(conn, new_urls)
+        urls_to_crawl = fetch_unfinished_crawl_urls(conn)
+
+    resumed_url_count = len(urls_to_crawl) - len(new_urls)
+    if resumed_url_count > 0:
+        logger.info('Resume %d unfinished URLs of previous crawls', resumed_url_count)
+        metrics.increment('urls_resumed_total', resumed_url_count)
+    return urls_to_crawl
+
+
+def stream_data_to_sqlite(
+        new_urls: list[str],
+        sqlite_db: str,
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = None,
+        deduplicate: bool = True) -> int:
+    """
+    Stream the new URLs through fetch, tokenize, filter, romanize and load in bounded batches,
+    so that memory stays constant with respect to the number of URLs.
+    The status of each URL in CrawlState table is committed once per batch after each stage,
+    and a URL is marked as loaded in the same transaction as its rows.
+    :param new_urls: New URL list.
+    :param sqlite_db: SQLite database file path.
+    :param batch_size: Number of URLs that flow through the pipeline together.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        Default is None, which does not archive the texts.
+    :param deduplicate: Whether to skip the articles and paragraphs that were already loaded.
+                        Default is True.
+    :return: Number of rows written to the database.
+    """
+    logger.info('Streaming data from new URLs list to SQLite database...')
+    rows_written = 0
+    with contextlib.closing(sqlite3.connect(sqlite_db)) as state_conn:
+        with state_conn:
+            create_crawl_state_table(state_conn)
+            create_text_hash_table(state_conn)
+
+        for url_batch, texts_by_url in iter_fetched_batches(new_urls, batch_size, http_cache, archive_dir):
+            fetched_urls = list(texts_by_url)
+            with state_conn:
+                update_crawl_status(state_conn, fetched_urls, CRAWL_FETCHED, count_attempt=True)
+                record_crawl_error(state_conn, [url for url in url_batch if url not in texts_by_url],
+                                   'No news article found', count_attempt=True)
+
+            try:
+                rows_written += _load_text_batch(texts_by_url, sqlite_db, state_conn, deduplicate)
+            except Exception as e:
+                with state_conn:
+                    record_crawl_error(state_conn, fetched_urls, repr(e))
+                raise
+            logger.info('%d rows written so far', rows_written)
+    return rows_written
+
+
+def _load_text_batch(
+        texts_by_url: dict[str, list[str]],
+        sqlite_db: str,
+        state_conn: sqlite3.Connection,
+        deduplicate: bool = True) -> int:
+    """
+    Tokenize, filter, romanize and load the texts of a batch of URLs, recording their crawl status.
+    :param texts_by_url: Dictionary where key is the URL and value is the list of its texts.
+    :param sqlite_db: SQLite database file path.
+    :param state_conn: Sqlite3 connection used to look up the content hashes and to commit the tokenized status.
+    :param deduplicate: Whether to skip the articles and paragraphs that were already loaded.
+    :return: Number of rows written to the database.
+    """
+    fetched_urls = list(texts_by_url)
+    new_text_hashes = {}
+    if deduplicate:
+        texts_by_url, new_text_hashes = deduplicate_texts(state_conn, texts_by_url)
+    text_list = [text for texts in texts_by_url.values() for text in texts]
+    with metrics.stage('tokenize'):
+        token_buffer = TokenBuffer.from_records(extract_morpheme_records(text_list, filter_tokens=True))
+    with state_conn:
+        update_crawl_status(state_conn, fetched_urls, CRAWL_TOKENIZED)
+
+    if not len(token_buffer):
+        with state_conn:
+            update_crawl_status(state_conn, fetched_urls, CRAWL_LOADED)
+            save_text_hashes(state_conn, new_text_hashes)
+        return 0
+
+    df = transform_data_to_df(token_buffer, sqlite_db)
+    load_to_sqlite(df, sqlite_db, loaded_urls=fetched_urls, text_hashes=new_text_hashes)
+    return len(df)
+
+
+def reprocess_archive_to_sqlite(
+        sqlite_db: str,
+        archive_dir: str = DEFAULT_ARCHIVE_DIR,
+        batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE,
+        since: str | None = None,
+        until: str | None = None,
+        deduplicate: bool = True) -> int:
+    """
+    Stream the archived texts through tokenize, filter, romanize and load in bounded batches,
+    without any network access.
+    The rows are stamped with the time their articles were fetched, so that the rebuilt tables keep the time series.
+    The archive keeps every fetch, including those a resumed crawl repeated,
+    so the texts are deduplicated with the TextHashes table like in a crawl,
+    which also lets a reprocess that stopped midway be run again.
+    :param sqlite_db: SQLite database file path.
+    :param archive_dir: Directory of the raw article archive.
+    :param batch_size: Maximum number of texts that flow through the pipeline together.
+    :param since: First day of the archive to reprocess, as 'YYYY-MM-DD'.
+                Default is None, which starts from the oldest day.
+    :param until: Last day of the archive to reprocess, as 'YYYY-MM-DD'.
+                Default is None, which goes up to the newest day.
+    :param deduplicate: Whether to skip the articles and paragraphs that were already loaded.
+                        Default is True.
+    :return: Number of rows written to the database.
+    """
+    logger.info('Reprocessing archived texts from %s to SQLite database...', archive_dir)
+    rows_written = 0
+    with contextlib.closing(sqlite3.connect(sqlite_db)) as conn:
+        with conn:
+            create_text_hash_table(conn)
+
+        for fetched_at, texts_by_url in iter_archived_batches(archive_dir, batch_size, since, until):
+            new_text_hashes = {}
+            if deduplicate:
+                texts_by_url, new_text_hashes = deduplicate_texts(conn, texts_by_url)
+            text_list = [text for texts in texts_by_url.values() for text in texts]
+            with metrics.stage('tokenize'):
+                token_buffer = TokenBuffer.from_records(extract_morpheme_records(text_list, filter_tokens=True))
+            if not len(token_buffer):
+                with conn:
+                    save_text_hashes(conn, new_text_hashes)
+                continue
+
+            df = transform_data_to_df(token_buffer, sqlite_db, fetched_at)
+            load_to_sqlite(df, sqlite_db, text_hashes=new_text_hashes)
+            rows_written += len(df)
+            logger.info('%d rows written so far', rows_written)
+    return rows_written
 
 
 if __name__ == '__main__':
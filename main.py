@@ -1,27 +1,56 @@
-import sqlite3
+from __future__ import annotations
 
-import pandas as pd
-from pandas import DataFrame
+import argparse
+import sqlite3
+from typing import TYPE_CHECKING
 
+from jp_news_scraper_pipeline.async_pipeline import stream_data_to_sqlite_async
 from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import DEFAULT_ARCHIVE_DIR
 from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import load_new_urls_to_db
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache, DEFAULT_CACHE_DIR
 from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_news_url_table
+from jp_news_scraper_pipeline.metrics import metrics
 from jp_news_scraper_pipeline.pipeline import transform_data_to_df, extract_data, \
-    get_cleaned_url_list, get_new_urls, load_to_sqlite
+    get_cleaned_url_list, get_new_urls, stream_data_to_sqlite, queue_urls_for_crawl, DEFAULT_STREAM_BATCH_SIZE
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
 
 
-def start_news_scraper_pipeline(sqlite_db: str) -> DataFrame:
+def _create_empty_df() -> DataFrame:
+    """
+    Create the empty DataFrame returned when no new article is found.
+    Pandas is only imported here and by the later stages, so that a polling run does not load it.
+    :return: Empty Pandas DataFrame.
+    """
+    import pandas as pd
+
+    return pd.DataFrame()
+
+
+def start_news_scraper_pipeline(
+        sqlite_db: str,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = DEFAULT_ARCHIVE_DIR) -> DataFrame:
     """
     Start a pipeline for web-scraping Japanese news from NHK News.
+    The new URLs are saved to NewsUrls table before they are fetched, and the DataFrame is loaded by the caller,
+    so a crash in between loses their morphemes.
+    Use 'start_streaming_news_scraper_pipeline' for a crawl that resumes the unfinished URLs.
     :param sqlite_db: SQLite database file path.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        None does not archive the texts.
     :return: Pandas Dataframe.
     """
     base_url = 'https://www3.nhk.or.jp'
     initial_url = base_url + '/news/'
 
-    cleaned_url_list: list[str] = get_cleaned_url_list(initial_url)
+    cleaned_url_list: list[str] = get_cleaned_url_list(initial_url, http_cache)
     if cleaned_url_list:
         with sqlite3.connect(sqlite_db) as conn:
             create_news_url_table(conn)
@@ -32,25 +61,84 @@ def start_news_scraper_pipeline(sqlite_db: str) -> DataFrame:
             with sqlite3.connect(sqlite_db) as conn:
                 load_new_urls_to_db(conn, new_urls)
 
-            kanji_list, pos_list, pos_translated_list = extract_data(new_urls)
-            return transform_data_to_df(kanji_list, pos_list, pos_translated_list)
+            token_buffer = extract_data(new_urls, http_cache=http_cache, archive_dir=archive_dir)
+            return transform_data_to_df(token_buffer, sqlite_db)
         else:
             logger.warning("No new URL found.")
             logger.warning("Return an empty DataFrame.")
-            return pd.DataFrame()
+            return _create_empty_df()
     else:
         logger.error("No URL found. Please check the tag in 'extract_href_tags' function in 'news_scraper.py'.")
         logger.warning("Return an empty DataFrame.")
-        return pd.DataFrame()
+        return _create_empty_df()
+
+
+def start_streaming_news_scraper_pipeline(
+        sqlite_db: str,
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        http_cache: HttpCache | None = None,
+        archive_dir: str | None = DEFAULT_ARCHIVE_DIR,
+        overlap_stages: bool = False) -> int:
+    """
+    Start a streaming pipeline for web-scraping Japanese news from NHK News.
+    Articles are fetched, tokenized, filtered, romanized and written to the database in bounded batches.
+    The status of each URL is kept in CrawlState table, so that a run after a crash picks up the unfinished URLs.
+    :param sqlite_db: SQLite database file path.
+    :param batch_size: Number of URLs that flow through the pipeline together.
+    :param http_cache: HTTP cache used to fetch the pages.
+                        Default is None, which always fetches from the server.
+    :param archive_dir: Directory of the raw article archive.
+                        None does not archive the texts.
+    :param overlap_stages: Whether to fetch the next batches while the earlier ones are processed and written,
+                        with 'stream_data_to_sqlite_async'.
+                        Default is False, which runs the stages of each batch one after another.
+    :return: Number of rows written to the database.
+    """
+    base_url = 'https://www3.nhk.or.jp'
+    initial_url = base_url + '/news/'
+
+    cleaned_url_list: list[str] = get_cleaned_url_list(initial_url, http_cache)
+    if not cleaned_url_list:
+        logger.error("No URL found. Please check the tag in 'extract_href_tags' function in 'news_scraper.py'.")
+        return 0
+
+    with sqlite3.connect(sqlite_db) as conn:
+        create_news_url_table(conn)
+
+    new_urls: list[str] = get_new_urls(cleaned_url_list, sqlite_db)
+    # Unfinished URLs of a previous run that stopped midway are crawled again together with the new URLs.
+    urls_to_crawl: list[str] = queue_urls_for_crawl(new_urls, sqlite_db)
+    if not urls_to_crawl:
+        logger.warning("No new URL found.")
+        return 0
+
+    if overlap_stages:
+        return stream_data_to_sqlite_async(urls_to_crawl, sqlite_db, batch_size, http_cache, archive_dir)
+    return stream_data_to_sqlite(urls_to_crawl, sqlite_db, batch_size, http_cache, archive_dir)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scrape the news currently listed on NHK News to SQLite database.')
     # SQLite database is needed.
-    # Adjust the database name as needed.
-    sqlite_db = 'japan_news_test.db'
-    df = start_news_scraper_pipeline(sqlite_db)
-    if not df.empty:
-        load_to_sqlite(df, sqlite_db)
-    else:
+    parser.add_argument('--sqlite-db', default='japan_news_test.db', help='SQLite database file path')
+    parser.add_argument('--http-cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='directory of the on-disk cache of the fetched pages')
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--no-http-cache', action='store_true', help='always fetch the pages from the server')
+    cache_mode.add_argument('--offline', action='store_true',
+                            help='replay a crawl from the cache, whatever the age of the pages, without the network')
+    args = parser.parse_args()
+
+    http_cache = None if args.no_http_cache else HttpCache(args.http_cache_dir, offline=args.offline)
+    try:
+        # The streaming pipeline writes the same tables as 'start_news_scraper_pipeline' followed by 'load_to_sqlite',
+        # and a run without new URLs stops before Pandas, PyArrow, SudachiPy or Cutlet are imported.
+        rows_written = start_streaming_news_scraper_pipeline(args.sqlite_db, http_cache=http_cache,
+                                                             overlap_stages=True)
+    finally:
+        if http_cache is not None:
+            http_cache.close()
+    if not rows_written:
         logger.warning("No new URL found. No data was saved. Stop the Process.")
+    metrics.export()
 
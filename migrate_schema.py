@@ -0,0 +1,39 @@
+import argparse
+import sqlite3
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import migrate_japan_news_table, \
+    DEFAULT_MIGRATION_CHUNK_SIZE
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+
+def start_schema_migration(
+        sqlite_db: str,
+        chunk_size: int = DEFAULT_MIGRATION_CHUNK_SIZE,
+        drop_japan_news: bool = False) -> int:
+    """
+    Move the rows of JapanNews table to the normalized tables.
+    Run it again after a crash to resume from the last migrated chunk.
+    :param sqlite_db: SQLite database file path.
+    :param chunk_size: Number of JapanNews rows migrated per transaction.
+    :param drop_japan_news: Whether to drop JapanNews table once it is migrated.
+    :return: Number of migrated rows.
+    """
+    with sqlite3.connect(sqlite_db) as conn:
+        migrated = migrate_japan_news_table(conn, chunk_size, drop_japan_news)
+    conn.close()
+    logger.info('Migrated %d rows of %s', migrated, sqlite_db)
+    return migrated
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrate JapanNews table to the normalized schema.')
+    parser.add_argument('--sqlite-db', required=True, help='SQLite database file path')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_MIGRATION_CHUNK_SIZE,
+                        help='number of rows migrated per transaction')
+    parser.add_argument('--drop-japan-news', action='store_true',
+                        help='drop JapanNews table once it is migrated and reclaim its space')
+    args = parser.parse_args()
+
+    start_schema_migration(args.sqlite_db, args.chunk_size, args.drop_japan_news)
@@ -0,0 +1,42 @@
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import DEFAULT_ARCHIVE_DIR, DEFAULT_ARCHIVE_BATCH_SIZE
+from jp_news_scraper_pipeline.jp_news_scraper.token_cache import set_persistent_token_cache_path, \
+    DEFAULT_TOKEN_CACHE_PATH
+from jp_news_scraper_pipeline.metrics import metrics
+from jp_news_scraper_pipeline.pipeline import reprocess_archive_to_sqlite
+
+logger = configure_logging_with_file(log_file='main.log', logger_name='main', level='INFO')
+
+
+def start_reprocess_pipeline(
+        sqlite_db: str,
+        archive_dir: str = DEFAULT_ARCHIVE_DIR,
+        batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE,
+        since: str | None = None,
+        until: str | None = None) -> int:
+    """
+    Start a pipeline that tokenizes the archived news articles again, without crawling NHK News.
+    Use it after changing the tokenizer mode, the Part of Speech filters or the romanizer.
+    :param sqlite_db: SQLite database file path.
+    :param archive_dir: Directory of the raw article archive.
+    :param batch_size: Maximum number of texts that flow through the pipeline together.
+    :param since: First day of the archive to reprocess, as 'YYYY-MM-DD'.
+                Default is None, which starts from the oldest day.
+    :param until: Last day of the archive to reprocess, as 'YYYY-MM-DD'.
+                Default is None, which goes up to the newest day.
+    :return: Number of rows written to the database.
+    """
+    rows_written = reprocess_archive_to_sqlite(sqlite_db, archive_dir, batch_size, since, until)
+    if not rows_written:
+        logger.warning("No archived texts found in %s.", archive_dir)
+    return rows_written
+
+
+if __name__ == '__main__':
+    # Adjust the database name as needed.
+    # Use a new database, as the texts already loaded to the crawl database are skipped.
+    sqlite_db = 'japan_news_reprocessed.db'
+    # Reuse the tokenizer output of the unchanged paragraphs across runs.
+    set_persistent_token_cache_path(DEFAULT_TOKEN_CACHE_PATH)
+    start_reprocess_pipeline(sqlite_db)
+    metrics.export()
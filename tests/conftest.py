@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class LocalHttpServer:
+    """Local HTTP stand-in for NHK that serves canned pages from memory."""
+
+    def __init__(self):
+        self.pages: dict[str, str] = {}
+        self.failures: dict[str, list[int]] = {}
+        # Retry-After header sent with the failures, or None for no header.
+        self.retry_after: str | None = None
+        self.request_log: list[str] = []
+        self.etags_enabled = False
+        self.not_modified_count = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.request_log.append(self.path)
+                failures = server.failures.get(self.path)
+                if failures:
+                    self._respond(failures.pop(0), b'', retry_after=server.retry_after)
+                elif self.path in server.pages:
+                    body = server.pages[self.path].encode('utf-8')
+                    etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"' if server.etags_enabled else None
+                    if etag is not None and self.headers.get('If-None-Match') == etag:
+                        server.not_modified_count += 1
+                        self._respond(304, b'', etag)
+                    else:
+                        self._respond(200, body, etag)
+                else:
+                    self._respond(404, b'')
+
+            def _respond(self, status, body, etag=None, retry_after=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                if retry_after is not None:
+                    self.send_header('Retry-After', retry_after)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def local_http_server():
+    server = LocalHttpServer()
+    server.start()
+    yield server
+    server.stop()
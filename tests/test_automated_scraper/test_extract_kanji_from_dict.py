@@ -2,6 +2,7 @@ import pandas as pd
 import pytest
 
 from automated_news_scraper import extract_kanji_from_dict
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS, EN_POS_LABELS
 
 # Sample test data
 sample_dict_with_kanji = {
@@ -13,22 +14,29 @@ sample_dict_without_kanji = {
 empty_dict = {}
 
 
+def create_expected_df(expected_data):
+    expected_df = pd.DataFrame(expected_data, columns=['Source', 'Kanji', 'PartOfSpeech', 'PartOfSpeechEnglish'])
+    expected_df['PartOfSpeech'] = pd.Categorical(expected_df['PartOfSpeech'], categories=JP_POS_LABELS)
+    expected_df['PartOfSpeechEnglish'] = pd.Categorical(expected_df['PartOfSpeechEnglish'], categories=EN_POS_LABELS)
+    return expected_df
+
+
 def test_extract_kanji_from_dict_with_kanji():
     expected_data = [
-        ("https://example.com/1", "これ"),
-        ("https://example.com/1", "は"),
-        ("https://example.com/1", "テスト"),
-        ("https://example.com/1", "です"),
-        ("https://example.com/1", "。"),
-        ("https://example.com/1", "漢字"),
-        ("https://example.com/1", "を"),
-        ("https://example.com/1", "抽出"),
-        ("https://example.com/1", "する"),
-        ("https://example.com/1", "ます"),
-        ("https://example.com/1", "。")
+        ("https://example.com/1", "これ", "代名詞", "Pronoun"),
+        ("https://example.com/1", "は", "助詞", "Particle"),
+        ("https://example.com/1", "テスト", "名詞", "Noun"),
+        ("https://example.com/1", "です", "助動詞", "Auxiliary Verb"),
+        ("https://example.com/1", "。", "補助記号", "Supplementary Symbol"),
+        ("https://example.com/1", "漢字", "名詞", "Noun"),
+        ("https://example.com/1", "を", "助詞", "Particle"),
+        ("https://example.com/1", "抽出", "名詞", "Noun"),
+        ("https://example.com/1", "する", "動詞", "Verb"),
+        ("https://example.com/1", "ます", "助動詞", "Auxiliary Verb"),
+        ("https://example.com/1", "。", "補助記号", "Supplementary Symbol")
     ]
 
-    expected_df = pd.DataFrame(expected_data, columns=['Source', 'Kanji'])
+    expected_df = create_expected_df(expected_data)
     result_df = extract_kanji_from_dict(sample_dict_with_kanji)
 
     pd.testing.assert_frame_equal(result_df, expected_df)
@@ -36,23 +44,23 @@ def test_extract_kanji_from_dict_with_kanji():
 
 def test_extract_kanji_from_dict_without_kanji():
     expected_data = [
-        ("https://example.com/2", "This"),
-        ("https://example.com/2", " "),
-        ("https://example.com/2", "is"),
-        ("https://example.com/2", " "),
-        ("https://example.com/2", "a"),
-        ("https://example.com/2", " "),
-        ("https://example.com/2", "test"),
-        ("https://example.com/2", "."),
-        ("https://example.com/2", "NO"),
-        ("https://example.com/2", " "),
-        ("https://example.com/2", "kanji"),
-        ("https://example.com/2", " "),
-        ("https://example.com/2", "Here"),
-        ("https://example.com/2", ".")
+        ("https://example.com/2", "This", "名詞", "Noun"),
+        ("https://example.com/2", " ", "空白", "Whitespace"),
+        ("https://example.com/2", "is", "名詞", "Noun"),
+        ("https://example.com/2", " ", "空白", "Whitespace"),
+        ("https://example.com/2", "a", "名詞", "Noun"),
+        ("https://example.com/2", " ", "空白", "Whitespace"),
+        ("https://example.com/2", "test", "名詞", "Noun"),
+        ("https://example.com/2", ".", "補助記号", "Supplementary Symbol"),
+        ("https://example.com/2", "NO", "名詞", "Noun"),
+        ("https://example.com/2", " ", "空白", "Whitespace"),
+        ("https://example.com/2", "kanji", "名詞", "Noun"),
+        ("https://example.com/2", " ", "空白", "Whitespace"),
+        ("https://example.com/2", "Here", "名詞", "Noun"),
+        ("https://example.com/2", ".", "補助記号", "Supplementary Symbol")
     ]
 
-    expected_df = pd.DataFrame(expected_data, columns=['Source', 'Kanji'])
+    expected_df = create_expected_df(expected_data)
     result_df = extract_kanji_from_dict(sample_dict_without_kanji)
 
     pd.testing.assert_frame_equal(result_df, expected_df)
@@ -0,0 +1,22 @@
+import json
+
+from benchmarks.run_benchmarks import main
+
+
+def test_benchmark_report(tmp_path):
+    # Given
+    output = tmp_path / 'report.json'
+
+    # When
+    main(['--repeat', '1', '--output', str(output)])
+
+    # Then
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert list(report['stages']) == [
+        'get_unique_urls', 'extract_text_from_url_list', 'extract_morphemes', 'extract_pos', 'translate_pos',
+        'extract_morpheme_records', 'romanize_morpheme', 'filter_out_pos', 'filter_out_non_jp_characters',
+        'load_to_sqlite'
+    ]
+    assert report['corpus']['articles'] == 3
+    assert report['corpus']['morphemes'] > 0
+    assert all(stage['items'] > 0 for stage in report['stages'].values())
@@ -0,0 +1,31 @@
+from benchmarks.import_time import parse_importtime, get_direct_imports, measure_import
+
+
+def test_parse_importtime():
+    # Given
+    stderr = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       100 |        100 | site',
+        'import time:        20 |         20 |     helper',
+        'import time:        30 |         50 |   dependency',
+        'import time:        10 |         60 | main',
+    ])
+
+    # When
+    import_times = parse_importtime(stderr)
+    module_import_time, direct_imports = get_direct_imports(import_times, 'main')
+
+    # Then
+    assert [(import_time.module, import_time.depth) for import_time in import_times] == [
+        ('site', 0), ('helper', 2), ('dependency', 1), ('main', 0)]
+    assert module_import_time.cumulative_us == 60
+    assert [import_time.module for import_time in direct_imports] == ['dependency']
+
+
+def test_main_does_not_import_heavy_dependencies():
+    # When
+    import_times, loaded_heavy_modules = measure_import('main')
+
+    # Then
+    assert loaded_heavy_modules == []
+    assert get_direct_imports(import_times, 'main')[0].cumulative_us > 0
@@ -1,7 +1,8 @@
 import pytest
 import pandas as pd
 from unittest.mock import patch, MagicMock, call
-from main import start_news_scraper_pipeline
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from main import start_news_scraper_pipeline, start_streaming_news_scraper_pipeline, DEFAULT_ARCHIVE_DIR
 
 
 @pytest.fixture
@@ -23,12 +24,13 @@ def test_successful_pipeline(mock_sqlite3, mock_logger, tmp_path):
             patch('main.transform_data_to_df') as mock_transform_data_to_df:
         mock_get_cleaned_url_list.return_value = ['url1', 'url2']
         mock_get_new_urls.return_value = ['url1', 'url2']
-        mock_extract_data.return_value = (['kanji1', 'kanji2'], ['pos1', 'pos2'], ['trans1', 'trans2'])
+        mock_extract_data.return_value = TokenBuffer.from_records([('kanji1', 0), ('kanji2', 1)])
         mock_transform_data_to_df.return_value = pd.DataFrame({'col1': [1, 2], 'col2': [3, 4]})
 
         db_path = str(tmp_path / 'test.db')
         result = start_news_scraper_pipeline(db_path)
 
+        mock_transform_data_to_df.assert_called_once_with(mock_extract_data.return_value, db_path)
         assert isinstance(result, pd.DataFrame)
         assert not result.empty
         mock_logger.warning.assert_not_called()
@@ -86,7 +88,7 @@ def test_database_operations(mock_sqlite3, mock_logger, tmp_path):
             patch('main.load_new_urls_to_db') as mock_load_new_urls_to_db:
         mock_get_cleaned_url_list.return_value = ['url1', 'url2']
         mock_get_new_urls.return_value = ['url1', 'url2']
-        mock_extract_data.return_value = (['kanji1', 'kanji2'], ['pos1', 'pos2'], ['trans1', 'trans2'])
+        mock_extract_data.return_value = TokenBuffer.from_records([('kanji1', 0), ('kanji2', 1)])
         mock_transform_data_to_df.return_value = pd.DataFrame({'col1': [1, 2], 'col2': [3, 4]})
 
         db_path = str(tmp_path / 'test.db')
@@ -96,5 +98,37 @@ def test_database_operations(mock_sqlite3, mock_logger, tmp_path):
         mock_load_new_urls_to_db.assert_called_once_with(mock_conn, ['url1', 'url2'])
 
 
+def test_streaming_pipeline(mock_sqlite3, mock_logger, tmp_path):
+    with patch('main.get_cleaned_url_list') as mock_get_cleaned_url_list, \
+            patch('main.get_new_urls') as mock_get_new_urls, \
+            patch('main.queue_urls_for_crawl') as mock_queue_urls_for_crawl, \
+            patch('main.stream_data_to_sqlite') as mock_stream_data_to_sqlite:
+        mock_get_cleaned_url_list.return_value = ['url1', 'url2']
+        mock_get_new_urls.return_value = ['url2']
+        mock_queue_urls_for_crawl.return_value = ['url0', 'url2']
+        mock_stream_data_to_sqlite.return_value = 42
+
+        db_path = str(tmp_path / 'test.db')
+        result = start_streaming_news_scraper_pipeline(db_path, batch_size=4)
+
+        assert result == 42
+        mock_queue_urls_for_crawl.assert_called_once_with(['url2'], db_path)
+        mock_stream_data_to_sqlite.assert_called_once_with(['url0', 'url2'], db_path, 4, None, DEFAULT_ARCHIVE_DIR)
+
+
+def test_streaming_pipeline_no_new_urls(mock_sqlite3, mock_logger, tmp_path):
+    with patch('main.get_cleaned_url_list') as mock_get_cleaned_url_list, \
+            patch('main.get_new_urls') as mock_get_new_urls, \
+            patch('main.stream_data_to_sqlite') as mock_stream_data_to_sqlite:
+        mock_get_cleaned_url_list.return_value = ['url1']
+        mock_get_new_urls.return_value = []
+
+        result = start_streaming_news_scraper_pipeline(str(tmp_path / 'test.db'))
+
+        assert result == 0
+        mock_stream_data_to_sqlite.assert_not_called()
+        mock_logger.warning.assert_called_with("No new URL found.")
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
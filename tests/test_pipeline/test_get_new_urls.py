@@ -1,16 +1,18 @@
+import sqlite3
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_news_url_table
 from jp_news_scraper_pipeline.pipeline import get_new_urls
 
 
-def test_returns_new_urls(mocker):
+def test_returns_new_urls(tmp_path):
     # Given
     cleaned_url_list = ['http://example.com/1', 'http://example.com/2']
-    sqlite_db = ':memory:'
-    existing_urls = ['http://example.com/1']
+    sqlite_db = str(tmp_path / 'test.db')
     expected_new_urls = ['http://example.com/2']
 
-    # Mock dependencies
-    mocker.patch('jp_news_scraper_pipeline.pipeline.fetch_exist_url_from_db', return_value=existing_urls)
-    mocker.patch('jp_news_scraper_pipeline.pipeline.filter_out_urls_existed_in_db', return_value=expected_new_urls)
+    with sqlite3.connect(sqlite_db) as conn:
+        create_news_url_table(conn)
+        conn.execute("INSERT INTO NewsUrls (Url, TimeStamp) VALUES ('http://example.com/1', '2024-01-01 00:00:00')")
 
     # When
     new_urls = get_new_urls(cleaned_url_list, sqlite_db)
@@ -19,18 +21,16 @@ def test_returns_new_urls(mocker):
     assert new_urls == expected_new_urls
 
 
-def test_handles_empty_cleaned_url_list_gracefully(mocker):
+def test_handles_empty_cleaned_url_list_gracefully(tmp_path):
     # Given an empty cleaned URL list
     cleaned_url_list = []
-    sqlite_db = ':memory:'
+    sqlite_db = str(tmp_path / 'test.db')
 
-    # Mock dependencies
-    # Assume these functions are part of the same module as get_new_urls
-    mocker.patch('jp_news_scraper_pipeline.pipeline.fetch_exist_url_from_db', return_value=[])
-    mocker.patch('jp_news_scraper_pipeline.pipeline.filter_out_urls_existed_in_db', return_value=[])
+    with sqlite3.connect(sqlite_db) as conn:
+        create_news_url_table(conn)
 
     # When calling the get_new_urls function
     new_urls = get_new_urls(cleaned_url_list, sqlite_db)
 
     # Then ensure the new_urls list is also empty
-    assert new_urls == []
\ No newline at end of file
+    assert new_urls == []
@@ -42,4 +42,27 @@ def test_handles_empty_dataframe():
         c = conn.cursor()
         c.execute('SELECT * FROM JapanNews')
         rows = c.fetchall()
-        assert len(rows) == 0
\ No newline at end of file
+        assert len(rows) == 0
+
+def test_updates_morpheme_frequency(tmp_path):
+    # Given
+    df = pd.DataFrame({
+        'Kanji': ['日本', '日本', '学校'],
+        'Romanji': ['Nippon', 'Nippon', 'gakkou'],
+        'PartOfSpeech': ['名詞', '名詞', '名詞'],
+        'PartOfSpeechEnglish': ['Noun', 'Noun', 'Noun'],
+        'TimeStamp': ['2023-10-01 00:00:00', '2023-10-01 00:00:00', '2023-10-01 00:00:00']
+    })
+    sqlite_db = str(tmp_path / 'test.db')
+
+    # When
+    load_to_sqlite(df, sqlite_db)
+    load_to_sqlite(df, sqlite_db, store_rows=False)
+
+    # Then
+    with sqlite3.connect(sqlite_db) as conn:
+        c = conn.cursor()
+        c.execute('SELECT Kanji, Count FROM MorphemeFrequency ORDER BY Kanji')
+        assert c.fetchall() == [('学校', 2), ('日本', 4)]
+        c.execute('SELECT COUNT(*) FROM JapanNews')
+        assert c.fetchone()[0] == 3
@@ -0,0 +1,179 @@
+import datetime
+import sqlite3
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import archive_texts, iter_archived_batches
+from jp_news_scraper_pipeline.pipeline import stream_data_to_sqlite, iter_text_batches, reprocess_archive_to_sqlite, \
+    queue_urls_for_crawl, load_to_sqlite
+
+
+def test_stream_data_to_sqlite_writes_each_batch(mocker, tmp_path):
+    # Given
+    new_urls = ['/news/1.html', '/news/2.html', '/news/3.html']
+    pages = {'/news/1.html': ['日本の学校。'], '/news/2.html': ['東京で勉強する。'], '/news/3.html': ['日本。']}
+    mock_extract = mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url',
+                                side_effect=lambda urls, cache: {url: pages[url] for url in urls})
+    sqlite_db = str(tmp_path / 'test.db')
+
+    # When
+    rows_written = stream_data_to_sqlite(new_urls, sqlite_db, batch_size=2)
+
+    # Then
+    assert mock_extract.call_count == 2
+    with sqlite3.connect(sqlite_db) as conn:
+        rows = conn.execute('SELECT Kanji FROM JapanNews ORDER BY ID').fetchall()
+    assert rows_written == len(rows)
+    assert [row[0] for row in rows] == ['日本', 'の', '学校', '東京', 'で', '勉強', 'する', '日本']
+
+
+def test_stream_data_to_sqlite_no_texts(mocker, tmp_path):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url', return_value={})
+    sqlite_db = str(tmp_path / 'test.db')
+
+    # When
+    rows_written = stream_data_to_sqlite(['/news/1.html'], sqlite_db)
+
+    # Then
+    assert rows_written == 0
+
+
+def test_iter_text_batches_is_lazy(mocker):
+    # Given
+    mock_extract = mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url',
+                                side_effect=lambda urls, cache: {url: [url] for url in urls})
+
+    # When
+    batches = iter_text_batches(['/1', '/2', '/3'], batch_size=2)
+
+    # Then
+    assert mock_extract.call_count == 0
+    assert next(batches) == ['/1', '/2']
+    assert mock_extract.call_count == 1
+    assert list(batches) == [['/3']]
+
+
+def test_stream_data_to_sqlite_archives_texts(mocker, tmp_path):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url',
+                 side_effect=lambda urls, cache: {url: ['日本の学校。'] for url in urls})
+    archive_dir = str(tmp_path / 'archive')
+
+    # When
+    stream_data_to_sqlite(['/news/1.html', '/news/2.html'], str(tmp_path / 'test.db'), archive_dir=archive_dir)
+
+    # Then
+    batches = list(iter_archived_batches(archive_dir))
+    assert [batch.texts_by_url for batch in batches] == [{'/news/1.html': ['日本の学校。'],
+                                                          '/news/2.html': ['日本の学校。']}]
+
+
+def test_reprocess_archive_to_sqlite_without_network(mocker, tmp_path):
+    # Given
+    mock_extract = mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url')
+    archive_dir = str(tmp_path / 'archive')
+    archive_texts({'/news/1.html': ['日本の学校。'], '/news/2.html': ['東京。']}, archive_dir)
+    sqlite_db = str(tmp_path / 'test.db')
+
+    # When
+    rows_written = reprocess_archive_to_sqlite(sqlite_db, archive_dir, batch_size=1)
+
+    # Then
+    mock_extract.assert_not_called()
+    with sqlite3.connect(sqlite_db) as conn:
+        rows = conn.execute('SELECT Kanji FROM JapanNews ORDER BY ID').fetchall()
+    assert rows_written == 4
+    assert [row[0] for row in rows] == ['日本', 'の', '学校', '東京']
+
+
+def test_reprocess_archive_to_sqlite_keeps_fetch_time_and_skips_repeated_fetches(tmp_path):
+    # Given a crawl that was resumed and fetched the first article again
+    archive_dir = str(tmp_path / 'archive')
+    archive_texts({'/news/1.html': ['日本の学校。']}, archive_dir, datetime.datetime(2024, 7, 3, 9))
+    archive_texts({'/news/1.html': ['日本の学校。'], '/news/2.html': ['東京。']}, archive_dir,
+                  datetime.datetime(2024, 7, 4, 10))
+    sqlite_db = str(tmp_path / 'test.db')
+
+    # When
+    rows_written = reprocess_archive_to_sqlite(sqlite_db, archive_dir)
+    rows_written_again = reprocess_archive_to_sqlite(sqlite_db, archive_dir)
+
+    # Then
+    with sqlite3.connect(sqlite_db) as conn:
+        rows = conn.execute('SELECT Kanji, TimeStamp FROM JapanNews ORDER BY ID').fetchall()
+    assert rows_written == 4
+    assert rows_written_again == 0
+    assert rows == [('日本', '2024-07-03 09:00:00'), ('の', '2024-07-03 09:00:00'), ('学校', '2024-07-03 09:00:00'),
+                    ('東京', '2024-07-04 10:00:00')]
+
+
+def test_stream_data_to_sqlite_resumes_unfinished_urls(mocker, tmp_path):
+    # Given
+    pages = {'/news/1.html': ['日本の学校。'], '/news/2.html': ['東京で勉強する。'], '/news/3.html': []}
+    mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url',
+                 side_effect=lambda urls, cache: {url: pages[url] for url in urls if pages[url]})
+    loads = []
+
+    def crash_on_second_load(df, sqlite_db, loaded_urls, text_hashes):
+        loads.append(loaded_urls)
+        if len(loads) == 2:
+            raise RuntimeError('disk I/O error')
+        load_to_sqlite(df, sqlite_db, loaded_urls=loaded_urls, text_hashes=text_hashes)
+
+    mocker.patch('jp_news_scraper_pipeline.pipeline.load_to_sqlite', side_effect=crash_on_second_load)
+    sqlite_db = str(tmp_path / 'test.db')
+    urls = queue_urls_for_crawl(list(pages), sqlite_db)
+    try:
+        stream_data_to_sqlite(urls, sqlite_db, batch_size=1)
+    except RuntimeError:
+        pass
+    mocker.stopall()
+    mock_extract = mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url',
+                                side_effect=lambda urls, cache: {url: pages[url] for url in urls if pages[url]})
+
+    # When
+    resumed_urls = queue_urls_for_crawl([], sqlite_db)
+    stream_data_to_sqlite(resumed_urls, sqlite_db, batch_size=1)
+
+    # Then
+    assert resumed_urls == ['/news/2.html', '/news/3.html']
+    assert mock_extract.call_count == 2
+    with sqlite3.connect(sqlite_db) as conn:
+        states = conn.execute('SELECT Url, Status, Attempts, LastError FROM CrawlState ORDER BY Url').fetchall()
+        rows = conn.execute('SELECT Kanji FROM JapanNews ORDER BY ID').fetchall()
+    assert states == [
+        ('/news/1.html', 'loaded', 1, None),
+        ('/news/2.html', 'loaded', 2, None),
+        ('/news/3.html', 'pending', 1, 'No news article found'),
+    ]
+    assert [row[0] for row in rows] == ['日本', 'の', '学校', '東京', 'で', '勉強', 'する']
+
+
+def test_stream_data_to_sqlite_skips_duplicate_texts(mocker, tmp_path):
+    # Given
+    pages = {
+        '/news/1.html': ['日本の学校。\n東京で勉強する。'],
+        # The same story under another URL, with different whitespace.
+        '/news/2.html': ['日本の学校。\n\n東京で勉強する。 '],
+        # Another story that shares one of the paragraphs.
+        '/news/3.html': ['日本の学校。\n大阪。'],
+    }
+    mocker.patch('jp_news_scraper_pipeline.pipeline.extract_texts_by_url',
+                 side_effect=lambda urls, cache: {url: pages[url] for url in urls})
+    mock_extract_records = mocker.patch('jp_news_scraper_pipeline.pipeline.extract_morpheme_records',
+                                        wraps=extract_morpheme_records)
+    sqlite_db = str(tmp_path / 'test.db')
+
+    # When
+    rows_written = stream_data_to_sqlite(list(pages), sqlite_db, batch_size=2)
+
+    # Then
+    assert mock_extract_records.call_args_list[0].args[0] == ['日本の学校。\n東京で勉強する。']
+    assert mock_extract_records.call_args_list[1].args[0] == ['日本の学校。\n大阪。']
+    with sqlite3.connect(sqlite_db) as conn:
+        rows = conn.execute('SELECT Kanji FROM JapanNews ORDER BY ID').fetchall()
+        hash_count = conn.execute('SELECT COUNT(*) FROM TextHashes').fetchone()[0]
+    assert rows_written == len(rows)
+    assert [row[0] for row in rows] == ['日本', 'の', '学校', '東京', 'で', '勉強', 'する', '日本', 'の', '学校', '大阪']
+    # One hash per new article and per new paragraph.
+    assert hash_count == 6
@@ -1,51 +1,28 @@
-import pandas as pd
-
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS
 from jp_news_scraper_pipeline.pipeline import transform_data_to_df
 
 
 def test_transform_data_to_df_correctly(mocker):
     # Given
-    kanji_list = ['漢字', '日本', '学校', '勉強']
-    pos_list = ['Noun', 'Noun', 'Noun', 'Noun']
-    pos_translated_list = ['Noun', 'Noun', 'Noun', 'Noun']
-
-    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.create_df_for_japan_news_table',
-                 return_value=pd.DataFrame({
-                     'Kanji': kanji_list,
-                     'PartOfSpeech': pos_list,
-                     'PartOfSpeechEnglish': pos_translated_list
-                 }))
-    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.filter_out_pos', side_effect=lambda df: df)
-    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.filter_out_non_jp_characters',
-                 side_effect=lambda df: df)
+    noun_code = JP_POS_LABELS.index('名詞')
+    token_buffer = TokenBuffer.from_records([('漢字', noun_code), ('日本', noun_code), ('漢字', noun_code)])
+    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.romanize_morpheme',
+                 side_effect=lambda morpheme: {'漢字': 'kanji', '日本': 'nihon'}[morpheme])
 
     # When
-    result_df = transform_data_to_df(kanji_list, pos_list, pos_translated_list)
+    result_df = transform_data_to_df(token_buffer)
 
     # Then
-    assert not result_df.empty
     assert list(result_df.columns) == ['Kanji', 'Romanji', 'PartOfSpeech', 'PartOfSpeechEnglish', 'TimeStamp']
+    assert result_df['Kanji'].tolist() == ['漢字', '日本', '漢字']
+    assert result_df['Romanji'].tolist() == ['kanji', 'nihon', 'kanji']
+    assert result_df['PartOfSpeechEnglish'].tolist() == ['Noun', 'Noun', 'Noun']
 
 
-def test_transform_data_to_df_empty_input(mocker):
-    # Given
-    kanji_list = []
-    pos_list = []
-    pos_translated_list = []
-
-    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.create_df_for_japan_news_table',
-                 return_value=pd.DataFrame({
-                     'Kanji': kanji_list,
-                     'PartOfSpeech': pos_list,
-                     'PartOfSpeechEnglish': pos_translated_list
-                 }))
-    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.filter_out_pos',
-                 side_effect=lambda df: df)
-    mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.filter_out_non_jp_characters',
-                 side_effect=lambda df: df)
-
+def test_transform_data_to_df_empty_input():
     # When
-    result_df = transform_data_to_df(kanji_list, pos_list, pos_translated_list)
+    result_df = transform_data_to_df(TokenBuffer())
 
     # Then
     assert result_df.empty
@@ -0,0 +1,77 @@
+import datetime
+
+import pyarrow.parquet as pq
+
+from jp_news_scraper_pipeline.jp_news_scraper.article_archive import archive_texts, iter_archived_batches, \
+    open_archive, ArchivedBatch
+
+
+def test_archive_texts_partitions_by_date(tmp_path):
+    # Given
+    archive_dir = tmp_path / 'archive'
+    texts_by_url = {'/news/1.html': ['日本の学校。', '東京。'], '/news/2.html': ['大阪。']}
+
+    # When
+    archived_count = archive_texts(texts_by_url, archive_dir, datetime.datetime(2024, 7, 4, 9, 30))
+
+    # Then
+    assert archived_count == 3
+    files = list((archive_dir / 'date=2024-07-04').glob('*.parquet'))
+    assert len(files) == 1
+    assert pq.ParquetFile(files[0]).metadata.row_group(0).column(0).compression == 'ZSTD'
+    table = open_archive(archive_dir).to_table()
+    assert table.column('url').to_pylist() == ['/news/1.html', '/news/1.html', '/news/2.html']
+    assert table.column('fetched_at').to_pylist() == [datetime.datetime(2024, 7, 4, 9, 30)] * 3
+
+
+def test_archive_texts_appends(tmp_path):
+    # Given
+    archive_dir = tmp_path / 'archive'
+    fetched_at = datetime.datetime(2024, 7, 4)
+
+    # When
+    archive_texts({'/news/1.html': ['一']}, archive_dir, fetched_at)
+    archive_texts({'/news/2.html': ['二']}, archive_dir, fetched_at)
+
+    # Then
+    assert sorted(open_archive(archive_dir).to_table().column('text').to_pylist()) == ['一', '二']
+
+
+def test_archive_texts_empty(tmp_path):
+    assert archive_texts({}, tmp_path / 'archive') == 0
+    assert not (tmp_path / 'archive').exists()
+
+
+def test_iter_archived_batches_filters_by_date(tmp_path):
+    # Given
+    archive_dir = tmp_path / 'archive'
+    archive_texts({'/news/1.html': ['一']}, archive_dir, datetime.datetime(2024, 7, 3))
+    archive_texts({'/news/2.html': ['二', '三', '四'], '/news/3.html': ['五']}, archive_dir,
+                  datetime.datetime(2024, 7, 4, 9))
+    archive_texts({'/news/4.html': ['六']}, archive_dir, datetime.datetime(2024, 7, 5))
+
+    # When
+    batches = list(iter_archived_batches(archive_dir, batch_size=2, since='2024-07-04', until='2024-07-04'))
+
+    # Then the texts of an article stay in one batch
+    fetched_at = datetime.datetime(2024, 7, 4, 9)
+    assert batches == [ArchivedBatch(fetched_at, {'/news/2.html': ['二', '三', '四']}),
+                       ArchivedBatch(fetched_at, {'/news/3.html': ['五']})]
+
+
+def test_iter_archived_batches_replays_fetches_in_order(tmp_path):
+    # Given
+    archive_dir = tmp_path / 'archive'
+    for hour in [11, 9, 10]:
+        archive_texts({'/news/1.html': [f'{hour}時']}, archive_dir, datetime.datetime(2024, 7, 4, hour))
+
+    # When
+    batches = list(iter_archived_batches(archive_dir))
+
+    # Then
+    assert [batch.fetched_at.hour for batch in batches] == [9, 10, 11]
+    assert [batch.texts_by_url for batch in batches] == [{'/news/1.html': [f'{hour}時']} for hour in [9, 10, 11]]
+
+
+def test_iter_archived_batches_missing_archive(tmp_path):
+    assert list(iter_archived_batches(tmp_path / 'missing')) == []
@@ -0,0 +1,121 @@
+import asyncio
+import email.utils
+import time
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import fetch_pages, iter_page_batches, \
+    parse_retry_after, MAX_RETRY_AFTER
+
+
+@pytest.fixture
+def page_server(local_http_server):
+    local_http_server.pages = {f'/news/{i}.html': f'<p>記事{i}</p>' for i in range(20)}
+    return local_http_server
+
+
+def test_fetch_pages_returns_results_in_input_order(page_server):
+    # Given
+    urls = [f'{page_server.base_url}/news/{i}.html' for i in reversed(range(20))]
+
+    # When
+    pages = fetch_pages(urls, concurrency=4, min_request_interval=0)
+
+    # Then
+    assert pages == [f'<p>記事{i}</p>' for i in reversed(range(20))]
+
+
+def test_fetch_pages_returns_none_for_missing_page(page_server):
+    # Given
+    urls = [f'{page_server.base_url}/news/0.html', f'{page_server.base_url}/news/missing.html']
+
+    # When
+    pages = fetch_pages(urls, retries=0, min_request_interval=0)
+
+    # Then
+    assert pages == ['<p>記事0</p>', None]
+
+
+def test_fetch_pages_retries_retryable_status(page_server):
+    # Given
+    page_server.failures['/news/1.html'] = [503, 500]
+
+    # When
+    pages = fetch_pages([f'{page_server.base_url}/news/1.html'], retries=2, backoff=0.01, min_request_interval=0)
+
+    # Then
+    assert pages == ['<p>記事1</p>']
+    assert page_server.request_log.count('/news/1.html') == 3
+
+
+def test_fetch_pages_gives_up_after_retries(page_server):
+    # Given
+    page_server.failures['/news/1.html'] = [503, 503, 503]
+
+    # When
+    pages = fetch_pages([f'{page_server.base_url}/news/1.html'], retries=1, backoff=0.01, min_request_interval=0)
+
+    # Then
+    assert pages == [None]
+    assert page_server.request_log.count('/news/1.html') == 2
+
+
+def test_fetch_pages_waits_for_retry_after(page_server):
+    # Given
+    page_server.failures['/news/1.html'] = [429]
+    page_server.retry_after = '1'
+
+    # When
+    start = time.perf_counter()
+    pages = fetch_pages([f'{page_server.base_url}/news/1.html'], retries=1, backoff=0.01, min_request_interval=0)
+    elapsed = time.perf_counter() - start
+
+    # Then the retry waits for the server's delay rather than the backoff
+    assert pages == ['<p>記事1</p>']
+    assert elapsed >= 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('not a delay') is None
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after('100000') == MAX_RETRY_AFTER
+    assert parse_retry_after(email.utils.formatdate(time.time() - 60, usegmt=True)) == 0
+    assert 25 <= parse_retry_after(email.utils.formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_fetch_pages_rate_limits_per_host(page_server):
+    # Given
+    urls = [f'{page_server.base_url}/news/{i}.html' for i in range(5)]
+
+    # When
+    start = time.perf_counter()
+    fetch_pages(urls, concurrency=5, min_request_interval=0.05)
+    elapsed = time.perf_counter() - start
+
+    # Then the fifth request cannot start before four intervals have passed
+    assert elapsed >= 0.2
+
+
+def test_fetch_pages_empty_list():
+    assert fetch_pages([]) == []
+
+
+if __name__ == "__main__":
+    pytest.main()
+
+
+def test_iter_page_batches_yields_batches_in_order(page_server):
+    # Given
+    urls = [f'{page_server.base_url}/news/{i}.html' for i in range(5)]
+
+    async def collect():
+        return [batch async for batch in iter_page_batches(urls, 2, concurrency=2, min_request_interval=0)]
+
+    # When
+    batches = asyncio.run(collect())
+
+    # Then
+    assert [url_batch for url_batch, _ in batches] == [urls[:2], urls[2:4], urls[4:]]
+    assert [page for _, pages in batches for page in pages] == [f'<p>記事{i}</p>' for i in range(5)]
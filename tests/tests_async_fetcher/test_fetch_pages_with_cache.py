@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import fetch_pages
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache
+
+
+@pytest.fixture
+def page_server(local_http_server):
+    local_http_server.pages = {'/news/1.html': '<p>記事1</p>'}
+    local_http_server.etags_enabled = True
+    return local_http_server
+
+
+def test_fresh_page_is_served_from_cache(page_server, tmp_path):
+    # Given
+    cache = HttpCache(tmp_path / 'cache')
+    url = f'{page_server.base_url}/news/1.html'
+
+    # When
+    first = fetch_pages([url], min_request_interval=0, cache=cache)
+    second = fetch_pages([url], min_request_interval=0, cache=cache)
+
+    # Then
+    assert first == second == ['<p>記事1</p>']
+    assert page_server.request_log == ['/news/1.html']
+    cache.close()
+
+
+def test_stale_page_is_revalidated(page_server, tmp_path):
+    # Given
+    cache = HttpCache(tmp_path / 'cache', ttl=0)
+    url = f'{page_server.base_url}/news/1.html'
+    fetch_pages([url], min_request_interval=0, cache=cache)
+
+    # When
+    pages = fetch_pages([url], min_request_interval=0, cache=cache)
+
+    # Then
+    assert pages == ['<p>記事1</p>']
+    assert page_server.not_modified_count == 1
+    cache.close()
+
+
+def test_changed_page_replaces_cached_page(page_server, tmp_path):
+    # Given
+    cache = HttpCache(tmp_path / 'cache', ttl=0)
+    url = f'{page_server.base_url}/news/1.html'
+    fetch_pages([url], min_request_interval=0, cache=cache)
+    page_server.pages['/news/1.html'] = '<p>更新</p>'
+
+    # When
+    pages = fetch_pages([url], min_request_interval=0, cache=cache)
+
+    # Then
+    assert pages == ['<p>更新</p>']
+    assert page_server.not_modified_count == 0
+    assert cache.read(cache.lookup(url)) == '<p>更新</p>'
+    cache.close()
+
+
+def test_offline_cache_never_uses_network(page_server, tmp_path):
+    # Given
+    url = f'{page_server.base_url}/news/1.html'
+    cache = HttpCache(tmp_path / 'cache', ttl=0)
+    fetch_pages([url], min_request_interval=0, cache=cache)
+    cache.close()
+    offline_cache = HttpCache(tmp_path / 'cache', ttl=0, offline=True)
+
+    # When
+    pages = fetch_pages([url, f'{page_server.base_url}/news/missing.html'],
+                        min_request_interval=0, cache=offline_cache)
+
+    # Then
+    assert pages == ['<p>記事1</p>', None]
+    assert page_server.request_log == ['/news/1.html']
+    offline_cache.close()
+
+
+def test_cache_is_accessed_outside_of_the_event_loop_thread(page_server, tmp_path):
+    # Given
+    cache = HttpCache(tmp_path / 'cache', ttl=0)
+    urls = [f'{page_server.base_url}/news/1.html']
+    fetch_pages(urls, min_request_interval=0, cache=cache)
+    calling_threads = {}
+
+    def record_thread(name):
+        method = getattr(cache, name)
+
+        def wrapper(*args):
+            calling_threads[name] = threading.get_ident()
+            return method(*args)
+        return wrapper
+
+    for name in ('lookup', 'read', 'refresh', 'store'):
+        setattr(cache, name, record_thread(name))
+
+    # When the stale page is revalidated, and a new page is stored
+    page_server.pages['/news/2.html'] = '<p>記事2</p>'
+    pages = fetch_pages(urls + [f'{page_server.base_url}/news/2.html'], min_request_interval=0, cache=cache)
+
+    # Then
+    assert pages == ['<p>記事1</p>', '<p>記事2</p>']
+    assert set(calling_threads) == {'lookup', 'read', 'refresh', 'store'}
+    assert threading.get_ident() not in calling_threads.values()
+    cache.close()
+
+
+def test_missing_cached_body_is_fetched_again_without_using_a_retry(page_server, tmp_path):
+    # Given
+    cache = HttpCache(tmp_path / 'cache', ttl=0)
+    url = f'{page_server.base_url}/news/1.html'
+    fetch_pages([url], min_request_interval=0, cache=cache)
+    for body_path in (tmp_path / 'cache' / 'bodies').rglob('*.gz'):
+        body_path.unlink()
+
+    # When
+    pages = fetch_pages([url], retries=0, min_request_interval=0, cache=cache)
+
+    # Then the 304 is followed by an unconditional request
+    assert pages == ['<p>記事1</p>']
+    assert page_server.not_modified_count == 1
+    assert page_server.request_log == ['/news/1.html'] * 3
+    cache.close()
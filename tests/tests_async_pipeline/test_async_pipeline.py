@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+
+import pytest
+
+from jp_news_scraper_pipeline.async_pipeline import run_async_pipeline, process_batch_for_sqlite, \
+    write_batch_to_sqlite, stream_data_to_sqlite_async
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_crawl_state_table, enqueue_crawl_urls, \
+    create_text_hash_table, create_romaji_cache_table, CRAWL_LOADED
+
+
+def article(text):
+    return f'<html><body><section class="content--detail-main">{text}</section></body></html>'
+
+
+PAGES = {
+    '/news/1.html': article('日本の学校。'),
+    '/news/2.html': article('東京で勉強する。'),
+    '/news/3.html': '<html><body><p>No article</p></body></html>',
+    '/news/4.html': article('日本の学校。'),
+}
+
+
+async def fake_iter_page_batches(urls, batch_size, concurrency, cache=None):
+    for start in range(0, len(urls), batch_size):
+        url_batch = urls[start:start + batch_size]
+        await asyncio.sleep(0)
+        yield url_batch, [PAGES.get(url.removeprefix('https://www3.nhk.or.jp')) for url in url_batch]
+
+
+def test_stream_data_to_sqlite_async_writes_each_batch(mocker, tmp_path):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.async_pipeline.iter_page_batches', side_effect=fake_iter_page_batches)
+    sqlite_db = str(tmp_path / 'test.db')
+    urls = list(PAGES)
+    with sqlite3.connect(sqlite_db) as conn:
+        create_crawl_state_table(conn)
+        enqueue_crawl_urls(conn, urls)
+    conn.close()
+
+    # When
+    rows_written = stream_data_to_sqlite_async(urls, sqlite_db, batch_size=1, queue_size=1)
+
+    # Then
+    with sqlite3.connect(sqlite_db) as conn:
+        rows = conn.execute('SELECT Kanji, Romanji FROM JapanNews ORDER BY ID').fetchall()
+        statuses = dict(conn.execute('SELECT Url, Status FROM CrawlState').fetchall())
+        cached_romaji = conn.execute('SELECT COUNT(*) FROM RomajiCache').fetchone()[0]
+    conn.close()
+    assert rows_written == len(rows)
+    # The article of the last URL was already on its way to the database, so it is not counted twice.
+    assert [kanji for kanji, _ in rows] == ['日本', 'の', '学校', '東京', 'で', '勉強', 'する']
+    assert statuses == {'/news/1.html': CRAWL_LOADED, '/news/2.html': CRAWL_LOADED, '/news/3.html': 'pending',
+                        '/news/4.html': CRAWL_LOADED}
+    assert cached_romaji == len({kanji for kanji, _ in rows})
+
+
+def test_run_async_pipeline_fetches_while_processing(local_http_server, tmp_path):
+    # Given
+    local_http_server.pages = PAGES
+    urls = list(PAGES)
+    second_batch_fetched = threading.Event()
+    fetched_before_processed = []
+
+    def process_batch(url_batch, pages):
+        if url_batch == urls[:2]:
+            # The first batch is processed while the second one is fetched.
+            fetched_before_processed.append(second_batch_fetched.wait(timeout=10))
+        return url_batch
+
+    def write_batch(url_batch):
+        return len(url_batch)
+
+    async def run():
+        task = asyncio.create_task(run_async_pipeline(
+            urls, process_batch, write_batch, batch_size=2, base_url=local_http_server.base_url))
+        while len(local_http_server.request_log) < len(urls):
+            await asyncio.sleep(0.01)
+        second_batch_fetched.set()
+        return await task
+
+    # When
+    rows_written = asyncio.run(run())
+
+    # Then
+    assert rows_written == len(urls)
+    assert fetched_before_processed == [True]
+
+
+def test_run_async_pipeline_bounds_the_batches_in_flight(mocker):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.async_pipeline.iter_page_batches', side_effect=fake_iter_page_batches)
+    urls = [f'/news/{i}.html' for i in range(20)]
+    processed = []
+    writer_released = threading.Event()
+
+    def write_batch(url_batch):
+        writer_released.wait(timeout=10)
+        return len(url_batch)
+
+    async def run():
+        task = asyncio.create_task(run_async_pipeline(
+            urls, lambda url_batch, pages: processed.append(url_batch) or url_batch, write_batch,
+            batch_size=1, queue_size=1))
+        await asyncio.sleep(0.2)
+        processed_while_writer_blocked = len(processed)
+        writer_released.set()
+        return processed_while_writer_blocked, await task
+
+    # When
+    processed_while_writer_blocked, rows_written = asyncio.run(run())
+
+    # Then
+    # One batch in the writer, one in the write queue and one waiting to be put on it.
+    assert processed_while_writer_blocked == 3
+    assert rows_written == len(urls)
+
+
+def test_run_async_pipeline_raises_the_first_error(mocker):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.async_pipeline.iter_page_batches', side_effect=fake_iter_page_batches)
+    written = []
+
+    def process_batch(url_batch, pages):
+        if url_batch == ['/news/2.html']:
+            raise ValueError('cannot tokenize')
+        return url_batch
+
+    # When
+    with pytest.raises(ValueError, match='cannot tokenize'):
+        asyncio.run(run_async_pipeline(list(PAGES), process_batch, lambda batch: written.append(batch) or 1,
+                                       batch_size=1))
+
+    # Then
+    assert ['/news/3.html'] not in written
+
+
+def test_process_batch_for_sqlite_leaves_the_writes_to_the_writer(tmp_path):
+    # Given
+    sqlite_db = str(tmp_path / 'test.db')
+    with sqlite3.connect(sqlite_db) as conn:
+        create_crawl_state_table(conn)
+        create_text_hash_table(conn)
+        create_romaji_cache_table(conn)
+    conn.close()
+    process_batch = functools.partial(process_batch_for_sqlite, sqlite_db=sqlite_db, pending_hashes=set())
+
+    # When
+    batch = process_batch(['/news/1.html', '/news/3.html'], [PAGES['/news/1.html'], PAGES['/news/3.html']])
+    with sqlite3.connect(sqlite_db) as conn:
+        romaji_before_write = conn.execute('SELECT COUNT(*) FROM RomajiCache').fetchone()[0]
+    conn.close()
+    rows_written = write_batch_to_sqlite(batch, sqlite_db)
+
+    # Then
+    assert batch.fetched_urls == ['/news/1.html']
+    assert batch.df['Kanji'].tolist() == ['日本', 'の', '学校']
+    assert set(batch.new_romaji) == {'日本', 'の', '学校'}
+    assert romaji_before_write == 0
+    assert rows_written == 3
+    with sqlite3.connect(sqlite_db) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM RomajiCache').fetchone()[0] == 3
+        assert conn.execute('SELECT COUNT(*) FROM TextHashes').fetchone()[0] == 2
+    conn.close()
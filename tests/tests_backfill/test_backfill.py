@@ -0,0 +1,139 @@
+import sqlite3
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from jp_news_scraper_pipeline.backfill import run_backfill, split_into_shards, read_urls_from_parquet, \
+    read_urls_from_db, MERGED_FILE_NAME
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import load_new_urls_to_db
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import NHK_BASE_URL
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_news_url_table
+
+PAGES = {
+    '/news/1.html': ['日本の学校。'],
+    '/news/2.html': ['東京で勉強する。'],
+    '/news/3.html': ['日本。'],
+    '/news/4.html': [],
+    '/news/5.html': ['大阪の学校。'],
+}
+
+EXPECTED_KANJI = ['日本', 'の', '学校', '東京', 'で', '勉強', 'する', '日本', '大阪', 'の', '学校']
+
+
+def fake_fetch_pages(urls, concurrency):
+    pages = []
+    for url in urls:
+        texts = PAGES[url.removeprefix(NHK_BASE_URL)]
+        pages.append(''.join(f'<section class="content--detail-main">{text}</section>' for text in texts)
+                     or '<p>No article</p>')
+    return pages
+
+
+def test_split_into_shards_names_shards_by_their_urls(tmp_path):
+    # When
+    shards = split_into_shards(['/1', '/2', '/3'], tmp_path, shard_size=2)
+    resized_shards = split_into_shards(['/1', '/2', '/3'], tmp_path, shard_size=3)
+
+    # Then
+    assert [shard.urls for shard in shards] == [['/1', '/2'], ['/3']]
+    assert shards[0].path.name.startswith('shard-00000-')
+    assert shards[0].path != resized_shards[0].path
+
+
+def test_read_urls(tmp_path):
+    # Given
+    url_parquet = tmp_path / 'urls.parquet'
+    pd.DataFrame({'Url': ['/news/2.html', '/news/1.html', '/news/2.html'],
+                  'TimeStamp': '2024-07-04 09:00:00'}).to_parquet(url_parquet)
+    sqlite_db = str(tmp_path / 'test.db')
+    with sqlite3.connect(sqlite_db) as conn:
+        create_news_url_table(conn)
+        load_new_urls_to_db(conn, ['/news/2.html', '/news/1.html'])
+
+    # Then
+    assert read_urls_from_parquet(url_parquet) == {'/news/2.html': '2024-07-04 09:00:00',
+                                                   '/news/1.html': '2024-07-04 09:00:00'}
+    assert list(read_urls_from_db(sqlite_db)) == ['/news/1.html', '/news/2.html']
+
+
+def test_run_backfill_keeps_the_timestamp_of_each_url(mocker, tmp_path):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.backfill.fetch_pages', side_effect=fake_fetch_pages)
+    timestamps = {url: f'2024-05-0{i} 12:00:00' for i, url in enumerate(PAGES, start=1)}
+
+    # When
+    report = run_backfill(timestamps, tmp_path, shard_size=2, workers=1)
+
+    # Then
+    df = pq.read_table(report.merged_path).to_pandas()
+    assert df['Kanji'].tolist() == EXPECTED_KANJI
+    assert df['TimeStamp'].astype(str).tolist() == (['2024-05-01 12:00:00'] * 3 + ['2024-05-02 12:00:00'] * 4
+                                                    + ['2024-05-03 12:00:00'] + ['2024-05-05 12:00:00'] * 3)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_backfill_merges_shards_in_order(mocker, tmp_path, workers):
+    # Given
+    mocker.patch('jp_news_scraper_pipeline.backfill.fetch_pages', side_effect=fake_fetch_pages)
+
+    # When
+    report = run_backfill(list(PAGES), tmp_path, shard_size=2, workers=workers)
+
+    # Then
+    assert report.shard_count == report.completed_shards == 3
+    assert report.url_count == 5
+    assert report.failed_shards == 0
+    assert report.merged_path == tmp_path / MERGED_FILE_NAME
+    df = pq.read_table(report.merged_path).to_pandas()
+    assert df.columns.tolist() == ['Kanji', 'Romanji', 'PartOfSpeech', 'PartOfSpeechEnglish', 'TimeStamp']
+    assert df['Kanji'].tolist() == EXPECTED_KANJI
+    assert report.token_count == len(df)
+
+
+def test_run_backfill_resumes_after_a_failed_shard(mocker, tmp_path):
+    # Given
+    fail = {NHK_BASE_URL + '/news/3.html'}
+
+    def flaky_fetch_pages(urls, concurrency):
+        if fail & set(urls):
+            raise ConnectionError('connection reset')
+        return fake_fetch_pages(urls, concurrency)
+
+    mock_fetch = mocker.patch('jp_news_scraper_pipeline.backfill.fetch_pages', side_effect=flaky_fetch_pages)
+    first_report = run_backfill(list(PAGES), tmp_path, shard_size=2, workers=1)
+    merged_after_failure = (tmp_path / MERGED_FILE_NAME).exists()
+    fail.clear()
+    mock_fetch.reset_mock()
+
+    # When
+    report = run_backfill(list(PAGES), tmp_path, shard_size=2, workers=1)
+
+    # Then
+    assert first_report.failed_shards == 1
+    assert first_report.merged_path is None
+    assert not merged_after_failure
+    assert mock_fetch.call_args_list == [
+        mocker.call([NHK_BASE_URL + '/news/3.html', NHK_BASE_URL + '/news/4.html'], concurrency=mocker.ANY)]
+    assert (report.skipped_shards, report.completed_shards, report.failed_shards) == (2, 1, 0)
+    df = pq.read_table(report.merged_path).to_pandas()
+    assert df['Kanji'].tolist() == EXPECTED_KANJI
+
+
+def test_run_backfill_does_not_checkpoint_a_shard_with_unfetched_pages(mocker, tmp_path):
+    # Given
+    def failing_fetch_pages(urls, concurrency):
+        pages = fake_fetch_pages(urls, concurrency)
+        return [None if url.endswith('/news/3.html') else page for url, page in zip(urls, pages)]
+
+    mocker.patch('jp_news_scraper_pipeline.backfill.fetch_pages', side_effect=failing_fetch_pages)
+
+    # When
+    report = run_backfill(list(PAGES), tmp_path, shard_size=2, workers=1)
+
+    # Then the shard of the unfetched page is retried by the next run, and the merge waits for it
+    shards = split_into_shards(list(PAGES), tmp_path / 'shards', shard_size=2)
+    assert [shard.path.exists() for shard in shards] == [True, False, True]
+    assert report.failed_shards == 1
+    assert report.merged_path is None
+    assert not (tmp_path / MERGED_FILE_NAME).exists()
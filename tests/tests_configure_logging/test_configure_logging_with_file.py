@@ -0,0 +1,39 @@
+import logging.handlers
+
+from jp_news_scraper_pipeline.configure_logging import configure_logging_with_file, stop_logging
+
+
+def test_configure_logging_with_file_once_per_process(tmp_path):
+    # Given
+    log_file = tmp_path / 'test.log'
+    logger = configure_logging_with_file(log_file=str(log_file), logger_name='test_once', level='INFO',
+                                         print_on_terminal=False)
+    logger.info('first %s', 'message')
+
+    # When
+    same_logger = configure_logging_with_file(log_file=str(log_file), logger_name='test_once', level='INFO',
+                                              print_on_terminal=False)
+    same_logger.info('second message')
+    stop_logging('test_once')
+
+    # Then
+    assert same_logger is logger
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert [line.split(' | ')[-1] for line in lines] == ['first message', 'second message']
+
+
+def test_configure_logging_with_file_uses_queue_handler(tmp_path):
+    # Given
+    log_file = tmp_path / 'test.log'
+
+    # When
+    logger = configure_logging_with_file(log_file=str(log_file), logger_name='test_queue', level='WARNING')
+
+    # Then
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], logging.handlers.QueueHandler)
+    logger.info('dropped')
+    logger.warning('kept')
+    stop_logging('test_queue')
+    assert log_file.read_text(encoding='utf-8').splitlines()[0].endswith('| WARNING | kept')
+    assert logger.handlers == []
@@ -0,0 +1,56 @@
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records, extract_morphemes
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS, EN_POS_LABELS
+
+
+def decode(records):
+    return [(morpheme, JP_POS_LABELS[pos_code], EN_POS_LABELS[pos_code]) for morpheme, pos_code in records]
+
+
+# Sample test data
+joined_text_list_with_kanji = ["これはテストです。", "漢字を抽出します。"]
+joined_text_list_without_kanji = ["No kanji."]
+empty_text_list = []
+
+
+def test_extract_morpheme_records_with_kanji():
+    result = extract_morpheme_records(joined_text_list_with_kanji)
+    assert decode(result) == [
+        ('これ', '代名詞', 'Pronoun'),
+        ('は', '助詞', 'Particle'),
+        ('テスト', '名詞', 'Noun'),
+        ('です', '助動詞', 'Auxiliary Verb'),
+        ('。', '補助記号', 'Supplementary Symbol'),
+        ('漢字', '名詞', 'Noun'),
+        ('を', '助詞', 'Particle'),
+        ('抽出', '名詞', 'Noun'),
+        ('する', '動詞', 'Verb'),
+        ('ます', '助動詞', 'Auxiliary Verb'),
+        ('。', '補助記号', 'Supplementary Symbol')
+    ]
+
+
+def test_extract_morpheme_records_without_kanji():
+    result = extract_morpheme_records(joined_text_list_without_kanji)
+    assert decode(result) == [
+        ('NO', '名詞', 'Noun'),
+        (' ', '空白', 'Whitespace'),
+        ('kanji', '名詞', 'Noun'),
+        ('.', '補助記号', 'Supplementary Symbol')
+    ]
+
+
+def test_extract_morpheme_records_matches_morphemes():
+    result = extract_morpheme_records(joined_text_list_with_kanji)
+    assert [record[0] for record in result] == extract_morphemes(joined_text_list_with_kanji)
+
+
+def test_extract_morpheme_records_empty_list():
+    result = extract_morpheme_records(empty_text_list)
+    assert result == []
+
+
+# Run the tests
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import filter_out_pos, filter_out_non_jp_characters, \
+    split_morpheme_records
+
+# Sample test data
+joined_text_list = ["これはテストです。", "2024年、NHKのニュースを読む。", "No kanji here."]
+
+
+def test_extract_morpheme_records_filters_tokens():
+    result = extract_morpheme_records(joined_text_list, filter_tokens=True)
+    assert [record[0] for record in result] == [
+        'これ', 'は', 'テスト', 'です', '年', 'の', 'ニュース', 'を', '読む'
+    ]
+
+
+def test_extract_morpheme_records_filter_matches_dataframe_filters():
+    # Given
+    morpheme_list, pos_list, _ = split_morpheme_records(extract_morpheme_records(joined_text_list))
+    df = pd.DataFrame({'Kanji': morpheme_list, 'PartOfSpeech': pos_list})
+    expected = filter_out_non_jp_characters(filter_out_pos(df))
+
+    # When
+    result = split_morpheme_records(extract_morpheme_records(joined_text_list, filter_tokens=True))
+
+    # Then
+    assert result[0] == expected['Kanji'].tolist()
+    assert result[1].tolist() == expected['PartOfSpeech'].tolist()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,29 @@
+from collections import Counter
+
+import pandas as pd
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import count_morphemes_by_day
+
+
+def test_count_morphemes_by_day():
+    # Given
+    df = pd.DataFrame({
+        'Kanji': ['日本', '日本', 'する', '日本'],
+        'PartOfSpeech': ['名詞', '名詞', '動詞', '名詞'],
+        'TimeStamp': ['2024-07-01 10:00:00', '2024-07-01 11:00:00', '2024-07-01 11:00:00', '2024-07-02 09:00:00']
+    })
+
+    # When
+    result = count_morphemes_by_day(df)
+
+    # Then
+    assert result == Counter({
+        ('日本', '名詞', '2024-07-01'): 2,
+        ('する', '動詞', '2024-07-01'): 1,
+        ('日本', '名詞', '2024-07-02'): 1
+    })
+
+
+def test_count_morphemes_by_day_empty():
+    df = pd.DataFrame(columns=['Kanji', 'PartOfSpeech', 'TimeStamp'])
+    assert count_morphemes_by_day(df) == Counter()
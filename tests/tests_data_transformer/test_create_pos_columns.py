@@ -0,0 +1,36 @@
+import pandas as pd
+import pyarrow as pa
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_pos_columns, split_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS
+
+
+def test_create_pos_columns():
+    # Given
+    pos_codes = [JP_POS_LABELS.index('名詞'), JP_POS_LABELS.index('助詞'), JP_POS_LABELS.index('名詞')]
+
+    # When
+    pos_list, pos_translated_list = create_pos_columns(pos_codes)
+
+    # Then
+    assert pos_list.tolist() == ['名詞', '助詞', '名詞']
+    assert pos_translated_list.tolist() == ['Noun', 'Particle', 'Noun']
+    assert list(pos_list.codes) == pos_codes
+
+
+def test_create_pos_columns_empty():
+    pos_list, pos_translated_list = create_pos_columns([])
+    assert len(pos_list) == len(pos_translated_list) == 0
+
+
+def test_pos_columns_are_dictionary_encoded_in_arrow():
+    # Given
+    morpheme_list, pos_list, pos_translated_list = split_morpheme_records([('日本', JP_POS_LABELS.index('名詞'))])
+    df = pd.DataFrame({'Kanji': morpheme_list, 'PartOfSpeech': pos_list, 'PartOfSpeechEnglish': pos_translated_list})
+
+    # When
+    table = pa.Table.from_pandas(df)
+
+    # Then
+    assert pa.types.is_dictionary(table.schema.field('PartOfSpeech').type)
+    assert pa.types.is_dictionary(table.schema.field('PartOfSpeechEnglish').type)
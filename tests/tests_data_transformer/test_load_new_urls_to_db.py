@@ -0,0 +1,32 @@
+import sqlite3
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import load_new_urls_to_db
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_news_url_table
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_news_url_table(conn)
+    yield conn
+    conn.close()
+
+
+def test_load_new_urls_to_db(conn):
+    # When
+    load_new_urls_to_db(conn, ['/news/1.html', '/news/2.html'])
+
+    # Then
+    rows = conn.execute('SELECT Url, TimeStamp FROM NewsUrls ORDER BY Url').fetchall()
+    assert [row[0] for row in rows] == ['/news/1.html', '/news/2.html']
+    assert rows[0][1] == rows[1][1]
+
+
+def test_load_new_urls_to_db_empty_list(conn):
+    # When
+    load_new_urls_to_db(conn, [])
+
+    # Then
+    assert conn.execute('SELECT COUNT(*) FROM NewsUrls').fetchone() == (0,)
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import romanize_series, romanize_morpheme, get_cutlet
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import fetch_cached_romaji
+
+
+def test_romanize_series_maps_back_to_every_row():
+    # Given
+    morphemes = pd.Series(['日本', '今日は', '日本', 'hello'], index=[3, 5, 7, 9])
+
+    # When
+    result = romanize_series(morphemes)
+
+    # Then
+    expected = pd.Series(['Nippon', 'Kyou wa', 'Nippon', 'Hello'], index=[3, 5, 7, 9])
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_romanize_series_romanizes_each_unique_morpheme_once(mocker):
+    # Given
+    morphemes = pd.Series(['日本', '日本', '日本', '東京'])
+    mock_romanize = mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.romanize_morpheme',
+                                 side_effect=lambda morpheme: morpheme + '-romaji')
+
+    # When
+    result = romanize_series(morphemes)
+
+    # Then
+    assert result.tolist() == ['日本-romaji', '日本-romaji', '日本-romaji', '東京-romaji']
+    assert mock_romanize.call_count == 2
+
+
+def test_romanize_series_uses_persistent_cache(mocker):
+    # Given
+    conn = sqlite3.connect(':memory:')
+    romanize_series(pd.Series(['日本', '東京']), conn)
+    mock_romanize = mocker.patch('jp_news_scraper_pipeline.jp_news_scraper.data_transformer.romanize_morpheme',
+                                 side_effect=lambda morpheme: morpheme + '-romaji')
+
+    # When
+    result = romanize_series(pd.Series(['東京', '日本', '大阪']), conn)
+
+    # Then
+    assert result.tolist() == ['Tokyo', 'Nippon', '大阪-romaji']
+    mock_romanize.assert_called_once_with('大阪')
+    assert fetch_cached_romaji(conn, ['大阪']) == {'大阪': '大阪-romaji'}
+
+
+def test_romanize_series_empty():
+    result = romanize_series(pd.Series([], dtype=object))
+    assert result.empty
+
+
+def test_romanize_morpheme_reuses_cutlet_instance():
+    # When
+    romanize_morpheme('学校')
+
+    # Then
+    assert get_cutlet() is get_cutlet()
+    assert romanize_morpheme.cache_info().currsize > 0
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.http_cache import HttpCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    http_cache = HttpCache(tmp_path / 'cache')
+    yield http_cache
+    http_cache.close()
+
+
+def test_store_and_read(cache):
+    # Given
+    cache.store('/news/1.html', '<p>記事</p>', etag='"abc"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+
+    # When
+    entry = cache.lookup('/news/1.html')
+
+    # Then
+    assert cache.read(entry) == '<p>記事</p>'
+    assert cache.is_fresh(entry)
+    assert HttpCache.conditional_headers(entry) == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+
+def test_lookup_missing_url(cache):
+    assert cache.lookup('/news/missing.html') is None
+    assert HttpCache.conditional_headers(None) == {}
+
+
+def test_identical_bodies_are_stored_once(cache):
+    # When
+    cache.store('/news/1.html', '<p>同じ</p>')
+    cache.store('/news/2.html', '<p>同じ</p>')
+
+    # Then
+    assert cache.lookup('/news/1.html').digest == cache.lookup('/news/2.html').digest
+    assert len(list((cache.cache_dir / 'bodies').rglob('*.gz'))) == 1
+
+
+def test_replaced_body_is_removed(cache):
+    # When
+    cache.store('/news/1.html', '<p>古い</p>')
+    cache.store('/news/1.html', '<p>新しい</p>')
+
+    # Then
+    assert cache.read(cache.lookup('/news/1.html')) == '<p>新しい</p>'
+    assert len(list((cache.cache_dir / 'bodies').rglob('*.gz'))) == 1
+
+
+def test_stale_entry_is_not_fresh_unless_offline(tmp_path):
+    # Given
+    cache = HttpCache(tmp_path / 'cache', ttl=0)
+    cache.store('/news/1.html', '<p>記事</p>')
+    entry = cache.lookup('/news/1.html')
+
+    # Then
+    assert not cache.is_fresh(entry)
+    cache.offline = True
+    assert cache.is_fresh(entry)
+    cache.close()
+
+
+def test_evict_least_recently_used_over_max_size(cache):
+    # Given
+    cache.store('/news/1.html', '<p>一</p>')
+    cache.store('/news/2.html', '<p>二</p>')
+    cache.read(cache.lookup('/news/1.html'))
+    cache.max_size_bytes = cache.get_size_bytes() - 1
+
+    # When
+    evicted_count = cache.evict()
+
+    # Then
+    assert evicted_count == 1
+    assert cache.lookup('/news/1.html') is not None
+    assert cache.lookup('/news/2.html') is None
+
+
+def test_store_evicts_only_when_over_max_size(cache, mocker):
+    # Given
+    cache.store('/news/1.html', '<p>一</p>')
+    cache.max_size_bytes = cache.get_size_bytes() * 2
+    evict = mocker.spy(cache, 'evict')
+
+    # When
+    cache.store('/news/1.html', '<p>二</p>')
+    cache.store('/news/2.html', '<p>三</p>')
+    cache.store('/news/3.html', '<p>四</p>')
+
+    # Then
+    evict.assert_called_once()
+    assert cache.lookup('/news/1.html') is None
+    assert cache.get_size_bytes() <= cache.max_size_bytes
+
+
+def test_evict_entries_older_than_max_age(cache):
+    # Given
+    cache.store('/news/1.html', '<p>記事</p>')
+    time.sleep(0.01)
+    cache.max_age = 0
+
+    # When
+    evicted_count = cache.evict()
+
+    # Then
+    assert evicted_count == 1
+    assert cache.lookup('/news/1.html') is None
+    assert not list((cache.cache_dir / 'bodies').rglob('*.gz'))
+
+
+def test_store_from_several_threads(cache):
+    # Given
+    def store_pages(start):
+        for i in range(start, start + 25):
+            cache.store(f'https://example.com/{i}', f'<p>{i}</p>')
+
+    # When
+    threads = [threading.Thread(target=store_pages, args=(start,)) for start in range(0, 100, 25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    assert all(cache.lookup(f'https://example.com/{i}') is not None for i in range(100))
+    assert cache._size_bytes == cache.get_size_bytes()
+
@@ -0,0 +1,143 @@
+import json
+import pickle
+import time
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.async_fetcher import fetch_pages
+from jp_news_scraper_pipeline.jp_news_scraper.parallel_tokenizer import tokenize_texts
+from jp_news_scraper_pipeline.metrics import MetricsRegistry, Histogram, metrics
+
+
+def test_histogram_buckets():
+    # Given
+    histogram = Histogram((0.1, 1.0))
+
+    # When
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    # Then
+    assert histogram.cumulative_counts() == [('0.1', 2), ('1.0', 3), ('+Inf', 4)]
+    assert histogram.to_dict()['count'] == 4
+    assert histogram.to_dict()['sum'] == pytest.approx(3.65)
+
+
+def test_stage_as_decorator_and_context_manager():
+    # Given
+    registry = MetricsRegistry()
+
+    @registry.stage('decorated')
+    def decorated():
+        return 'result'
+
+    # When
+    assert decorated() == 'result'
+    assert decorated() == 'result'
+    with registry.stage('block'):
+        pass
+
+    # Then
+    assert registry.stages['decorated'].count == 2
+    assert registry.stages['block'].count == 1
+
+
+def test_stage_is_recorded_when_it_raises():
+    registry = MetricsRegistry()
+    with pytest.raises(ValueError):
+        with registry.stage('failing'):
+            raise ValueError
+    assert registry.stages['failing'].count == 1
+
+
+def test_merge_pickled_snapshot():
+    # Given
+    worker_registry = MetricsRegistry()
+    worker_registry.increment('tokens_total', 10)
+    worker_registry.observe('tokenize_seconds', 0.002)
+    registry = MetricsRegistry()
+    registry.increment('tokens_total', 5)
+
+    # When
+    registry.merge(pickle.loads(pickle.dumps(worker_registry.snapshot())))
+
+    # Then
+    assert registry.counters == {'tokens_total': 15}
+    assert registry.histograms['tokenize_seconds'].count == 1
+
+
+def test_merge_snapshot_adds_the_worker_stage_timings():
+    # Given
+    worker_registry = MetricsRegistry()
+    with worker_registry.stage('fetch'):
+        pass
+    with worker_registry.stage('tokenize'):
+        time.sleep(0.01)
+    registry = MetricsRegistry()
+    with registry.stage('tokenize'):
+        pass
+
+    # When
+    registry.merge(pickle.loads(pickle.dumps(worker_registry.snapshot())))
+
+    # Then
+    assert registry.stages['fetch'].count == 1
+    assert registry.stages['tokenize'].count == 2
+    assert registry.stages['tokenize'].sum >= 0.01
+    assert set(registry.to_dict()['stages']) == {'fetch', 'tokenize'}
+
+
+def test_export(tmp_path):
+    # Given
+    registry = MetricsRegistry()
+    registry.increment('bytes_fetched_total', 1234567)
+    registry.observe('fetch_seconds', 0.2)
+    with registry.stage('fetch'):
+        pass
+
+    # When
+    registry.export(tmp_path / 'metrics.json', tmp_path / 'metrics.prom')
+
+    # Then
+    summary = json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))
+    assert summary['counters'] == {'bytes_fetched_total': 1234567}
+    assert summary['histograms']['fetch_seconds']['count'] == 1
+    assert summary['stages']['fetch']['count'] == 1
+
+    prometheus_lines = (tmp_path / 'metrics.prom').read_text(encoding='utf-8').splitlines()
+    assert '# TYPE jp_news_bytes_fetched_total counter' in prometheus_lines
+    assert 'jp_news_bytes_fetched_total 1234567' in prometheus_lines
+    assert 'jp_news_fetch_seconds_bucket{le="0.25"} 1' in prometheus_lines
+    assert 'jp_news_fetch_seconds_count 1' in prometheus_lines
+    assert 'jp_news_stage_seconds_count{stage="fetch"} 1' in prometheus_lines
+
+
+def test_fetch_pages_records_metrics(local_http_server):
+    # Given
+    local_http_server.pages = {'/news/1.html': '記事'}
+    metrics.reset()
+
+    # When
+    fetch_pages([f'{local_http_server.base_url}/news/1.html', f'{local_http_server.base_url}/news/missing.html'],
+                retries=0, min_request_interval=0)
+
+    # Then
+    assert metrics.counters['urls_fetched_total'] == 1
+    assert metrics.counters['urls_failed_total'] == 1
+    assert metrics.counters['bytes_fetched_total'] == len('記事'.encode('utf-8'))
+    assert metrics.histograms['fetch_seconds'].count == 1
+
+
+def test_tokenize_texts_merges_worker_metrics():
+    # Given
+    joined_text_list = ["これはテストです。", "No kanji here."] * 8
+    metrics.reset()
+
+    # When
+    records_per_text = tokenize_texts(joined_text_list, max_workers=2, filter_tokens=True)
+
+    # Then
+    kept = sum(len(records) for records in records_per_text)
+    assert metrics.histograms['tokenize_seconds'].count == len(joined_text_list)
+    assert metrics.counters['tokens_total'] - metrics.counters['tokens_filtered_total'] == kept
+    assert metrics.counters['tokens_filtered_total'] > 0
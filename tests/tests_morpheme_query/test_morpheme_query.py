@@ -0,0 +1,165 @@
+import sqlite3
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_pos_columns
+from jp_news_scraper_pipeline.jp_news_scraper.morpheme_query import top_morphemes, frequency_trend, MorphemeCount, \
+    TrendPoint
+from jp_news_scraper_pipeline.jp_news_scraper.parquet_dataset import write_to_morpheme_dataset
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_japan_news_table, insert_dataframe, \
+    migrate_japan_news_table, create_morpheme_frequency_table, upsert_morpheme_frequency
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS
+
+NOUN = JP_POS_LABELS.index('名詞')
+VERB = JP_POS_LABELS.index('動詞')
+
+# 2024-07-01 is a Monday.
+BATCHES = [
+    ([('日本', NOUN), ('日本', NOUN), ('する', VERB)], '2024-06-30 23:59:59'),
+    ([('日本', NOUN), ('東京', NOUN), ('する', VERB), ('する', VERB)], '2024-07-01 09:00:00'),
+    ([('東京', NOUN), ('東京', NOUN), ('東京', NOUN)], '2024-07-03 18:00:00'),
+    ([('日本', NOUN)], '2024-08-01 00:00:00'),
+]
+
+
+def create_df(records, timestamp):
+    pos_list, pos_translated_list = create_pos_columns([pos_code for _, pos_code in records])
+    return pd.DataFrame({
+        'Kanji': [kanji for kanji, _ in records],
+        'Romanji': [kanji for kanji, _ in records],
+        'PartOfSpeech': pos_list,
+        'PartOfSpeechEnglish': pos_translated_list,
+        'TimeStamp': timestamp
+    })
+
+
+@pytest.fixture(params=['sqlite', 'sqlite_frequency', 'sqlite_japan_news', 'parquet_file', 'parquet_dataset'])
+def source(request, tmp_path):
+    df = pd.concat([create_df(records, timestamp) for records, timestamp in BATCHES], ignore_index=True)
+    if request.param.startswith('sqlite'):
+        sqlite_db = tmp_path / 'test.db'
+        with sqlite3.connect(sqlite_db) as conn:
+            create_japan_news_table(conn)
+            insert_dataframe(conn, 'JapanNews', df)
+            if request.param == 'sqlite':
+                migrate_japan_news_table(conn, drop_japan_news=True)
+            elif request.param == 'sqlite_frequency':
+                create_morpheme_frequency_table(conn)
+                conn.execute('DROP TABLE JapanNews')
+        conn.close()
+        return sqlite_db
+    if request.param == 'parquet_file':
+        df.to_parquet(tmp_path / 'morphemes.parquet')
+        return tmp_path / 'morphemes.parquet'
+    for records, timestamp in BATCHES:
+        write_to_morpheme_dataset(create_df(records, timestamp), tmp_path / 'dataset')
+    return tmp_path / 'dataset'
+
+
+def test_top_morphemes(source):
+    # Then
+    assert top_morphemes(source, limit=2) == [MorphemeCount('日本', '名詞', 4), MorphemeCount('東京', '名詞', 4)]
+    assert top_morphemes(source, pos='動詞') == [MorphemeCount('する', '動詞', 3)]
+    assert top_morphemes(source, since='2024-07-01', until='2024-07-01') == [
+        MorphemeCount('する', '動詞', 2), MorphemeCount('日本', '名詞', 1), MorphemeCount('東京', '名詞', 1)]
+    assert top_morphemes(source, since='2025-01-01') == []
+
+
+def test_frequency_trend(source):
+    # Then
+    assert frequency_trend(source, '日本') == [
+        TrendPoint('2024-06-30', 2), TrendPoint('2024-07-01', 1), TrendPoint('2024-08-01', 1)]
+    assert frequency_trend(source, '日本', bucket='week') == [
+        TrendPoint('2024-06-24', 2), TrendPoint('2024-07-01', 1), TrendPoint('2024-07-29', 1)]
+    assert frequency_trend(source, '東京', bucket='month', since='2024-07-02') == [TrendPoint('2024-07-01', 3)]
+    assert frequency_trend(source, '東京', pos='動詞') == []
+
+
+def test_top_morphemes_reads_morpheme_frequency_table():
+    # Given
+    conn = sqlite3.connect(':memory:')
+    create_morpheme_frequency_table(conn)
+    upsert_morpheme_frequency(conn, Counter({
+        ('日本', '名詞', '2024-07-01'): 3,
+        ('日本', '名詞', '2024-07-02'): 4,
+        ('する', '動詞', '2024-07-02'): 5,
+        ('東京', '名詞', '2024-06-30'): 10
+    }))
+
+    # When
+    top_all = top_morphemes(conn, limit=2)
+    top_since = top_morphemes(conn, limit=5, since='2024-07-01')
+
+    # Then
+    assert top_all == [MorphemeCount('東京', '名詞', 10), MorphemeCount('日本', '名詞', 7)]
+    assert top_since == [MorphemeCount('日本', '名詞', 7), MorphemeCount('する', '動詞', 5)]
+    conn.close()
+
+
+def create_migrated_db(sqlite_db):
+    df = pd.concat([create_df(records, timestamp) for records, timestamp in BATCHES], ignore_index=True)
+    conn = sqlite3.connect(sqlite_db)
+    create_japan_news_table(conn)
+    insert_dataframe(conn, 'JapanNews', df)
+    migrate_japan_news_table(conn)
+    return conn
+
+
+def trace_queries(conn):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    return statements
+
+
+def test_migrated_database_is_read_through_the_covering_indexes(tmp_path):
+    # Given
+    conn = create_migrated_db(tmp_path / 'test.db')
+    statements = trace_queries(conn)
+
+    # When
+    top = top_morphemes(conn, pos='名詞', limit=1)
+    trend = frequency_trend(conn, '東京', bucket='month')
+
+    # Then
+    assert top == [MorphemeCount('日本', '名詞', 4)]
+    assert trend == [TrendPoint('2024-07-01', 4)]
+    aggregate_statements = [statement for statement in statements if 'GROUP BY' in statement]
+    assert len(aggregate_statements) == 2
+    assert all('FROM MorphemeOccurrences' in statement for statement in aggregate_statements)
+    plan = ' '.join(row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {statements[-1]}', {
+        'morpheme': '東京', 'pos': None, 'start': 0, 'end': 2 ** 63 - 1}))
+    assert 'COVERING INDEX MorphemeOccurrencesMorphemeIndex' in plan
+    conn.close()
+
+
+def test_interrupted_migration_is_read_from_morpheme_frequency(tmp_path):
+    # Given
+    conn = create_migrated_db(tmp_path / 'test.db')
+    with conn:
+        conn.execute("UPDATE SchemaMigrations SET LastId = 1 WHERE Name = 'JapanNews'")
+    statements = trace_queries(conn)
+
+    # When
+    top = top_morphemes(conn, limit=2)
+
+    # Then
+    assert top == [MorphemeCount('日本', '名詞', 4), MorphemeCount('東京', '名詞', 4)]
+    assert [statement for statement in statements if 'GROUP BY' in statement][0].count('FROM MorphemeFrequency') == 1
+    conn.close()
+
+
+def test_queries_of_a_database_without_morphemes(tmp_path):
+    # Given
+    sqlite_db = tmp_path / 'test.db'
+    sqlite3.connect(sqlite_db).close()
+
+    # Then
+    assert top_morphemes(sqlite_db) == []
+    assert frequency_trend(sqlite_db, '日本') == []
+
+
+def test_frequency_trend_unknown_bucket(tmp_path):
+    with pytest.raises(ValueError):
+        frequency_trend(tmp_path / 'test.db', '日本', bucket='year')
@@ -11,39 +11,27 @@ def sample_href_list():
             '/news/html/20240101/k10013589042100.html']
 
 
-# Mocking the requests.get method
-class MockResponse:
-    def __init__(self, text):
-        self.text = text
-
-
+# Serve the news pages from a local HTTP server
 @pytest.fixture
-def mock_requests(monkeypatch):
-    def mock_get(url):
-        if 'k10013589041000' in url:
-            return MockResponse(
-                '<html><body><section class="content--detail-main"><div>First article text.</div></section></body></html>')
-        elif 'k10013589042000' in url:
-            return MockResponse(
-                '<html><body><section class="content--detail-main"><div>Second article text.</div></section></body></html>')
-        elif 'k10013589042100' in url:
-            return MockResponse(
-                '<html><body><article class="content--detail-main"><div>Second article text.</div></article></body></html>')
-        else:
-            raise ValueError("Unexpected URL in test")
-
-    monkeypatch.setattr('requests.get', mock_get)
+def nhk_server(local_http_server):
+    local_http_server.pages = {
+        '/news/html/20240101/k10013589041000.html':
+            '<html><body><section class="content--detail-main"><div>First article text.</div></section></body></html>',
+        '/news/html/20240101/k10013589042000.html':
+            '<html><body><section class="content--detail-main"><div>Second article text.</div></section></body></html>',
+        '/news/html/20240101/k10013589042100.html':
+            '<html><body><article class="content--detail-main"><div>Second article text.</div></article></body></html>'
+    }
+    return local_http_server
 
 
 # Test cases
-def test_extract_text_from_url_list_with_articles(sample_href_list, mock_requests):
+def test_extract_text_from_url_list_with_articles(sample_href_list, nhk_server):
     # Call the function with sample href attributes
-    extracted_texts = extract_text_from_url_list(sample_href_list)
+    extracted_texts = extract_text_from_url_list(sample_href_list, base_url=nhk_server.base_url)
 
-    # Verify that the extracted texts match the content of the news articles
-    assert len(extracted_texts) == 2
-    assert "First article text." in extracted_texts
-    assert "Second article text." in extracted_texts
+    # Verify that the extracted texts match the content of the news articles, in the order of the href list
+    assert extracted_texts == ["First article text.", "Second article text."]
 
 
 def test_extract_text_from_url_list_without_articles(sample_href_list, monkeypatch):
@@ -54,3 +42,14 @@ def test_extract_text_from_url_list_without_articles(sample_href_list, monkeypat
 
     # Verify that no text is extracted
     assert extracted_texts == []
+
+
+def test_extract_text_from_url_list_skips_missing_pages(nhk_server):
+    # Given
+    href_list = ['/news/missing.html', '/news/html/20240101/k10013589041000.html']
+
+    # When
+    extracted_texts = extract_text_from_url_list(href_list, base_url=nhk_server.base_url, retries=0)
+
+    # Then
+    assert extracted_texts == ["First article text."]
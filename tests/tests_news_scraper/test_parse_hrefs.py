@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import parse_hrefs, extract_href_tags, get_html_parser
+
+FIXTURE_DIR = Path(__file__).parent.parent / 'fixtures' / 'nhk'
+
+
+@pytest.mark.parametrize('parser', sorted({'html.parser', get_html_parser()}))
+@pytest.mark.parametrize('fixture', ['front_page.html', 'article_k10014501201000.html'])
+def test_parse_hrefs_matches_full_parse(fixture, parser):
+    # Given
+    html = (FIXTURE_DIR / fixture).read_text(encoding='utf-8')
+    expected = extract_href_tags(BeautifulSoup(html, 'html.parser'))
+
+    # When
+    result = parse_hrefs(html, parser)
+
+    # Then
+    assert result == expected
+
+
+def test_parse_hrefs_front_page():
+    # Given
+    html = (FIXTURE_DIR / 'front_page.html').read_text(encoding='utf-8')
+
+    # When
+    result = parse_hrefs(html)
+
+    # Then
+    assert '/news/html/20240704/k10014501211000.html' in result
+    assert '/news/script-link.html' not in result
+    assert len(result) == 14
+
+
+def test_parse_hrefs_no_anchor_tags():
+    assert parse_hrefs('<html><body><p>No links here!</p></body></html>') == []
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from jp_news_scraper_pipeline.jp_news_scraper.news_scraper import parse_news_article_texts, find_all_news_articles, \
+    append_extracted_text, get_html_parser
+
+FIXTURE_DIR = Path(__file__).parent.parent / 'fixtures' / 'nhk'
+
+
+def extract_with_full_parse(html: str) -> list[str]:
+    news_articles = find_all_news_articles(BeautifulSoup(html, 'html.parser'))
+    return append_extracted_text(news_articles) if news_articles else []
+
+
+@pytest.mark.parametrize('parser', sorted({'html.parser', get_html_parser()}))
+@pytest.mark.parametrize('fixture', sorted(path.name for path in FIXTURE_DIR.glob('*.html')))
+def test_parse_news_article_texts_matches_full_parse(fixture, parser):
+    # Given
+    html = (FIXTURE_DIR / fixture).read_text(encoding='utf-8')
+
+    # When
+    result = parse_news_article_texts(html, parser)
+
+    # Then
+    assert result == extract_with_full_parse(html)
+
+
+def test_parse_news_article_texts_multiple_sections():
+    # Given
+    html = (FIXTURE_DIR / 'article_k10014501211000.html').read_text(encoding='utf-8')
+
+    # When
+    result = parse_news_article_texts(html)
+
+    # Then
+    assert len(result) == 2
+    assert '新紙幣の発行始まる' in result[0]
+    assert '偽造防止' in result[1]
+
+
+def test_parse_news_article_texts_without_articles():
+    # Given
+    html = (FIXTURE_DIR / 'article_k10014501221000.html').read_text(encoding='utf-8')
+
+    # Then
+    assert parse_news_article_texts(html) == []
@@ -0,0 +1,31 @@
+from jp_news_scraper_pipeline.jp_news_scraper.parallel_tokenizer import split_into_chunks
+
+
+def test_split_into_chunks_keeps_order():
+    # Given
+    items = list(range(10))
+
+    # When
+    chunks = split_into_chunks(items, 3)
+
+    # Then
+    assert chunks == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+
+def test_split_into_chunks_more_chunks_than_items():
+    # Given
+    items = ['a', 'b']
+
+    # When
+    chunks = split_into_chunks(items, 5)
+
+    # Then
+    assert chunks == [['a'], ['b']]
+
+
+def test_split_into_chunks_empty_list():
+    # When
+    chunks = split_into_chunks([], 4)
+
+    # Then
+    assert chunks == [[]]
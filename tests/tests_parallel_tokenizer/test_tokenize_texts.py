@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.parallel_tokenizer import tokenize_texts, \
+    extract_morpheme_records_parallel, get_worker_count, MIN_TEXTS_PER_WORKER
+from jp_news_scraper_pipeline.jp_news_scraper.token_cache import set_persistent_token_cache_path, \
+    get_persistent_token_cache_path
+
+# Sample test data
+joined_text_list = ["これはテストです。", "漢字を抽出します。", "No kanji here."] * 8
+
+
+def test_tokenize_texts_parallel_matches_serial():
+    # When
+    parallel_result = tokenize_texts(joined_text_list, max_workers=2)
+    serial_result = tokenize_texts(joined_text_list, max_workers=1)
+
+    # Then
+    assert len(parallel_result) == len(joined_text_list)
+    assert parallel_result == serial_result
+
+
+def test_extract_morpheme_records_parallel_matches_serial():
+    # When
+    result = extract_morpheme_records_parallel(joined_text_list, max_workers=2)
+
+    # Then
+    assert result == extract_morpheme_records(joined_text_list)
+
+
+def test_tokenize_texts_empty_list():
+    assert tokenize_texts([], max_workers=4) == []
+
+
+def test_serial_path_follows_the_current_token_cache_path(tmp_path):
+    # Given
+    original_path = get_persistent_token_cache_path()
+    long_text = '東京都は今日、新しい学校を開きました。'
+    tokenize_texts([long_text], max_workers=1)
+    path = tmp_path / 'token_cache.db'
+
+    try:
+        # When
+        set_persistent_token_cache_path(path)
+        tokenize_texts([long_text], max_workers=1)
+    finally:
+        set_persistent_token_cache_path(original_path)
+
+    # Then
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM TokenCache').fetchone()[0] == 1
+
+
+def test_get_worker_count_falls_back_to_serial_for_small_inputs():
+    assert get_worker_count(MIN_TEXTS_PER_WORKER - 1, max_workers=16) == 1
+    assert get_worker_count(MIN_TEXTS_PER_WORKER * 3, max_workers=16) == 3
+    assert get_worker_count(MIN_TEXTS_PER_WORKER * 100, max_workers=4) == 4
+
+
+if __name__ == "__main__":
+    pytest.main()
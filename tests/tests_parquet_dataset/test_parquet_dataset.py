@@ -0,0 +1,68 @@
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_transformer import create_pos_columns
+from jp_news_scraper_pipeline.jp_news_scraper.parquet_dataset import write_to_morpheme_dataset, \
+    compact_morpheme_dataset, open_morpheme_dataset
+
+
+def create_df(kanji_list, timestamp):
+    pos_list, pos_translated_list = create_pos_columns([5] * len(kanji_list))
+    return pd.DataFrame({
+        'Source': '/news/1.html',
+        'Kanji': kanji_list,
+        'PartOfSpeech': pos_list,
+        'PartOfSpeechEnglish': pos_translated_list,
+        'TimeStamp': timestamp
+    })
+
+
+def test_write_to_morpheme_dataset_partitions_by_date(tmp_path):
+    # When
+    written = write_to_morpheme_dataset(create_df(['日本', '東京'], '2024-07-04 09:00:00'), tmp_path)
+    write_to_morpheme_dataset(create_df(['大阪'], '2024-07-05 09:00:00'), tmp_path)
+
+    # Then
+    assert written == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['Date=2024-07-04', 'Date=2024-07-05']
+    parquet_file = pq.ParquetFile(next((tmp_path / 'Date=2024-07-04').glob('*.parquet')))
+    assert parquet_file.metadata.row_group(0).column(0).compression == 'ZSTD'
+    assert parquet_file.schema_arrow.field('PartOfSpeech').type.value_type == 'string'
+    table = open_morpheme_dataset(tmp_path).to_table(filter=ds.field('Date') == '2024-07-04')
+    assert table.column('Kanji').to_pylist() == ['日本', '東京']
+
+
+def test_write_to_morpheme_dataset_empty(tmp_path):
+    assert write_to_morpheme_dataset(create_df([], '2024-07-04 09:00:00'), tmp_path / 'dataset') == 0
+    assert not (tmp_path / 'dataset').exists()
+
+
+def test_compact_morpheme_dataset_merges_small_files(tmp_path):
+    # Given
+    for kanji_list in (['東京', '日本'], ['大阪'], ['京都']):
+        write_to_morpheme_dataset(create_df(kanji_list, '2024-07-04 09:00:00'), tmp_path)
+    write_to_morpheme_dataset(create_df(['札幌'], '2024-07-05 09:00:00'), tmp_path)
+
+    # When
+    merged_count = compact_morpheme_dataset(tmp_path)
+
+    # Then
+    assert merged_count == 3
+    files = list((tmp_path / 'Date=2024-07-04').glob('*.parquet'))
+    assert len(files) == 1
+    assert len(list((tmp_path / 'Date=2024-07-05').glob('*.parquet'))) == 1
+
+    statistics = pq.ParquetFile(files[0]).metadata.row_group(0).column(1).statistics
+    assert (statistics.min, statistics.max) == ('京都', '東京')
+
+    table = open_morpheme_dataset(tmp_path).to_table()
+    assert sorted(table.column('Kanji').to_pylist()) == sorted(['東京', '日本', '大阪', '京都', '札幌'])
+
+
+def test_compact_morpheme_dataset_is_idempotent(tmp_path):
+    # Given
+    write_to_morpheme_dataset(create_df(['日本'], '2024-07-04 09:00:00'), tmp_path)
+
+    # Then
+    assert compact_morpheme_dataset(tmp_path) == 0
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import bulk_insert, insert_dataframe, \
+    configure_bulk_pragmas, create_deferred_indexes, create_japan_news_table
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'test.db'))
+    create_japan_news_table(conn)
+    conn.execute('CREATE TABLE Pairs (Key TEXT PRIMARY KEY, Value INTEGER)')
+    yield conn
+    conn.close()
+
+
+def test_bulk_insert_in_chunks(conn):
+    # Given
+    rows = ((f'key{i}', i) for i in range(25))
+
+    # When
+    inserted = bulk_insert(conn, 'Pairs', ['Key', 'Value'], rows, chunk_size=10)
+
+    # Then
+    assert inserted == 25
+    assert conn.execute('SELECT COUNT(*), SUM(Value) FROM Pairs').fetchone() == (25, sum(range(25)))
+
+
+def test_bulk_insert_rolls_back_whole_load_on_error(conn):
+    # Given a duplicate key in the last chunk
+    rows = [(f'key{i}', i) for i in range(15)] + [('key0', 99)]
+
+    # When
+    with pytest.raises(sqlite3.IntegrityError):
+        bulk_insert(conn, 'Pairs', ['Key', 'Value'], rows, chunk_size=10)
+
+    # Then
+    assert conn.execute('SELECT COUNT(*) FROM Pairs').fetchone() == (0,)
+
+
+def test_insert_dataframe(conn):
+    # Given
+    df = pd.DataFrame({
+        'Kanji': ['日本', '学校'],
+        'Romanji': ['Nippon', 'gakkou'],
+        'PartOfSpeech': ['名詞', '名詞'],
+        'PartOfSpeechEnglish': ['Noun', 'Noun'],
+        'TimeStamp': ['2023-10-01 00:00:00', '2023-10-01 00:00:00']
+    })
+
+    # When
+    inserted = insert_dataframe(conn, 'JapanNews', df)
+
+    # Then
+    assert inserted == 2
+    assert conn.execute('SELECT Kanji, Romanji FROM JapanNews ORDER BY ID').fetchall() == [
+        ('日本', 'Nippon'), ('学校', 'gakkou')]
+
+
+def test_configure_bulk_pragmas(conn):
+    # When
+    configure_bulk_pragmas(conn, cache_size_kib=1024, mmap_size=0)
+
+    # Then
+    assert conn.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+    assert conn.execute('PRAGMA synchronous').fetchone() == (1,)
+    assert conn.execute('PRAGMA cache_size').fetchone() == (-1024,)
+
+
+def test_create_deferred_indexes(conn):
+    # When
+    create_deferred_indexes(conn)
+    create_deferred_indexes(conn)
+
+    # Then
+    indexes = {row[1] for row in conn.execute('PRAGMA index_list(JapanNews)')}
+    assert {'JapanNewsKanjiIndex', 'JapanNewsPartOfSpeechIndex', 'JapanNewsTimeStampIndex'} <= indexes
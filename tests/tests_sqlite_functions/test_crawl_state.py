@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_crawl_state_table, enqueue_crawl_urls, \
+    fetch_unfinished_crawl_urls, update_crawl_status, record_crawl_error, CRAWL_FETCHED, CRAWL_LOADED
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_crawl_state_table(conn)
+    enqueue_crawl_urls(conn, ['/news/1.html', '/news/2.html', '/news/3.html'])
+    yield conn
+    conn.close()
+
+
+def fetch_state(conn, url):
+    return conn.execute('SELECT Status, Attempts, LastError FROM CrawlState WHERE Url = ?', (url,)).fetchone()
+
+
+def test_enqueue_crawl_urls_keeps_existing_state(conn):
+    # Given
+    update_crawl_status(conn, ['/news/1.html'], CRAWL_LOADED)
+
+    # When
+    enqueue_crawl_urls(conn, ['/news/1.html', '/news/4.html'])
+
+    # Then
+    assert fetch_state(conn, '/news/1.html') == (CRAWL_LOADED, 0, None)
+    assert fetch_unfinished_crawl_urls(conn) == ['/news/2.html', '/news/3.html', '/news/4.html']
+
+
+def test_record_crawl_error_gives_up_after_max_attempts(conn):
+    # When
+    update_crawl_status(conn, ['/news/1.html'], CRAWL_FETCHED, count_attempt=True)
+    for _ in range(2):
+        record_crawl_error(conn, ['/news/2.html'], 'No news article found', count_attempt=True)
+
+    # Then
+    assert fetch_state(conn, '/news/1.html') == (CRAWL_FETCHED, 1, None)
+    assert fetch_state(conn, '/news/2.html') == ('pending', 2, 'No news article found')
+    assert fetch_unfinished_crawl_urls(conn, max_attempts=2) == ['/news/1.html', '/news/3.html']
+
+
+def test_update_crawl_status_rejects_unknown_status(conn):
+    with pytest.raises(ValueError):
+        update_crawl_status(conn, ['/news/1.html'], 'done')
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_news_url_table, fetch_new_urls_from_db
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_news_url_table(conn)
+    conn.executemany('INSERT INTO NewsUrls (Url, TimeStamp) VALUES (?, ?)',
+                     [('/news/1.html', '2024-01-01 00:00:00'), ('/news/2.html', '2024-01-01 00:00:00')])
+    yield conn
+    conn.close()
+
+
+def test_fetch_new_urls_from_db_keeps_order(conn):
+    # Given
+    urls = ['/news/4.html', '/news/1.html', '/news/3.html', '/news/2.html']
+
+    # When
+    result = fetch_new_urls_from_db(conn, urls)
+
+    # Then
+    assert result == ['/news/4.html', '/news/3.html']
+
+
+def test_fetch_new_urls_from_db_all_existing(conn):
+    assert fetch_new_urls_from_db(conn, ['/news/1.html', '/news/2.html']) == []
+
+
+def test_fetch_new_urls_from_db_can_be_called_repeatedly(conn):
+    # When
+    fetch_new_urls_from_db(conn, ['/news/5.html'])
+    result = fetch_new_urls_from_db(conn, ['/news/6.html'])
+
+    # Then
+    assert result == ['/news/6.html']
+
+
+def test_fetch_new_urls_from_db_empty_list(conn):
+    assert fetch_new_urls_from_db(conn, []) == []
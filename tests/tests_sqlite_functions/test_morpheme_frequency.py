@@ -0,0 +1,76 @@
+import sqlite3
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_morpheme_frequency_table, \
+    upsert_morpheme_frequency, create_japan_news_table, insert_dataframe, migrate_japan_news_table
+
+ROWS = [
+    ('日本', 'nihon', '名詞', 'Noun', '2024-07-01 09:00:00'),
+    ('日本', 'nihon', '名詞', 'Noun', '2024-07-01 18:00:00'),
+    ('する', 'suru', '動詞', 'Verb', '2024-07-01 09:00:00'),
+    ('日本', 'nihon', '名詞', 'Noun', '2024-07-02 10:30:00'),
+]
+
+COLUMNS = ['Kanji', 'Romanji', 'PartOfSpeech', 'PartOfSpeechEnglish', 'TimeStamp']
+
+FREQUENCY_QUERY = 'SELECT Kanji, PartOfSpeech, Day, Count FROM MorphemeFrequency ORDER BY Kanji, Day'
+
+EXPECTED_FREQUENCY = [
+    ('する', '動詞', '2024-07-01', 1),
+    ('日本', '名詞', '2024-07-01', 2),
+    ('日本', '名詞', '2024-07-02', 1),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_morpheme_frequency_table(conn)
+    yield conn
+    conn.close()
+
+
+def test_upsert_morpheme_frequency_adds_counts(conn):
+    # Given
+    upsert_morpheme_frequency(conn, Counter({('日本', '名詞', '2024-07-01'): 3, ('する', '動詞', '2024-07-01'): 1}))
+
+    # When
+    upsert_morpheme_frequency(conn, Counter({('日本', '名詞', '2024-07-01'): 2}))
+
+    # Then
+    rows = conn.execute('SELECT Kanji, PartOfSpeech, Day, Count FROM MorphemeFrequency ORDER BY Kanji').fetchall()
+    assert rows == [('する', '動詞', '2024-07-01', 1), ('日本', '名詞', '2024-07-01', 5)]
+
+
+def test_create_morpheme_frequency_table_counts_the_rows_loaded_before():
+    # Given
+    conn = sqlite3.connect(':memory:')
+    create_japan_news_table(conn)
+    insert_dataframe(conn, 'JapanNews', pd.DataFrame(ROWS, columns=COLUMNS))
+
+    # When
+    create_morpheme_frequency_table(conn)
+    create_morpheme_frequency_table(conn)
+
+    # Then
+    assert conn.execute(FREQUENCY_QUERY).fetchall() == EXPECTED_FREQUENCY
+    conn.close()
+
+
+def test_create_morpheme_frequency_table_counts_the_migrated_rows():
+    # Given a database migrated before it had the aggregate table
+    conn = sqlite3.connect(':memory:')
+    create_japan_news_table(conn)
+    insert_dataframe(conn, 'JapanNews', pd.DataFrame(ROWS, columns=COLUMNS))
+    migrate_japan_news_table(conn, drop_japan_news=True)
+    conn.execute('DROP TABLE MorphemeFrequency')
+
+    # When
+    create_morpheme_frequency_table(conn)
+
+    # Then
+    assert conn.execute(FREQUENCY_QUERY).fetchall() == EXPECTED_FREQUENCY
+    conn.close()
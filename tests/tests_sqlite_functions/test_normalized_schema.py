@@ -0,0 +1,96 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_japan_news_table, insert_dataframe, \
+    migrate_japan_news_table, has_table
+from jp_news_scraper_pipeline.pipeline import load_to_sqlite
+
+ROWS = [
+    ('日本', 'nihon', '名詞', 'Noun', '2024-07-01 09:00:00'),
+    ('日本', 'nihon', '名詞', 'Noun', '2024-07-01 09:00:00'),
+    ('する', 'suru', '動詞', 'Verb', '2024-07-01 09:00:00'),
+    ('日本', 'nihon', '名詞', 'Noun', '2024-07-02 10:30:00'),
+    ('東京', 'toukyou', '名詞', 'Noun', '2024-07-02 10:30:00'),
+]
+
+COLUMNS = ['Kanji', 'Romanji', 'PartOfSpeech', 'PartOfSpeechEnglish', 'TimeStamp']
+
+OCCURRENCES_QUERY = '''
+    SELECT l.Kanji, p.PartOfSpeech, datetime(o.TsEpoch, 'unixepoch'), o.Occurrences FROM MorphemeOccurrences AS o
+    JOIN Lexicon AS l USING (MorphemeId) JOIN PartsOfSpeech AS p USING (PosId)
+    ORDER BY o.TsEpoch, l.Kanji
+    '''
+
+EXPECTED_OCCURRENCES = [
+    ('する', '動詞', '2024-07-01 09:00:00', 1),
+    ('日本', '名詞', '2024-07-01 09:00:00', 2),
+    ('日本', '名詞', '2024-07-02 10:30:00', 1),
+    ('東京', '名詞', '2024-07-02 10:30:00', 1),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_japan_news_table(conn)
+    insert_dataframe(conn, 'JapanNews', pd.DataFrame(ROWS, columns=COLUMNS))
+    yield conn
+    conn.close()
+
+
+def test_migrate_japan_news_table_in_chunks(conn):
+    # When
+    migrated = migrate_japan_news_table(conn, chunk_size=2)
+
+    # Then
+    assert migrated == len(ROWS)
+    assert conn.execute(OCCURRENCES_QUERY).fetchall() == EXPECTED_OCCURRENCES
+    assert conn.execute('SELECT Kanji, Romanji FROM Lexicon ORDER BY Kanji').fetchall() == [
+        ('する', 'suru'), ('日本', 'nihon'), ('東京', 'toukyou')]
+    assert conn.execute("SELECT LastId FROM SchemaMigrations WHERE Name = 'JapanNews'").fetchone() == (len(ROWS),)
+    plan = conn.execute('''
+        EXPLAIN QUERY PLAN SELECT TsEpoch, Occurrences FROM MorphemeOccurrences WHERE MorphemeId = 1
+        ''').fetchall()
+    assert 'COVERING INDEX MorphemeOccurrencesMorphemeIndex' in plan[0][-1]
+
+
+def test_migrate_japan_news_table_resumes_without_counting_twice(conn):
+    # Given
+    migrate_japan_news_table(conn)
+
+    # When
+    migrated = migrate_japan_news_table(conn)
+
+    # Then
+    assert migrated == 0
+    assert conn.execute(OCCURRENCES_QUERY).fetchall() == EXPECTED_OCCURRENCES
+
+
+def test_migrate_japan_news_table_drops_the_source(conn):
+    # When
+    migrate_japan_news_table(conn, drop_japan_news=True)
+
+    # Then
+    assert not has_table(conn, 'JapanNews')
+    assert conn.execute(OCCURRENCES_QUERY).fetchall() == EXPECTED_OCCURRENCES
+
+
+def test_load_to_sqlite_writes_the_normalized_tables_once_migrated(tmp_path):
+    # Given
+    sqlite_db = str(tmp_path / 'test.db')
+    with sqlite3.connect(sqlite_db) as conn:
+        create_japan_news_table(conn)
+        insert_dataframe(conn, 'JapanNews', pd.DataFrame(ROWS[:3], columns=COLUMNS))
+        migrate_japan_news_table(conn, drop_japan_news=True)
+    conn.close()
+
+    # When
+    load_to_sqlite(pd.DataFrame(ROWS[3:], columns=COLUMNS), sqlite_db)
+
+    # Then
+    with sqlite3.connect(sqlite_db) as conn:
+        assert conn.execute(OCCURRENCES_QUERY).fetchall() == EXPECTED_OCCURRENCES
+        assert not has_table(conn, 'JapanNews')
+    conn.close()
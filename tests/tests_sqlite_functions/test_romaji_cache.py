@@ -0,0 +1,41 @@
+import sqlite3
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_romaji_cache_table, \
+    fetch_cached_romaji, save_romaji_to_cache
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_romaji_cache_table(conn)
+    yield conn
+    conn.close()
+
+
+def test_save_and_fetch_cached_romaji(conn):
+    # Given
+    save_romaji_to_cache(conn, {'日本': 'Nippon', '東京': 'Toukyou'})
+
+    # When
+    result = fetch_cached_romaji(conn, ['日本', '東京', '大阪'])
+
+    # Then
+    assert result == {'日本': 'Nippon', '東京': 'Toukyou'}
+
+
+def test_fetch_cached_romaji_in_chunks(conn):
+    # Given
+    romaji = {f'語{i}': f'go{i}' for i in range(1200)}
+    save_romaji_to_cache(conn, romaji)
+
+    # When
+    result = fetch_cached_romaji(conn, list(romaji), chunk_size=500)
+
+    # Then
+    assert result == romaji
+
+
+def test_fetch_cached_romaji_empty(conn):
+    assert fetch_cached_romaji(conn, []) == {}
@@ -0,0 +1,67 @@
+import sqlite3
+from collections import Counter
+
+import pytest
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.sqlite_functions import create_text_hash_table, save_text_hashes
+from jp_news_scraper_pipeline.jp_news_scraper.text_dedup import deduplicate_texts, hash_text, normalize_text
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    create_text_hash_table(conn)
+    yield conn
+    conn.close()
+
+
+def test_normalize_text_ignores_width_and_whitespace():
+    assert normalize_text('  ＮＨＫ　ニュース\n') == normalize_text('NHK ニュース')
+    assert hash_text(normalize_text('日本')) != hash_text(normalize_text('東京'))
+
+
+def test_deduplicate_texts_skips_known_articles(conn):
+    # Given
+    _, saved_hashes = deduplicate_texts(conn, {'/news/1.html': ['日本の学校。\n東京。']})
+    save_text_hashes(conn, saved_hashes)
+
+    # When
+    new_texts_by_url, new_hashes = deduplicate_texts(conn, {
+        '/news/2.html': ['日本の学校。\n\n東京。'],
+        '/news/3.html': ['東京。\n大阪。\n大阪。'],
+    })
+
+    # Then the paragraph shared with another article and the paragraph repeated within the article are counted again
+    assert new_texts_by_url == {'/news/3.html': ['東京。\n大阪。\n大阪。']}
+    assert set(new_hashes.values()) == {'/news/3.html'}
+    assert len(new_hashes) == 3
+
+
+def test_deduplicate_texts_skips_known_paragraphs_of_the_same_url(conn):
+    # Given
+    _, saved_hashes = deduplicate_texts(conn, {'/news/1.html': ['日本の学校。\n東京。']})
+    save_text_hashes(conn, saved_hashes)
+
+    # When the page is updated, and another article repeats one of its paragraphs
+    new_texts_by_url, _ = deduplicate_texts(conn, {
+        '/news/1.html': ['日本の学校。\n東京。\n大阪。'],
+        '/news/2.html': ['東京。\n京都。'],
+    })
+
+    # Then
+    assert new_texts_by_url == {'/news/1.html': ['大阪。'], '/news/2.html': ['東京。\n京都。']}
+
+
+def test_deduplicate_texts_keeps_the_morpheme_counts_of_a_new_article(conn):
+    # Given an article that repeats a paragraph
+    texts_by_url = {'/news/1.html': ['大阪の学校。\n東京。\n大阪の学校。', '東京。']}
+
+    # When
+    new_texts_by_url, _ = deduplicate_texts(conn, texts_by_url)
+
+    # Then its morphemes are counted as without deduplication
+    deduplicated_counts = Counter(extract_morpheme_records(new_texts_by_url['/news/1.html'], filter_tokens=True))
+    assert deduplicated_counts == Counter(extract_morpheme_records(texts_by_url['/news/1.html'], filter_tokens=True))
+    assert sum(count for (morpheme, _), count in deduplicated_counts.items() if morpheme == '大阪') == 2
+    assert sum(count for (morpheme, _), count in deduplicated_counts.items() if morpheme == '東京') == 2
@@ -0,0 +1,95 @@
+import pickle
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from jp_news_scraper_pipeline.jp_news_scraper.parallel_tokenizer import extract_token_buffer_parallel
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import extract_morpheme_records
+from jp_news_scraper_pipeline.jp_news_scraper.token_buffer import TokenBuffer
+from jp_news_scraper_pipeline.jp_news_scraper.utils import JP_POS_LABELS
+
+NOUN = JP_POS_LABELS.index('名詞')
+PARTICLE = JP_POS_LABELS.index('助詞')
+
+
+def test_token_buffer_interns_morphemes():
+    # When
+    token_buffer = TokenBuffer.from_records([('日本', NOUN), ('の', PARTICLE), ('日本', NOUN)])
+
+    # Then
+    assert len(token_buffer) == 3
+    assert token_buffer.morphemes == ['日本', 'の']
+    assert token_buffer.morpheme_ids.tolist() == [0, 1, 0]
+    assert list(token_buffer) == [('日本', NOUN), ('の', PARTICLE), ('日本', NOUN)]
+    assert token_buffer.get_nbytes() == 3 * (token_buffer.morpheme_ids.itemsize + 1)
+
+
+def test_extend_remaps_morpheme_ids():
+    # Given
+    token_buffer = TokenBuffer.from_records([('日本', NOUN), ('の', PARTICLE)])
+    other = TokenBuffer.from_records([('ニュース', NOUN), ('日本', NOUN)])
+
+    # When
+    token_buffer.extend(pickle.loads(pickle.dumps(other)))
+
+    # Then
+    assert token_buffer.morphemes == ['日本', 'の', 'ニュース']
+    assert list(token_buffer) == [('日本', NOUN), ('の', PARTICLE), ('ニュース', NOUN), ('日本', NOUN)]
+    token_buffer.append('ニュース', NOUN)
+    assert token_buffer.morpheme_ids.tolist() == [0, 1, 2, 0, 2]
+
+
+def test_to_arrow_shares_the_buffer_memory():
+    # Given
+    token_buffer = TokenBuffer.from_records([('日本', NOUN), ('の', PARTICLE), ('日本', NOUN)])
+
+    # When
+    table = token_buffer.to_arrow()
+
+    # Then
+    assert table.column_names == ['Kanji', 'PartOfSpeech', 'PartOfSpeechEnglish']
+    assert pa.types.is_dictionary(table.schema.field('Kanji').type)
+    assert table.column('Kanji').to_pylist() == ['日本', 'の', '日本']
+    assert table.column('PartOfSpeechEnglish').to_pylist() == ['Noun', 'Particle', 'Noun']
+    indices = table.column('Kanji').chunk(0).indices
+    assert indices.buffers()[1].address == token_buffer.morpheme_id_view().ctypes.data
+
+
+def test_from_arrow_reads_a_parquet_round_trip(tmp_path):
+    # Given
+    token_buffer = TokenBuffer.from_records([('日本', NOUN), ('の', PARTICLE), ('日本', NOUN)])
+    pq.write_table(token_buffer.to_arrow(), tmp_path / 'tokens.parquet')
+
+    # When
+    result = TokenBuffer.from_arrow(pq.read_table(tmp_path / 'tokens.parquet'))
+
+    # Then
+    assert list(result) == list(token_buffer)
+    assert result.morphemes == ['日本', 'の']
+    assert len(TokenBuffer.from_arrow(TokenBuffer().to_arrow())) == 0
+
+
+def test_to_pandas_builds_categoricals():
+    # Given
+    token_buffer = TokenBuffer.from_records([('日本', NOUN), ('の', PARTICLE), ('日本', NOUN)])
+
+    # When
+    df = token_buffer.to_pandas()
+
+    # Then
+    assert all(dtype == 'category' for dtype in df.dtypes)
+    assert df['Kanji'].cat.categories.tolist() == ['日本', 'の']
+    assert df['Kanji'].tolist() == ['日本', 'の', '日本']
+    assert df['PartOfSpeech'].tolist() == ['名詞', '助詞', '名詞']
+
+
+def test_extract_token_buffer_parallel_matches_serial_records():
+    # Given
+    joined_text_list = ["これはテストです。", "2024年、NHKのニュースを読む。", "日本のニュース。"] * 6
+
+    # When
+    token_buffer = extract_token_buffer_parallel(joined_text_list, max_workers=2, filter_tokens=True)
+
+    # Then
+    assert list(token_buffer) == extract_morpheme_records(joined_text_list, filter_tokens=True)
+    assert len(token_buffer.morphemes) == len(set(token_buffer.morphemes))
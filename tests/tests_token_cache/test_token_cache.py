@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+
+from jp_news_scraper_pipeline.jp_news_scraper.data_extractor import tokenize_text_to_records, extract_pos
+from jp_news_scraper_pipeline.jp_news_scraper.token_cache import TokenCache, get_dictionary_fingerprint, \
+    STALE_FINGERPRINT_SECONDS
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_tokenizer, get_tokenizer_mode, get_pos_codes, \
+    get_excluded_pos_ids
+from jp_news_scraper_pipeline.metrics import MetricsRegistry
+
+PARAGRAPH = '東京都は今日、新しい学校を開きました。日本のニュースです。'
+
+
+def test_cached_records_equal_uncached_records(tmp_path):
+    # Given
+    tokenizer_obj = get_tokenizer()
+    mode = get_tokenizer_mode()
+    pos_codes = get_pos_codes()
+    excluded_pos_ids = get_excluded_pos_ids()
+    token_cache = TokenCache(get_dictionary_fingerprint(), tmp_path / 'token_cache.db')
+    expected = tokenize_text_to_records(PARAGRAPH, tokenizer_obj, mode, pos_codes, excluded_pos_ids)
+
+    # When
+    records_per_run = [tokenize_text_to_records(
+        text, tokenizer_obj, mode, pos_codes, excluded_pos_ids, token_cache=token_cache)
+        for text in (PARAGRAPH, PARAGRAPH, '日本')]
+
+    # Then
+    assert records_per_run[0] == records_per_run[1] == expected
+    assert records_per_run[2] == tokenize_text_to_records('日本', tokenizer_obj, mode, pos_codes, excluded_pos_ids)
+
+
+def test_lru_tier_counts_hits_misses_and_evictions():
+    # Given
+    token_cache = TokenCache(get_dictionary_fingerprint(), lru_size=2)
+    registry = MetricsRegistry()
+
+    # When
+    for text in ['日本', '学校', '日本', '東京', '学校']:
+        token_cache.tokenize(text, get_tokenizer(), get_tokenizer_mode(), registry)
+
+    # Then
+    counters = registry.counters
+    assert counters['token_cache_lru_hits_total'] == 1
+    assert counters['token_cache_lru_misses_total'] == 4
+    assert counters['token_cache_lru_evictions_total'] == 2
+
+
+def test_persistent_tier_is_shared_across_runs(mocker, tmp_path):
+    # Given
+    path = tmp_path / 'token_cache.db'
+    first_cache = TokenCache(get_dictionary_fingerprint(), path)
+    expected = first_cache.tokenize(PARAGRAPH, get_tokenizer(), get_tokenizer_mode())
+    first_cache.close()
+    tokenizer_obj = mocker.Mock()
+    registry = MetricsRegistry()
+
+    # When
+    tokens = TokenCache(get_dictionary_fingerprint(), path).tokenize(
+        PARAGRAPH, tokenizer_obj, get_tokenizer_mode(), registry)
+
+    # Then
+    assert tokens == expected
+    tokenizer_obj.tokenize.assert_not_called()
+    assert registry.counters['token_cache_persistent_hits_total'] == 1
+
+
+def test_persistent_tier_keeps_each_dictionary_apart(mocker, tmp_path):
+    # Given
+    path = tmp_path / 'token_cache.db'
+    first_cache = TokenCache(get_dictionary_fingerprint(mode='C'), path)
+    expected = first_cache.tokenize(PARAGRAPH, get_tokenizer(), get_tokenizer_mode())
+    first_cache.close()
+    registry = MetricsRegistry()
+
+    # When
+    token_cache = TokenCache(get_dictionary_fingerprint(mode='A'), path)
+    token_cache.tokenize(PARAGRAPH, get_tokenizer(), get_tokenizer_mode(), registry)
+    token_cache.close()
+    tokenizer_obj = mocker.Mock()
+    tokens = TokenCache(get_dictionary_fingerprint(mode='C'), path).tokenize(
+        PARAGRAPH, tokenizer_obj, get_tokenizer_mode())
+
+    # Then the second dictionary misses, and the entries of the first one are kept
+    assert registry.counters['token_cache_persistent_misses_total'] == 1
+    assert tokens == expected
+    tokenizer_obj.tokenize.assert_not_called()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM TokenCache').fetchone()[0] == 2
+
+
+def test_persistent_tier_deletes_the_entries_of_unused_dictionaries(tmp_path):
+    # Given
+    path = tmp_path / 'token_cache.db'
+    old_cache = TokenCache(get_dictionary_fingerprint(mode='A'), path)
+    old_cache.tokenize(PARAGRAPH, get_tokenizer(), get_tokenizer_mode())
+    old_cache.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute('UPDATE TokenCacheFingerprints SET LastUsedAt = ?',
+                     (time.time() - STALE_FINGERPRINT_SECONDS - 1,))
+
+    # When
+    token_cache = TokenCache(get_dictionary_fingerprint(mode='C'), path)
+    token_cache.tokenize(PARAGRAPH, get_tokenizer(), get_tokenizer_mode())
+    token_cache.close()
+
+    # Then
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM TokenCache').fetchone()[0] == 1
+        assert conn.execute('SELECT Fingerprint FROM TokenCacheFingerprints').fetchall() == [
+            (get_dictionary_fingerprint(mode='C'),)]
+
+
+def test_persistent_tier_drops_the_previous_layout(tmp_path):
+    # Given
+    path = tmp_path / 'token_cache.db'
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE TokenCacheInfo (Name TEXT PRIMARY KEY, Value TEXT NOT NULL)')
+        conn.execute('CREATE TABLE TokenCache (Key BLOB PRIMARY KEY, Morphemes TEXT NOT NULL, PosIds BLOB NOT NULL)')
+
+    # When
+    token_cache = TokenCache(get_dictionary_fingerprint(), path)
+    token_cache.tokenize(PARAGRAPH, get_tokenizer(), get_tokenizer_mode())
+    token_cache.close()
+
+    # Then
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'TokenCacheInfo'").fetchone() is None
+        assert conn.execute('SELECT COUNT(*) FROM TokenCache').fetchone()[0] == 1
+
+
+def test_flush_keeps_the_entries_added_from_other_threads(mocker, tmp_path):
+    # Given
+    path = tmp_path / 'token_cache.db'
+    token_cache = TokenCache(get_dictionary_fingerprint(), path, flush_size=7)
+    paragraphs = [f'{PARAGRAPH}{i}' for i in range(200)]
+    # A SudachiPy tokenizer cannot be shared across threads, unlike the cache.
+    tokenizer_obj = mocker.Mock()
+    tokenizer_obj.tokenize.return_value = []
+
+    def tokenize_all(texts):
+        for text in texts:
+            token_cache.tokenize(text, tokenizer_obj, get_tokenizer_mode())
+
+    # When
+    threads = [threading.Thread(target=tokenize_all, args=(paragraphs[i::4],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    token_cache.close()
+
+    # Then
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM TokenCache').fetchone()[0] == len(paragraphs)
+
+
+def test_extract_pos_uses_the_cached_part_of_speech():
+    # When
+    part_of_speech_list = extract_pos(['日本', '学校', 'の', '日本'])
+
+    # Then
+    assert part_of_speech_list == ['名詞', '名詞', '助詞', '名詞']
@@ -0,0 +1,26 @@
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_excluded_pos_ids, get_dictionary, get_excluded_jp_pos, \
+    has_non_jp_character
+
+
+def test_get_excluded_pos_ids_match_excluded_pos():
+    # Given
+    excluded_jp_pos = get_excluded_jp_pos()
+    sudachi_dictionary = get_dictionary()
+
+    # When
+    excluded_pos_ids = get_excluded_pos_ids()
+
+    # Then every Part of Speech ID is in the set if and only if its Part of Speech is excluded
+    pos_id = 0
+    while (part_of_speech := sudachi_dictionary.pos_of(pos_id)) is not None:
+        assert (pos_id in excluded_pos_ids) == (part_of_speech[0] in excluded_jp_pos)
+        pos_id += 1
+    assert excluded_pos_ids
+
+
+def test_has_non_jp_character():
+    assert has_non_jp_character('NHK')
+    assert has_non_jp_character('2024年')
+    assert not has_non_jp_character('日本')
+    assert not has_non_jp_character('@#$')
+    assert not has_non_jp_character('ＮＨＫ')
@@ -0,0 +1,19 @@
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_pos_codes, get_dictionary, JP_POS_LABELS, \
+    EN_POS_LABELS, get_jp_pos_dict
+
+
+def test_get_pos_codes_matches_top_level_pos():
+    # Given
+    sudachi_dictionary = get_dictionary()
+
+    # When
+    pos_codes = get_pos_codes()
+
+    # Then
+    assert sudachi_dictionary.pos_of(len(pos_codes)) is None
+    for pos_id, pos_code in enumerate(pos_codes):
+        assert JP_POS_LABELS[pos_code] == sudachi_dictionary.pos_of(pos_id)[0]
+
+
+def test_pos_labels_match_pos_dict():
+    assert dict(zip(JP_POS_LABELS, EN_POS_LABELS)) == get_jp_pos_dict()
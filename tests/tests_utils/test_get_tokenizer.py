@@ -0,0 +1,40 @@
+from sudachipy import SplitMode
+
+from jp_news_scraper_pipeline.jp_news_scraper.utils import get_tokenizer, get_dictionary, get_tokenizer_mode, \
+    warm_up_tokenizer, get_tokenizer_metrics
+
+
+def test_get_tokenizer_returns_same_instance():
+    # When
+    first = get_tokenizer()
+    second = get_tokenizer('core', 'c')
+
+    # Then
+    assert first is second
+
+
+def test_get_tokenizer_keyed_by_split_mode():
+    # When
+    tokenizer_c = get_tokenizer(mode='C')
+    tokenizer_a = get_tokenizer(mode='A')
+
+    # Then
+    assert tokenizer_c is not tokenizer_a
+    assert get_dictionary() is get_dictionary('core')
+
+
+def test_get_tokenizer_mode():
+    assert get_tokenizer_mode() == SplitMode.C
+    assert get_tokenizer_mode('A') == SplitMode.A
+
+
+def test_warm_up_tokenizer_records_metrics():
+    # When
+    warm_up_tokenizer()
+    metrics = get_tokenizer_metrics()
+
+    # Then
+    assert 'core' in metrics['dictionaries']
+    assert 'core:C' in metrics['tokenizers']
+    assert metrics['load_seconds']['dictionary:core'] >= 0
+    assert metrics['load_seconds']['warm_up:core:C'] >= 0